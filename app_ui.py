@@ -1,18 +1,70 @@
 import sys
-import queue
+import multiprocessing
 import threading
 import os
+import time
 import traceback
 from datetime import datetime
 
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QFont, QPixmap, QColor, QPainter, QBrush
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QPropertyAnimation, QEasingCurve, QEvent, QRectF
+from PyQt5.QtGui import QFont, QPixmap, QColor, QPainter, QBrush, QPen
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
     QTextEdit, QHBoxLayout, QGraphicsBlurEffect, QSizePolicy,
-    QSlider, QFrame, QComboBox  # 添加 QComboBox 组件用于文件夹选择
+    QSlider, QFrame, QComboBox,  # 添加 QComboBox 组件用于文件夹选择
+    QGraphicsScene, QGraphicsPixmapItem
 )
 
+from event_bus import DEFAULT_POLICIES, EventBus
+from pack_manifest import list_packs
+from telemetry_charts import TelemetryCharts
+
+# 状态栏 / 日志最多每隔多少毫秒刷新一次（后端 0.5s 一拍，按钮等事件可能更密）
+UI_REFRESH_MS = 250
+# 日志区最多保留的行数（超出后丢弃最早的行，避免文档无限增长、重排越来越慢）
+LOG_MAX_LINES = 500
+
+
+def _blur_pixmap(pixmap, radius):
+    """离屏对一张静态图做一次模糊（只在尺寸变化时调用，不作用于实时内容）"""
+    scene = QGraphicsScene()
+    item = QGraphicsPixmapItem(pixmap)
+    blur = QGraphicsBlurEffect()
+    blur.setBlurRadius(radius)
+    item.setGraphicsEffect(blur)
+    scene.addItem(item)
+    out = QPixmap(pixmap.size())
+    out.setDevicePixelRatio(pixmap.devicePixelRatio())
+    out.fill(Qt.transparent)
+    painter = QPainter(out)
+    scene.render(painter, QRectF(out.rect()), QRectF(pixmap.rect()))
+    painter.end()
+    return out
+
+
+class FrameStats:
+    """
+    重绘计数：窗口每次合成（UpdateRequest，包含所有子控件的绘制）的耗时。
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.background_builds = 0
+
+    def record(self, ms):
+        self.frames += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def mean_ms(self):
+        return self.total_ms / self.frames if self.frames else 0.0
+
+    def describe(self):
+        return (f"重绘 {self.frames} 帧，平均 {self.mean_ms():.2f} ms，最长 {self.max_ms:.2f} ms，"
+                f"背景重建 {self.background_builds} 次")
+
 # ---- 事件处理信号类 ----
 class EventHandler(QObject):
     status_update = pyqtSignal(str)
@@ -35,14 +87,16 @@ class FlightAnnouncerThread(threading.Thread):
         self.announcer.event_signal.connect(self._on_backend_event)
 
     def _on_backend_event(self, event_type, data):
-        # 统一放入前端队列，供 UI 线程拉取
-        self.event_queue.put((event_type, data))
+        # 前端会处理的事件放入事件总线（按类型合并 / 去重 / 限长），供 UI 线程拉取；
+        # 其余（如阶段切换，飞行日志直接订阅）不进队列
+        if event_type in DEFAULT_POLICIES:
+            self.event_queue.put(event_type, data)
 
     def run(self):
         try:
             self.announcer.start_detection()
         except Exception as e:
-            self.event_queue.put(("error", f"线程异常: {e}"))
+            self.event_queue.put("error", f"线程异常: {e}")
             traceback.print_exc()
         finally:
             try:
@@ -116,18 +170,51 @@ class GlassWindow(QWidget):
 
         super().__init__()
         self.setWindowTitle("客舱语音系统")
-        self.resize(520, 440)
+        self.resize(520, 540)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
 
-        self.event_queue = queue.Queue()
+        self.event_queue = EventBus()
         self.event_handler = EventHandler()
+        self._dropped_seen = 0
+
+        # 背景与面板装饰缓存成位图，只在尺寸变化时重建
+        self._background = None
+        self._background_key = None
+        self.frame_stats = FrameStats()
+
+        # 状态 / 日志合并刷新：状态只保留最新一条，日志攒一批一次追加
+        self._pending_status = None
+        self._pending_logs = []
+        # 日志文档大小：只在 UI 线程刷新后更新，内存剖析（检测线程）读这两个缓存值，不碰 QTextDocument
+        self._log_doc_chars = 0
+        self._log_doc_blocks = 0
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self._flush_display)
 
         self._init_ui()
         self._connect_signals()
 
         # 启动后端线程
         self.announcer_thread = FlightAnnouncerThread(self.event_queue)
+        metrics = self.announcer_thread.announcer.metrics
+        metrics.add_collector(
+            "ui_event_queue_depth", "gauge", "前端事件队列中待处理的事件数", self.event_queue.qsize)
+        metrics.add_collector(
+            "ui_events_dropped", "counter", "前端事件总线丢弃的事件（按类型）",
+            lambda: [({"type": k}, v) for k, v in self.event_queue.stats()["dropped"].items()])
+        metrics.add_collector(
+            "ui_events_coalesced", "counter", "前端事件总线合并 / 去重的事件（按类型）",
+            lambda: [({"type": k}, v) for k, v in self.event_queue.stats()["coalesced"].items()])
+        metrics.add_collector(
+            "ui_frames", "counter", "窗口重绘次数", lambda: self.frame_stats.frames)
+        metrics.add_collector(
+            "ui_frame_ms_mean", "gauge", "窗口平均重绘耗时（毫秒）", self.frame_stats.mean_ms)
+        profiler = self.announcer_thread.announcer.mem_profiler
+        profiler.add_gauge("ui_event_queue_depth", self.event_queue.qsize)
+        profiler.add_gauge("ui_log_document_chars", lambda: self._log_doc_chars)
+        profiler.add_gauge("ui_log_blocks", lambda: self._log_doc_blocks)
         self.announcer_thread.start()
 
         # 定时器处理事件队列
@@ -143,14 +230,17 @@ class GlassWindow(QWidget):
         main_layout.setContentsMargins(15, 15, 15, 15)
         self.setLayout(main_layout)
 
+        # 面板底色由窗口的缓存背景绘制（见 _build_background），面板本身透明；
+        # 不再给整个面板加模糊效果，否则每次状态 / 日志变化都要重新模糊整块区域
         self.content_widget = QWidget()
+        self.content_widget.setObjectName("contentPanel")
         self.content_widget.setStyleSheet("""
-            background: rgba(40, 50, 60, 220);
-            border-radius: 20px;
+            QWidget {
+                background: rgba(40, 50, 60, 220);
+                border-radius: 20px;
+            }
+            #contentPanel { background: transparent; }
         """)
-        blur = QGraphicsBlurEffect()
-        blur.setBlurRadius(1.5)
-        self.content_widget.setGraphicsEffect(blur)
 
         content_layout = QVBoxLayout()
         content_layout.setSpacing(15)
@@ -192,6 +282,11 @@ class GlassWindow(QWidget):
         self.status_label.setAlignment(Qt.AlignCenter)
         content_layout.addWidget(self.status_label)
 
+        # 遥测曲线（高度 / 空速 / 垂直速度），直接读遥测总线，有新帧才重绘
+        self.telemetry_charts = TelemetryCharts()
+        self.telemetry_charts.setFixedHeight(90)
+        content_layout.addWidget(self.telemetry_charts)
+
         # 按钮区（两行：核心流程 + 自定义）
         core_btns = QHBoxLayout()
         self.start_btn = GlassButton("开始登机")
@@ -259,6 +354,7 @@ class GlassWindow(QWidget):
             font-family: Consolas, monospace;
             font-size: 13px;
         """)
+        self.event_log.document().setMaximumBlockCount(LOG_MAX_LINES)
         content_layout.addWidget(self.event_log)
 
     def _connect_signals(self):
@@ -278,14 +374,25 @@ class GlassWindow(QWidget):
         """动态加载 sounds 目录下的文件夹并显示在下拉框中"""
         sounds_path = os.path.join(self.base_path, "sounds")
         try:
-            for folder in os.listdir(sounds_path):
-                folder_path = os.path.join(sounds_path, folder)
-                if os.path.isdir(folder_path):
-                    self.folder_selector.addItem(folder)  # 将文件夹名称添加到下拉框
+            for folder in list_packs(sounds_path):
+                self.folder_selector.addItem(folder)  # 将文件夹名称添加到下拉框
         except Exception as e:
             print(f"加载文件夹失败: {str(e)}")
             self.append_event(f"加载文件夹失败: {str(e)}")
 
+    def update_folder_list(self, names):
+        """语音包文件夹有增删时刷新下拉框（保留当前选择，不触发切换）"""
+        current = self.folder_selector.currentText()
+        self.folder_selector.blockSignals(True)
+        try:
+            self.folder_selector.clear()
+            self.folder_selector.addItems(names)
+            if current in names:
+                self.folder_selector.setCurrentText(current)
+        finally:
+            self.folder_selector.blockSignals(False)
+        self.append_event(f"语音包列表已更新：{len(names)} 个")
+
     def on_folder_selected(self, folder_name):
         """当用户选择新的语音文件夹时"""
         try:
@@ -306,26 +413,51 @@ class GlassWindow(QWidget):
 
     # 事件队列轮询（由后端 event_signal 转过来）
     def process_event_queue(self):
-        try:
-            while not self.event_queue.empty():
-                evt_type, data = self.event_queue.get_nowait()
-                if evt_type == "status":
-                    self.event_handler.status_update.emit(data)
-                elif evt_type == "enable_descent":
-                    # 后端 climb->takeoff 后会发 True
-                    self.event_handler.enable_descent.emit(data)
-                elif evt_type == "announcement":
-                    self.event_handler.announcement.emit(data)
-                elif evt_type == "error":
-                    self.event_handler.error.emit(data)
-                elif evt_type == "log":
-                    self.event_handler.log_event.emit(data)
-        except queue.Empty:
-            pass
+        for evt_type, data in self.event_queue.drain():
+            if evt_type == "status":
+                self.event_handler.status_update.emit(data)
+            elif evt_type == "enable_descent":
+                # 后端 climb->takeoff 后会发 True
+                self.event_handler.enable_descent.emit(data)
+            elif evt_type == "announcement":
+                self.event_handler.announcement.emit(data)
+            elif evt_type == "error":
+                self.event_handler.error.emit(data)
+            elif evt_type == "log":
+                self.event_handler.log_event.emit(data)
+            elif evt_type == "packs":
+                self.update_folder_list(data)
+        self._report_dropped()
+
+    def _report_dropped(self):
+        """事件总线有新的丢弃时在日志里提示一次（UI 卡顿时播报 / 按钮事件也可能丢）"""
+        stats = self.event_queue.stats()
+        if stats["dropped_total"] > self._dropped_seen:
+            detail = "，".join(f"{k} {v}" for k, v in sorted(stats["dropped"].items()))
+            self.append_event(f"界面处理不及，事件队列已丢弃 {stats['dropped_total']} 条（{detail}）")
+            self._dropped_seen = stats["dropped_total"]
+
+    # ---- 合并刷新 ----
+    def _schedule_refresh(self):
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start(UI_REFRESH_MS)
+
+    def _flush_display(self):
+        if self._pending_status is not None:
+            if self._pending_status != self.status_label.text():
+                self.status_label.setText(self._pending_status)
+            self._pending_status = None
+        if self._pending_logs:
+            lines, self._pending_logs = self._pending_logs[-LOG_MAX_LINES:], []
+            self.event_log.append("\n".join(lines))
+            document = self.event_log.document()
+            self._log_doc_chars = document.characterCount()
+            self._log_doc_blocks = document.blockCount()
 
     # ---- 信号槽 ----
     def update_status(self, text):
-        self.status_label.setText(text)
+        self._pending_status = text
+        self._schedule_refresh()
 
     def on_enable_descent(self, _flag=True):
         # 同时开放“巡航”和“准备下高”
@@ -341,11 +473,12 @@ class GlassWindow(QWidget):
 
     def append_event(self, text):
         now = datetime.now().strftime("%H:%M:%S")
-        self.event_log.append(f"[{now}] {text}")
+        self._pending_logs.append(f"[{now}] {text}")
+        self._schedule_refresh()
 
     # ---- 按钮事件 ----
     def on_start_boarding(self):
-        self.status_label.setText("登机流程启动")
+        self.update_status("登机流程启动")
         self.start_btn.setEnabled(False)
         self.append_event("开始登机")
         try:
@@ -361,7 +494,7 @@ class GlassWindow(QWidget):
             self.append_event(f"触发巡航失败: {str(e)}")
 
     def on_prepare_descent(self):
-        self.status_label.setText("准备下高")
+        self.update_status("准备下高")
         self.append_event("准备下高")
         try:
             self.announcer_thread.announcer.prepare_descent()
@@ -407,18 +540,73 @@ class GlassWindow(QWidget):
     def mouseReleaseEvent(self, event):
         self._offset = None
 
-    # ---- 自定义绘制圆角半透明背景 ----
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def closeEvent(self, event):
+        print(f"[GlassWindow] {self.frame_stats.describe()}")
+        self.telemetry_charts.close_reader()
+        try:
+            self.announcer_thread.announcer.shutdown()
+        except Exception as e:
+            print(f"关闭后端失败: {str(e)}")
+        super().closeEvent(event)
+
+    # ---- 重绘计时：UpdateRequest 里完成整窗（含子控件）的合成 ----
+    def event(self, event):
+        if event.type() != QEvent.UpdateRequest:
+            return super().event(event)
+        started = time.perf_counter()
+        result = super().event(event)
+        self.frame_stats.record((time.perf_counter() - started) * 1000.0)
+        return result
+
+    # ---- 自定义绘制圆角半透明背景（缓存位图，只重画脏区域） ----
+    def _build_background(self):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
-        brush = QBrush(QColor(30, 40, 50, 190))
-        painter.setBrush(brush)
         painter.setPen(Qt.NoPen)
-        rect = self.rect()
-        painter.drawRoundedRect(rect, 20, 20)
+        painter.setBrush(QBrush(QColor(30, 40, 50, 190)))
+        painter.drawRoundedRect(self.rect(), 20, 20)
+
+        # 面板柔光描边：静态装饰，只在这里模糊一次
+        panel = QRectF(self.content_widget.geometry())
+        glow = QPixmap(pixmap.size())
+        glow.setDevicePixelRatio(ratio)
+        glow.fill(Qt.transparent)
+        glow_painter = QPainter(glow)
+        glow_painter.setRenderHint(QPainter.Antialiasing)
+        glow_painter.setPen(QPen(QColor(126, 200, 255, 90), 3))
+        glow_painter.setBrush(Qt.NoBrush)
+        glow_painter.drawRoundedRect(panel.adjusted(1, 1, -1, -1), 20, 20)
+        glow_painter.end()
+        painter.drawPixmap(0, 0, _blur_pixmap(glow, 6))
+
+        painter.setBrush(QBrush(QColor(40, 50, 60, 220)))
+        painter.drawRoundedRect(panel, 20, 20)
+        painter.end()
+        self.frame_stats.background_builds += 1
+        return pixmap
+
+    def paintEvent(self, event):
+        geometry = self.content_widget.geometry()
+        key = (self.width(), self.height(), geometry.x(), geometry.y(), geometry.width(),
+               geometry.height(), self.devicePixelRatioF())
+        if self._background is None or key != self._background_key:
+            self._background = self._build_background()
+            self._background_key = key
+        # 只拷贝脏区域（状态栏 / 日志变化时 Qt 只要求重画对应控件下的那一块）
+        rect = QRectF(event.rect())
+        ratio = self._background.devicePixelRatio()
+        source = QRectF(rect.x() * ratio, rect.y() * ratio, rect.width() * ratio, rect.height() * ratio)
+        painter = QPainter(self)
+        painter.drawPixmap(rect, self._background, source)
 
 
 if __name__ == "__main__":
+    # 打包后的 exe 需要它才能拉起音频引擎子进程
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     win = GlassWindow()
     win.show()
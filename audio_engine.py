@@ -0,0 +1,337 @@
+"""
+独立进程音频引擎：
+- 子进程持有 pygame mixer 和已解码语音缓存（AudioManager）
+- 主进程通过 Pipe 发送精简命令（play / fade / duck / music / volume）
+- 子进程回报播放是否成功、命令延迟以及语音播放完成事件
+- 播放请求带截止时间：主进程等子进程的真实结果，过了截止时间还没开始（或刚开始）的
+  请求由子进程丢弃 / 停掉并回报失败，两边对“是否播出”的判断一致，不会重复播放
+UI 重绘、GIL 争用不会再拖慢音量包络和播放启动。
+"""
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+
+from phrase_engine import DEFAULT_CROSSFADE_MS, phrase_key
+
+
+# =============== 子进程 ===============
+
+def _engine_main(conn):
+    """
+    子进程入口：循环接收命令并交给 AudioManager 执行。
+    """
+    from audio_manager import AudioManager
+
+    send_lock = threading.Lock()
+
+    def send(msg):
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+
+    try:
+        am = AudioManager()
+    except Exception as e:
+        send(("failed", str(e)))
+        return
+    send(("ready",))
+
+    # 预取在独立线程解码，命令循环不被阻塞
+    preload_tasks = queue.Queue()
+
+    def preload_thread():
+        while True:
+            action, *args = preload_tasks.get()
+            try:
+                if action == "preload":
+                    am.preload(*args)
+                elif action == "phrase":
+                    am.prepare_sequence(*args)
+                elif action == "clear_phrases":
+                    am.clear_phrases()
+                else:
+                    am.release(*args)
+            except Exception as e:
+                print(f"[AudioEngine] {action} 失败: {e}")
+
+    threading.Thread(target=preload_thread, daemon=True).start()
+
+    # 当前语音：(req_id, Channel, 开始时间)
+    active = {"voice": None}
+    active_lock = threading.Lock()
+    stop_flag = threading.Event()
+
+    def watch_thread():
+        # 轮询语音 Channel，播放结束后回报 done；顺带定期回报缓存统计
+        last_stats = 0.0
+        while not stop_flag.is_set():
+            if time.time() - last_stats > 5.0:
+                last_stats = time.time()
+                send(("stats", am.cache_stats()))
+            cur = active["voice"]
+            if cur is not None:
+                req_id, channel, started = cur
+                try:
+                    busy = channel.get_busy()
+                except Exception:
+                    busy = False
+                if not busy or am.current_voice_channel is not channel:
+                    with active_lock:
+                        finished = active["voice"] is cur
+                        if finished:
+                            active["voice"] = None
+                    if finished:
+                        send(("done", req_id, time.time() - started))
+            time.sleep(0.05)
+
+    threading.Thread(target=watch_thread, daemon=True).start()
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        cmd = msg[0]
+        try:
+            if cmd in ("play", "sequence", "music") and time.time() > msg[-1]:
+                # 主进程已经放弃等待（例如排在慢命令后面），不再播放
+                send(("result", msg[1], False, (time.time() - msg[-2]) * 1000.0))
+            elif cmd in ("play", "sequence"):
+                if cmd == "play":
+                    _, req_id, path, sent_ts, deadline = msg
+                    ok = am.play_voice(path)
+                else:
+                    _, req_id, files, crossfade_ms, sent_ts, deadline = msg
+                    ok = am.play_sequence(files, crossfade_ms)
+                latency_ms = (time.time() - sent_ts) * 1000.0
+                if ok and time.time() > deadline:
+                    # 解码太慢，主进程已按失败处理（会重试）：立即停掉，避免同一条播两遍
+                    am.fade_out_voice(duration=0.05)
+                    ok = False
+                if ok:
+                    with active_lock:
+                        prev = active["voice"]
+                        active["voice"] = (req_id, am.current_voice_channel, time.time())
+                    if prev is not None:
+                        # 被新语音顶替（正在淡出）的旧语音视为完成
+                        send(("done", prev[0], time.time() - prev[2]))
+                send(("result", req_id, ok, latency_ms))
+            elif cmd == "music":
+                _, req_id, path, loop, sent_ts, deadline = msg
+                ok = am.play_background(path, loop=loop)
+                if ok and time.time() > deadline:
+                    am.stop_background()
+                    ok = False
+                send(("result", req_id, ok, (time.time() - sent_ts) * 1000.0))
+            elif cmd == "clips":
+                am.register_clips(msg[1])
+            elif cmd == "volume":
+                am.set_global_volume(msg[1])
+            elif cmd == "fade":
+                am.fade_out_voice(duration=msg[1])
+            elif cmd == "duck":
+                am.duck_background(msg[1])
+            elif cmd == "music_fadeout":
+                am.fadeout_background(msg[1])
+            elif cmd == "music_stop":
+                am.stop_background()
+            elif cmd in ("preload", "release", "phrase", "clear_phrases"):
+                preload_tasks.put(msg)
+            elif cmd == "quit":
+                break
+        except Exception as e:
+            print(f"[AudioEngine] 命令 {cmd} 执行失败: {e}")
+            if cmd in ("play", "sequence", "music"):
+                send(("result", msg[1], False, 0.0))
+
+    stop_flag.set()
+    try:
+        import pygame
+        pygame.mixer.quit()
+    except Exception:
+        pass
+
+
+# =============== 主进程代理 ===============
+
+class AudioEngineClient:
+    """
+    与 AudioManager 接口一致的代理，FlightAnnouncer 可以无感替换。
+    """
+
+    # 截止时间之后再等这么久，让子进程在截止前得出的结果有时间送达
+    RESULT_GRACE_SEC = 1.0
+
+    def __init__(self, start_timeout=10.0, request_timeout=10.0, engine_main=_engine_main):
+        """
+        request_timeout: 播放请求的截止时间（秒）。冷启动解码、排在慢命令后面都可能超过 1 秒，
+        这里只用来兜底子进程卡死的情况；engine_main 为子进程入口（测试替换用）。
+        """
+        self.request_timeout = request_timeout
+        self.voice_volume = 1.0
+        self.on_voice_finished = None     # 回调 (path, 播放秒数)
+        self.latencies_ms = deque(maxlen=200)
+        self.engine_stats = {}            # 子进程定期回报的缓存统计
+
+        self._ids = itertools.count(1)
+        self._pending = {}                # req_id -> [Event, ok]
+        self._paths = {}                  # req_id -> path（用于完成回调）
+        self._voice_req = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+        ctx = mp.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._proc = ctx.Process(target=engine_main, args=(child_conn,),
+                                 name="CabinAudioEngine", daemon=True)
+        self._proc.start()
+        child_conn.close()
+
+        if not self._conn.poll(start_timeout):
+            self._proc.terminate()
+            raise RuntimeError("音频引擎进程启动超时")
+        first = self._conn.recv()
+        if first[0] != "ready":
+            self._proc.join(timeout=1)
+            raise RuntimeError(f"音频引擎初始化失败: {first[1] if len(first) > 1 else first}")
+
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    # ---------- 内部 ----------
+
+    def _send(self, msg):
+        with self._send_lock:
+            try:
+                self._conn.send(msg)
+                return True
+            except (BrokenPipeError, EOFError, OSError) as e:
+                print(f"[AudioEngine] 发送命令失败: {e}")
+                return False
+
+    def _request(self, cmd, *args):
+        """
+        发送需要回执的命令并等待子进程的结果，返回 (req_id, ok)。
+        命令带上截止时间，子进程超时后不会再播放，这里判为失败时声音也确实没有播出。
+        """
+        req_id = next(self._ids)
+        waiter = [threading.Event(), False]
+        with self._lock:
+            self._pending[req_id] = waiter
+            if cmd in ("play", "sequence"):
+                # 先登记路径：短语音的 done 可能比回执更早到达
+                self._paths[req_id] = args[0] if cmd == "play" else phrase_key(*args)
+                self._voice_req = req_id
+        sent_ts = time.time()
+        sent = self._send((cmd, req_id) + args + (sent_ts, sent_ts + self.request_timeout))
+        if sent:
+            waiter[0].wait(self.request_timeout + self.RESULT_GRACE_SEC)
+        with self._lock:
+            self._pending.pop(req_id, None)
+            if cmd in ("play", "sequence") and not waiter[1]:
+                self._paths.pop(req_id, None)
+                if self._voice_req == req_id:
+                    self._voice_req = None
+        return req_id, waiter[1]
+
+    def _read_loop(self):
+        while True:
+            try:
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = msg[0]
+            if kind == "result":
+                _, req_id, ok, latency_ms = msg
+                self.latencies_ms.append(latency_ms)
+                with self._lock:
+                    waiter = self._pending.get(req_id)
+                if waiter is not None:
+                    waiter[1] = ok
+                    waiter[0].set()
+            elif kind == "stats":
+                self.engine_stats = msg[1]
+            elif kind == "done":
+                _, req_id, played_sec = msg
+                with self._lock:
+                    path = self._paths.pop(req_id, None)
+                    if self._voice_req == req_id:
+                        self._voice_req = None
+                cb = self.on_voice_finished
+                if cb is not None and path is not None:
+                    try:
+                        cb(path, played_sec)
+                    except Exception as e:
+                        print(f"[AudioEngine] 完成回调异常: {e}")
+
+    # ---------- 与 AudioManager 一致的接口 ----------
+
+    def play_voice(self, file):
+        return self._request("play", file)[1]
+
+    def play_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        return self._request("sequence", list(files), crossfade_ms)[1]
+
+    def prepare_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        self._send(("phrase", list(files), crossfade_ms))
+        return True
+
+    def clear_phrases(self):
+        self._send(("clear_phrases",))
+
+    def play_background(self, file, loop=True):
+        return self._request("music", file, loop)[1]
+
+    def set_global_volume(self, volume):
+        self.voice_volume = max(0.0, min(1.0, float(volume)))
+        self._send(("volume", self.voice_volume))
+
+    def get_global_volume(self):
+        return self.voice_volume
+
+    def fade_out_voice(self, duration=1.0):
+        self._send(("fade", duration))
+
+    def duck_background(self, level):
+        self._send(("duck", level))
+
+    def fadeout_background(self, ms):
+        self._send(("music_fadeout", ms))
+
+    def stop_background(self):
+        self._send(("music_stop",))
+
+    def preload(self, file):
+        self._send(("preload", file))
+        return True
+
+    def release(self, file):
+        self._send(("release", file))
+
+    def register_clips(self, hashes):
+        self._send(("clips", dict(hashes)))
+
+    def voice_busy(self):
+        return self._voice_req is not None
+
+    def cache_stats(self):
+        return dict(self.engine_stats)
+
+    def average_latency_ms(self):
+        samples = list(self.latencies_ms)
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def close(self):
+        self._send(("quit",))
+        self._proc.join(timeout=2)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        try:
+            self._conn.close()
+        except Exception:
+            pass
@@ -1,60 +1,388 @@
 import pygame
 import threading
 import time
-from collections import deque
+from collections import deque, OrderedDict
+
+from pack_archive import open_archive, resolve_ref, split_ref
+from pack_manifest import DEFAULT_MIXER_FORMAT
+from phrase_engine import DEFAULT_CROSSFADE_MS, concat_pcm, phrase_key
+from voice_stream import (STREAM_CHANNELS, ArchiveChunkSource, VoiceStream, WavChunkSource,
+                          mixer_format, wav_duration)
 
 
 class AudioManager:
-    def __init__(self):
-        pygame.mixer.init()
+    def __init__(self, cache_size=64, cache_budget_mb=96):
+        if not pygame.mixer.get_init():
+            # 固定 mixer 格式，与语音包清单 / 编译归档保持一致
+            rate, width, channels = DEFAULT_MIXER_FORMAT
+            pygame.mixer.init(frequency=rate, size=-8 * width, channels=channels)
+        # 预留流式语音专用 Channel，普通 Sound.play() 不会占用
+        pygame.mixer.set_reserved(len(STREAM_CHANNELS))
         self.background_volume = 1.0
         self.voice_volume = 1.0
+        self.duck_level = 1.0              # 背景音乐闪避系数（1.0 = 不闪避）
         self.current_voice_channel = None  # 用来存放 Channel
         self.current_voice_sound = None    # 用来存放 Sound 对象
+        self.current_stream = None         # 流式播放时的 VoiceStream
         self.fading_out = False
         self.lock = threading.Lock()
 
+        # 已解码语音缓存（缓存键 -> Sound），按最近使用淘汰，条数和字节数双重上限。
+        # 缓存键是内容哈希（"sha1:..."，由 register_clips 登记），不同语音包里的同一段音频
+        # 共用一份解码数据（编译归档里的语音用归档内容哈希，不与原始文件混用）；未登记的路径用路径本身
+        self.clip_cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_budget = int(cache_budget_mb * 2 ** 20)
+        self.cache_bytes = 0
+        self._sizes = {}                 # 缓存键 -> 解码字节数（缓存与锁定的都在内）
+        self.content_keys = {}           # 路径 / 归档引用 -> 内容键
+        # 预取锁定的语音（缓存键 -> Sound），不参与淘汰；同一内容可被多个路径锁定
+        self.pinned = {}
+        self.pin_paths = {}              # 锁定的路径 -> 缓存键
+        self.cache_lock = threading.Lock()
+        # 拼接好的动态播报（内容键 -> Sound）
+        self.phrase_cache = OrderedDict()
+        self.phrase_cache_size = 8
+        # 缓存统计（指标端点读取）
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # 超过该时长的语音走流式播放（只解码正在播的一小块）
+        self.stream_threshold_sec = 20.0
+
     def set_global_volume(self, volume):
+        volume = max(0.0, min(1.0, float(volume)))
         self.background_volume = volume
         self.voice_volume = volume
 
         try:
-            if pygame.mixer.music.get_busy():
-                pygame.mixer.music.set_volume(self.background_volume)
+            pygame.mixer.music.set_volume(self.background_volume * self.duck_level)
 
             if self.current_voice_channel and self.current_voice_channel.get_busy():
                 self.current_voice_channel.set_volume(self.voice_volume)
         except Exception as e:
             print(f"更新音量失败: {e}")
 
+    def get_global_volume(self):
+        return self.voice_volume
+
     def play_background(self, file, loop=True):
         try:
             pygame.mixer.music.load(file)
+            pygame.mixer.music.set_volume(self.background_volume * self.duck_level)
             pygame.mixer.music.play(-1 if loop else 0)
-            pygame.mixer.music.set_volume(self.background_volume)
             return True
         except Exception as e:
             print(f"播放背景音乐失败: {e}")
             return False
 
+    def fadeout_background(self, ms):
+        try:
+            pygame.mixer.music.fadeout(int(ms))
+        except Exception:
+            self.stop_background()
+
+    def stop_background(self):
+        try:
+            pygame.mixer.music.stop()
+        except Exception:
+            pass
+
+    def duck_background(self, level):
+        """
+        背景音乐闪避：按 level（0.0 ~ 1.0）压低音量，1.0 恢复。
+        """
+        self.duck_level = max(0.0, min(1.0, float(level)))
+        try:
+            pygame.mixer.music.set_volume(self.background_volume * self.duck_level)
+        except Exception as e:
+            print(f"背景音乐闪避失败: {e}")
+
+    def voice_busy(self):
+        try:
+            return bool(self.current_voice_channel and self.current_voice_channel.get_busy())
+        except Exception:
+            return False
+
+    # =============== 内容键缓存 ===============
+
+    def register_clips(self, hashes):
+        """
+        登记 路径 / 归档引用 -> 内容 sha1（原始文件来自语音包清单，归档引用来自归档内容），
+        之后按内容共享解码数据。
+        """
+        with self.cache_lock:
+            for path, sha1 in hashes.items():
+                if sha1:
+                    self.content_keys[path] = "sha1:" + sha1
+
+    def _cache_key(self, file):
+        return self.content_keys.get(file, file)
+
+    @staticmethod
+    def _sound_bytes(sound):
+        fmt = mixer_format()
+        if fmt is None:
+            return 0
+        rate, width, channels = fmt
+        return int(sound.get_length() * rate) * width * channels
+
+    def _cache_put(self, key, sound):
+        """放入 LRU（调用方持有 cache_lock），超出条数或字节预算时从最旧的开始淘汰"""
+        if key not in self._sizes:
+            self._sizes[key] = self._sound_bytes(sound)
+        if key not in self.clip_cache:
+            self.cache_bytes += self._sizes[key]
+        self.clip_cache[key] = sound
+        self.clip_cache.move_to_end(key)
+        while self.clip_cache and (len(self.clip_cache) > self.cache_size or self.cache_bytes > self.cache_budget):
+            old, _ = self.clip_cache.popitem(last=False)
+            self.cache_bytes -= self._sizes.get(old, 0)
+            if old not in self.pinned:
+                self._sizes.pop(old, None)
+            if old == key:
+                break
+
+    def _cache_pop(self, key):
+        sound = self.clip_cache.pop(key, None)
+        if sound is not None:
+            self.cache_bytes -= self._sizes.get(key, 0)
+        return sound
+
+    def _load_sound(self, file):
+        """
+        取得已解码的 Sound：命中缓存直接返回，否则解码并放入缓存。
+        """
+        key = self._cache_key(file)
+        with self.cache_lock:
+            sound = self.pinned.get(key)
+            if sound is not None:
+                self.cache_hits += 1
+                return sound
+            sound = self.clip_cache.get(key)
+            if sound is not None:
+                self.clip_cache.move_to_end(key)
+                self.cache_hits += 1
+                return sound
+            self.cache_misses += 1
+        sound = self._decode(file)
+        with self.cache_lock:
+            self._cache_put(key, sound)
+        return sound
+
+    def _decode(self, file):
+        """
+        普通文件交给 pygame 解码；归档引用直接用映射区的 PCM 构造 Sound。
+        """
+        if split_ref(file) is None:
+            return pygame.mixer.Sound(file)
+        view, fmt = resolve_ref(file)
+        if fmt != mixer_format():
+            raise ValueError(f"语音包归档格式 {fmt} 与 mixer 不一致")
+        return pygame.mixer.Sound(buffer=view)
+
+    def _peek_sound(self, file):
+        """
+        取片段的 Sound：已缓存 / 已锁定的直接用，否则临时解码（不挤占语音缓存）。
+        """
+        key = self._cache_key(file)
+        with self.cache_lock:
+            sound = self.pinned.get(key)
+            if sound is None:
+                sound = self.clip_cache.get(key)
+        return sound if sound is not None else self._decode(file)
+
+    def prepare_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        """
+        把多个片段拼成一段 Sound（带交叉淡化）并缓存；同样的片段序列直接命中。
+        """
+        with self.cache_lock:
+            # 按内容键算拼接键：不同语音包里相同的片段序列共用一段拼接结果
+            key = phrase_key([self._cache_key(f) for f in files], crossfade_ms)
+            sound = self.phrase_cache.get(key)
+            if sound is not None:
+                self.phrase_cache.move_to_end(key)
+                self.cache_hits += 1
+                return sound
+            self.cache_misses += 1
+        fmt = mixer_format()
+        if fmt is None:
+            raise ValueError("mixer 不是 16 位格式，无法拼接语音")
+        chunks = [self._peek_sound(f).get_raw() for f in files]
+        sound = pygame.mixer.Sound(buffer=concat_pcm(chunks, fmt, crossfade_ms))
+        with self.cache_lock:
+            self.phrase_cache[key] = sound
+            while len(self.phrase_cache) > self.phrase_cache_size:
+                self.phrase_cache.popitem(last=False)
+        return sound
+
+    def decoded_bytes(self):
+        """
+        当前持有的已解码 PCM 字节数（缓存、锁定、拼接语音和正在播放的那段，同一对象只算一次）。
+        """
+        if mixer_format() is None:
+            return None
+        with self.cache_lock:
+            total = sum(self._sizes.values())
+            extra = list(self.phrase_cache.values())
+            held = {id(s) for s in self.clip_cache.values()} | {id(s) for s in self.pinned.values()}
+        if self.current_voice_sound is not None and id(self.current_voice_sound) not in held:
+            extra.append(self.current_voice_sound)
+        return total + sum(self._sound_bytes(s) for s in extra)
+
+    def cache_stats(self):
+        with self.cache_lock:
+            stats = {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "cached": len(self.clip_cache),
+                "cache_bytes": self.cache_bytes,
+                "pinned": len(self.pinned),
+                "phrases": len(self.phrase_cache),
+                # 登记过的路径数与不同内容数之差 = 因内容相同而省掉的解码份数
+                "shared": len(self.content_keys) - len(set(self.content_keys.values())),
+            }
+        stats["decoded_bytes"] = self.decoded_bytes()
+        return stats
+
+    def clear_phrases(self):
+        with self.cache_lock:
+            self.phrase_cache.clear()
+
+    def _should_stream(self, file):
+        if mixer_format() is None:
+            return False
+        ref = split_ref(file)
+        if ref is not None:
+            try:
+                duration = open_archive(ref[0]).duration(ref[1])
+            except Exception:
+                return False
+        else:
+            duration = wav_duration(file)
+        return duration is not None and duration > self.stream_threshold_sec
+
+    def _stream_channel(self):
+        """挑一个空闲的流式 Channel；都忙时用不是当前语音的那一路"""
+        channels = [pygame.mixer.Channel(i) for i in STREAM_CHANNELS]
+        for ch in channels:
+            if not ch.get_busy():
+                return ch
+        for ch in channels:
+            if ch != self.current_voice_channel:
+                return ch
+        return channels[0]
+
+    def _play_stream(self, file):
+        channel = self._stream_channel()
+        channel.stop()
+        if split_ref(file) is not None:
+            view, fmt = resolve_ref(file)
+            if fmt != mixer_format():
+                return False
+            source = ArchiveChunkSource(view, fmt)
+        else:
+            source = WavChunkSource(file, mixer_format())
+        stream = VoiceStream(source, channel, self.voice_volume)
+        if not stream.start():
+            return False
+        self.current_stream = stream
+        self.current_voice_sound = None
+        self.current_voice_channel = channel
+        return True
+
+    def preload(self, file):
+        """
+        解码并锁定语音（预取线程调用），播放时直接命中。
+        长语音走流式播放，不做整段预解码。
+        """
+        if self._should_stream(file):
+            return True
+        key = self._cache_key(file)
+        with self.cache_lock:
+            if key in self.pinned:
+                self.pin_paths[file] = key
+                return True
+            sound = self._cache_pop(key)
+        if sound is None:
+            try:
+                sound = self._decode(file)
+            except Exception as e:
+                print(f"预加载语音失败: {e}")
+                return False
+        with self.cache_lock:
+            self._sizes.setdefault(key, self._sound_bytes(sound))
+            self.pinned.setdefault(key, sound)
+            self.pin_paths[file] = key
+        return True
+
+    def release(self, file):
+        """
+        解除该路径的锁定。按内容键共享的语音在没有其他路径锁定时退回 LRU 缓存，
+        切回别的语音包时还能直接命中；未登记内容键的语音（可能已被改写）直接丢弃。
+        正在播放的 Sound 由 Channel 自己持有。
+        """
+        with self.cache_lock:
+            key = self.pin_paths.pop(file, None) or self._cache_key(file)
+            if key in self.pin_paths.values():
+                return
+            sound = self.pinned.pop(key, None)
+            if key.startswith("sha1:"):
+                if sound is not None:
+                    self._cache_put(key, sound)
+            else:
+                self._cache_pop(key)
+                self._sizes.pop(key, None)
+
     def play_voice(self, file):
         with self.lock:
             if self.current_voice_channel and self.current_voice_channel.get_busy():
                 self._fade_out_current_voice()
 
             try:
-                self.current_voice_sound = pygame.mixer.Sound(file)
-                self.current_voice_channel = self.current_voice_sound.play()
-                if self.current_voice_channel:
-                    self.current_voice_channel.set_volume(self.voice_volume)
-                    return True
-                else:
-                    print("播放语音失败: 无法获得 Channel")
+                if self._should_stream(file):
+                    if self._play_stream(file):
+                        return True
+                    print("播放语音失败: 流式读取失败")
                     return False
+
+                return self._play_sound(self._load_sound(file))
+            except Exception as e:
+                print(f"播放语音失败: {e}")
+                return False
+
+    def play_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        """
+        播放拼接语音（已预先拼好时立即开始）。
+        """
+        try:
+            sound = self.prepare_sequence(files, crossfade_ms)
+        except Exception as e:
+            print(f"拼接语音失败: {e}")
+            return False
+        with self.lock:
+            if self.current_voice_channel and self.current_voice_channel.get_busy():
+                self._fade_out_current_voice()
+            try:
+                return self._play_sound(sound)
             except Exception as e:
                 print(f"播放语音失败: {e}")
                 return False
 
+    def _play_sound(self, sound):
+        self.current_stream = None
+        self.current_voice_sound = sound
+        self.current_voice_channel = sound.play()
+        if self.current_voice_channel:
+            self.current_voice_channel.set_volume(self.voice_volume)
+            return True
+        print("播放语音失败: 无法获得 Channel")
+        return False
+
+    def fade_out_voice(self, duration=1.0):
+        with self.lock:
+            self._fade_out_current_voice(duration=duration)
+
     def _fade_out_current_voice(self, duration=1.0, steps=30):
         if not self.current_voice_channel or not self.current_voice_channel.get_busy():
             return
@@ -62,6 +390,9 @@ class AudioManager:
             return
 
         self.fading_out = True
+        # 固定住要淡出的 Channel：play_voice 随后会替换 current_voice_channel
+        channel = self.current_voice_channel
+        stream = self.current_stream
 
         def fade_thread():
             step_volume = self.voice_volume / steps
@@ -69,12 +400,14 @@ class AudioManager:
             for i in range(steps):
                 new_volume = max(0, self.voice_volume - step_volume * (i + 1))
                 try:
-                    self.current_voice_channel.set_volume(new_volume)
+                    channel.set_volume(new_volume)
                 except:
                     pass
                 time.sleep(delay)
+            if stream is not None:
+                stream.stop()
             try:
-                self.current_voice_channel.stop()
+                channel.stop()
             except:
                 pass
             self.fading_out = False
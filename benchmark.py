@@ -0,0 +1,362 @@
+"""
+性能基准（可在 Linux 无界面运行：SDL dummy 音频驱动 + Qt offscreen）：
+- clip_decode / clip_start：语音解码、开始播放延迟（冷 / 热缓存）
+- pack_load：按语音包大小统计清单生成（首次）与加载（清单命中）耗时
+- detect_tick：检测线程单拍（_process_frame）吞吐
+- event_bridge：后端 event_signal -> 前端事件队列 -> UI 槽函数的延迟
+- session_memory：一个完整会话（后端 + 语音包）的内存增量
+
+    python benchmark.py --json bench.json
+    python benchmark.py --baseline bench_baseline.json        # 与基线对比，退化超过阈值时返回 1
+    python benchmark.py --only pack_load detect_tick
+缺少 pygame / PyQt5 的基准会记为 skipped，不影响其他项。
+"""
+import os
+
+# 必须在导入 pygame / Qt 之前设置
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import json
+import math
+import platform
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+from pack_manifest import MANIFEST_NAME, load_manifest
+
+# =============== 工具 ===============
+
+
+def _percentiles(samples_ms):
+    samples = sorted(samples_ms)
+    if not samples:
+        return {}
+    return {
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean": statistics.fmean(samples) if hasattr(statistics, "fmean") else statistics.mean(samples),
+    }
+
+
+def _rss_bytes():
+    """当前常驻内存（Linux 读 /proc，其他平台返回 None）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_tone(path, seconds, rate=44100, channels=2, freq=440.0):
+    frames = int(seconds * rate)
+    one = [int(8000 * math.sin(2 * math.pi * freq * i / rate)) for i in range(rate // 10)]
+    samples = (one * (frames // len(one) + 1))[:frames]
+    data = struct.pack("<%dh" % (frames * channels),
+                       *[s for s in samples for _ in range(channels)])
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(data)
+
+
+def make_pack(folder, clips, seconds=2.0):
+    """生成测试语音包：clips 条 WAV，名字与阶段语音一致的在前"""
+    os.makedirs(folder, exist_ok=True)
+    names = ["safety_briefing", "taxi_check", "takeoff", "climb", "cruise", "descent",
+             "landing", "arrival", "deboarding"]
+    names += [f"clip_{i:04d}" for i in range(max(0, clips - len(names)))]
+    for name in names[:clips]:
+        _write_tone(os.path.join(folder, name + ".wav"), seconds)
+    return folder
+
+
+def _result(value, unit, better="lower", **extra):
+    out = {"value": value, "unit": unit, "better": better}
+    out.update(extra)
+    return out
+
+
+# =============== 基准项 ===============
+
+def bench_pack_load(workdir, sizes=(10, 50, 200)):
+    results = {}
+    for size in sizes:
+        folder = make_pack(os.path.join(workdir, f"pack_{size}"), size, seconds=1.0)
+        manifest = os.path.join(folder, MANIFEST_NAME)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        started = time.perf_counter()
+        load_manifest(folder)
+        cold = (time.perf_counter() - started) * 1000.0
+        started = time.perf_counter()
+        for _ in range(5):
+            load_manifest(folder)
+        warm = (time.perf_counter() - started) * 1000.0 / 5
+        results[f"pack_load_cold_{size}"] = _result(round(cold, 3), "ms")
+        results[f"pack_load_warm_{size}"] = _result(round(warm, 3), "ms")
+    return results
+
+
+def bench_audio(workdir, rounds=30):
+    import pygame
+    from audio_manager import AudioManager
+
+    folder = make_pack(os.path.join(workdir, "audio_pack"), 9, seconds=3.0)
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".wav"))
+    am = AudioManager(cache_size=4)
+
+    decode_ms = []
+    for i in range(rounds):
+        path = files[i % len(files)]
+        am.release(path)
+        started = time.perf_counter()
+        am._load_sound(path)
+        decode_ms.append((time.perf_counter() - started) * 1000.0)
+
+    cold_ms, warm_ms = [], []
+    for i in range(rounds):
+        path = files[i % len(files)]
+        am.release(path)
+        started = time.perf_counter()
+        am.play_voice(path)
+        cold_ms.append((time.perf_counter() - started) * 1000.0)
+        am.preload(path)
+        started = time.perf_counter()
+        am.play_voice(path)
+        warm_ms.append((time.perf_counter() - started) * 1000.0)
+    pygame.mixer.stop()
+
+    d, c, w = _percentiles(decode_ms), _percentiles(cold_ms), _percentiles(warm_ms)
+    return {
+        "clip_decode_p50": _result(round(d["p50"], 3), "ms", p95=round(d["p95"], 3)),
+        "clip_start_cold_p50": _result(round(c["p50"], 3), "ms", p95=round(c["p95"], 3)),
+        "clip_start_warm_p50": _result(round(w["p50"], 3), "ms", p95=round(w["p95"], 3)),
+    }
+
+
+def _make_announcer(workdir, **kwargs):
+    """
+    基准用的 FlightAnnouncer：数据文件（日志库、快照、报告）写到 workdir，
+    语音包用 workdir/sounds 下的合成包，不读也不监视程序目录下的 sounds/。
+    """
+    import fake_pyuipc
+    fake_pyuipc.install()
+    from flight_announcer import FlightAnnouncer
+
+    sounds_path = os.path.join(workdir, "sounds")
+    default_pack = os.path.join(sounds_path, "CES")
+    if not os.path.isdir(default_pack):
+        # 与默认语音包同名，构造时直接加载
+        make_pack(default_pack, 9, seconds=1.0)
+    data_path = os.path.join(workdir, "data")
+    os.makedirs(data_path, exist_ok=True)
+    announcer = FlightAnnouncer(audio_process=False, data_path=data_path, sounds_path=sounds_path, **kwargs)
+    # 基准期间不需要热重载
+    announcer.pack_watcher.stop()
+    announcer.min_gap_sec = 0.0
+    announcer.gap_jitter_sec = 0.0
+    return announcer
+
+
+def bench_detect_tick(workdir, flights=3):
+    from PyQt5.QtCore import Qt
+
+    from flight_phases import INPUT_DESCENT_PRESSED
+    from flight_profile import FlightProfile
+    from offline_render import VirtualClock
+    from power_monitor import FULL_INTERVAL
+
+    profile = FlightProfile(cruise_sec=1800, gate_sec=120)
+    frames = []
+    t = 0.0
+    while t < profile.duration:
+        s = profile.sample(t)
+        frames.append((t, s.light_bits, s.tas_raw, s.alt_raw, s.seatbelt_raw, s.inputs))
+        t += FULL_INTERVAL
+
+    elapsed = 0.0
+    phases = []
+    for _ in range(flights):
+        # 每个航班一个新实例（下客后状态机停在 deboarding）；虚拟时钟让派生信号、定时播报按真实节拍走
+        clock = VirtualClock()
+        announcer = _make_announcer(workdir, clock=clock.time, sleep=clock.sleep)
+        announcer.event_signal.connect(
+            lambda event_type, data: phases.append(data) if event_type == "phase" else None, Qt.DirectConnection)
+        try:
+            prev_inputs = 0
+            started = time.perf_counter()
+            for t, light_bits, tas_raw, alt_raw, seatbelt_raw, inputs in frames:
+                clock.advance_to(clock.start + t)
+                if inputs & ~prev_inputs & INPUT_DESCENT_PRESSED:
+                    announcer.prepare_descent()
+                prev_inputs = inputs
+                announcer._process_frame(light_bits, tas_raw, alt_raw, seatbelt_raw)
+            elapsed += time.perf_counter() - started
+        finally:
+            announcer.shutdown()
+    ticks = len(frames) * flights
+    return {
+        "detect_ticks_per_sec": _result(round(ticks / elapsed), "ticks/s", better="higher"),
+        "detect_tick_us": _result(round(elapsed * 1e6 / ticks, 2), "us", phase_changes=len(phases)),
+    }
+
+
+def bench_event_bridge(workdir, events=200):
+    import fake_pyuipc
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    fake_pyuipc.install()
+    import app_ui
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    win = app_ui.GlassWindow()
+    latencies = []
+
+    def on_log(text):
+        if text.startswith("bench "):
+            latencies.append((time.perf_counter() - float(text[6:])) * 1000.0)
+
+    win.event_handler.log_event.connect(on_log)
+    announcer = win.announcer_thread.announcer
+
+    def producer():
+        for _ in range(events):
+            announcer.event_signal.emit("log", f"bench {time.perf_counter()}")
+            time.sleep(0.01)
+
+    threading.Thread(target=producer, daemon=True).start()
+    deadline = time.time() + events * 0.01 + 2.0
+    timer = QTimer()
+    timer.timeout.connect(lambda: app.quit() if len(latencies) >= events or time.time() > deadline else None)
+    timer.start(50)
+    app.exec_()
+    win.close()
+
+    p = _percentiles(latencies)
+    return {
+        "event_bridge_p50": _result(round(p.get("p50", float("nan")), 3), "ms", p95=round(p.get("p95", 0.0), 3)),
+        "event_bridge_delivered": _result(len(latencies), "events", better="higher"),
+    }
+
+
+def bench_session_memory(workdir):
+    before = _rss_bytes()
+    announcer = _make_announcer(workdir)
+    folder = make_pack(os.path.join(workdir, "sounds", "BENCH"), 30, seconds=3.0)
+    announcer.load_sound_folder("BENCH")
+    for key in list(announcer.sound_files)[:10]:
+        announcer.audio_manager.preload(announcer.sound_files[key])
+    after = _rss_bytes()
+    announcer.shutdown()
+    shutil.rmtree(folder, ignore_errors=True)
+    if before is None or after is None:
+        return {}
+    return {"session_memory_mb": _result(round((after - before) / 2 ** 20, 2), "MiB")}
+
+
+BENCHMARKS = {
+    "pack_load": bench_pack_load,
+    "audio": bench_audio,
+    "detect_tick": bench_detect_tick,
+    "event_bridge": bench_event_bridge,
+    "session_memory": bench_session_memory,
+}
+
+
+# =============== 运行与对比 ===============
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None):
+    names = names or list(BENCHMARKS)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": {},
+        "skipped": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="cabin_bench_")
+    try:
+        for name in names:
+            started = time.perf_counter()
+            try:
+                results = BENCHMARKS[name](workdir)
+            except ImportError as e:
+                report["skipped"][name] = f"缺少依赖: {e}"
+                print(f"[{name}] 跳过（缺少依赖: {e}）")
+                continue
+            report["results"].update(results)
+            print(f"[{name}] 完成（{time.perf_counter() - started:.1f}s）")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, threshold=0.10):
+    """
+    与基线对比，返回退化项列表 [(名称, 基线, 当前, 变化比例)]。
+    """
+    regressions = []
+    for name, cur in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("value") or cur.get("value") is None:
+            continue
+        change = (cur["value"] - base["value"]) / abs(base["value"])
+        worse = change > threshold if cur.get("better", "lower") == "lower" else change < -threshold
+        mark = "退化" if worse else ""
+        print(f"  {name:<28} {base['value']:>12} -> {cur['value']:>12} {cur['unit']:<8} {change:+7.1%} {mark}")
+        if worse:
+            regressions.append((name, base["value"], cur["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="客舱语音系统性能基准")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只运行指定的基准")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="视为退化的变化比例（默认 10%%）")
+    args = parser.parse_args(argv)
+
+    report = run(args.only)
+    for name, res in report["results"].items():
+        print(f"  {name:<28} {res['value']:>12} {res['unit']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"结果已写入 {args.json}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"与基线对比（{baseline.get('meta', {}).get('revision')}）：")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 项退化超过 {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+下一阶段语音预取：
+- 阶段切换时只把任务丢进队列，触发路径不做任何解码
+- 后台线程解码并锁定（pin）接下来几个阶段要用的语音
+- 已经过去的阶段的语音立即释放，内存峰值只与预取窗口有关
+"""
+import queue
+import threading
+
+from flight_phases import upcoming_clips
+
+
+class ClipPrefetcher:
+    def __init__(self, audio_manager, resolve, lookahead=2):
+        """
+        audio_manager: 需提供 preload(path) / release(path)
+        resolve: 语音键 -> 文件路径（找不到返回 None）
+        """
+        self.audio_manager = audio_manager
+        self.resolve = resolve
+        self.lookahead = lookahead
+
+        self.pinned = {}          # 语音键 -> 已锁定的路径
+        self._lock = threading.Lock()
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="ClipPrefetcher", daemon=True)
+        self._thread.start()
+
+    def on_phase(self, phase):
+        """
+        阶段切换时调用（检测线程），只做集合运算和入队。
+        """
+        wanted = {}
+        for key in upcoming_clips(phase, self.lookahead):
+            path = self.resolve(key)
+            if path:
+                wanted[key] = path
+
+        with self._lock:
+            for key, path in list(self.pinned.items()):
+                if wanted.get(key) != path:
+                    del self.pinned[key]
+                    self._tasks.put(("release", path))
+            for key, path in wanted.items():
+                if key not in self.pinned:
+                    self.pinned[key] = path
+                    self._tasks.put(("preload", path))
+
+    def reset(self, phase):
+        """
+        切换语音包后调用：释放旧包的语音，按当前阶段重新预取。
+        """
+        with self._lock:
+            for path in self.pinned.values():
+                self._tasks.put(("release", path))
+            self.pinned = {}
+        self.on_phase(phase)
+
+    def invalidate(self, paths, phase):
+        """
+        热重载后调用：paths 中已锁定的语音重新解码，再按当前阶段补齐预取。
+        """
+        paths = set(paths)
+        with self._lock:
+            for key, path in list(self.pinned.items()):
+                if path in paths:
+                    del self.pinned[key]
+        self.on_phase(phase)
+
+    def prepare_phrase(self, files, crossfade_ms):
+        """
+        后台拼接动态播报（即将用到的模板），播放时直接命中拼接缓存。
+        """
+        self._tasks.put(("phrase", (list(files), crossfade_ms)))
+
+    def stop(self):
+        self._tasks.put(None)
+
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            action, path = task
+            try:
+                if action == "preload":
+                    self.audio_manager.preload(path)
+                elif action == "phrase":
+                    self.audio_manager.prepare_sequence(*path)
+                else:
+                    self.audio_manager.release(path)
+            except Exception as e:
+                print(f"[ClipPrefetcher] {action} {path} 失败: {e}")
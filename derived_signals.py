@@ -0,0 +1,342 @@
+"""
+派生信号（垂直速度、加速度、稳定窗口）：
+- RollingWindow：定长环形缓冲 + 滑动累加和，每个样本 O(1) 得到回归斜率、均值、方差；
+  最小 / 最大值用单调队列维护（均摊 O(1)）
+- DebouncedPredicate：布尔条件去抖，记录连续成立的时长（如“高度稳定 60 秒”）
+- DerivedSignals：把以上组合成状态机可直接使用的信号
+"""
+from collections import deque
+
+# 默认窗口参数
+DEFAULT_CONFIG = {
+    "vs_window_sec": 10.0,          # 垂直速度回归窗口
+    "accel_window_sec": 10.0,       # 加速度回归窗口
+    "stability_window_sec": 30.0,   # 高度稳定判断窗口（窗口内高度极差）
+    "stable_band_ft": 100.0,        # 窗口内高度极差不超过该值视为平飞
+    "stable_vs_fpm": 300.0,         # 且垂直速度绝对值不超过该值
+    "stable_release_sec": 2.0,      # 条件短暂不成立（颠簸）时的容忍时长
+}
+
+
+class RollingWindow:
+    """
+    按时间窗口滑动的样本序列。时间戳存为相对 t0 的偏移，
+    每淘汰 capacity 个样本重建一次累加和，避免长时间运行的浮点漂移。
+    """
+
+    def __init__(self, window_sec, capacity=512):
+        self.window_sec = window_sec
+        self.capacity = capacity
+        self._t = [0.0] * capacity
+        self._x = [0.0] * capacity
+        self._head = 0          # 最旧样本的下标
+        self._count = 0
+        self._seq = 0           # 已写入样本总数（单调队列用它判断过期）
+        self._t0 = None
+        self._evictions = 0
+        self._min = deque()     # (seq, x)，x 单调递增
+        self._max = deque()     # (seq, x)，x 单调递减
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self._st = self._sx = self._stt = self._stx = self._sxx = 0.0
+
+    def clear(self):
+        self._head = self._count = 0
+        self._t0 = None
+        self._min.clear()
+        self._max.clear()
+        self._reset_sums()
+
+    def __len__(self):
+        return self._count
+
+    def push(self, t, x):
+        if self._t0 is None:
+            self._t0 = t
+        rt = t - self._t0
+        while self._count and rt - self._t[self._head] > self.window_sec:
+            self._evict()
+        if self._count == self.capacity:
+            self._evict()
+
+        idx = (self._head + self._count) % self.capacity
+        self._t[idx] = rt
+        self._x[idx] = x
+        self._count += 1
+        self._st += rt
+        self._sx += x
+        self._stt += rt * rt
+        self._stx += rt * x
+        self._sxx += x * x
+
+        seq = self._seq
+        self._seq += 1
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((seq, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((seq, x))
+        if self._evictions >= self.capacity:
+            self._rebase()
+
+    def _evict(self):
+        rt = self._t[self._head]
+        x = self._x[self._head]
+        self._st -= rt
+        self._sx -= x
+        self._stt -= rt * rt
+        self._stx -= rt * x
+        self._sxx -= x * x
+        oldest_seq = self._seq - self._count
+        if self._min and self._min[0][0] <= oldest_seq:
+            self._min.popleft()
+        if self._max and self._max[0][0] <= oldest_seq:
+            self._max.popleft()
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        self._evictions += 1
+
+    def _rebase(self):
+        """把时间基准移到最旧样本，并从缓冲区重新累加（均摊 O(1)）"""
+        self._evictions = 0
+        self._reset_sums()
+        if not self._count:
+            self._t0 = None
+            return
+        shift = self._t[self._head]
+        self._t0 += shift
+        for i in range(self._count):
+            idx = (self._head + i) % self.capacity
+            rt = self._t[idx] - shift
+            x = self._x[idx]
+            self._t[idx] = rt
+            self._st += rt
+            self._sx += x
+            self._stt += rt * rt
+            self._stx += rt * x
+            self._sxx += x * x
+
+    # =============== 查询（全部 O(1)） ===============
+
+    def span(self):
+        if self._count < 2:
+            return 0.0
+        newest = (self._head + self._count - 1) % self.capacity
+        return self._t[newest] - self._t[self._head]
+
+    def mean(self):
+        return self._sx / self._count if self._count else 0.0
+
+    def variance(self):
+        if not self._count:
+            return 0.0
+        m = self._sx / self._count
+        return max(0.0, self._sxx / self._count - m * m)
+
+    def min(self):
+        return self._min[0][1] if self._min else 0.0
+
+    def max(self):
+        return self._max[0][1] if self._max else 0.0
+
+    def slope(self):
+        """最小二乘斜率（每秒变化量）；样本不足时返回 0"""
+        n = self._count
+        if n < 2:
+            return 0.0
+        denom = n * self._stt - self._st * self._st
+        if denom <= 1e-9:
+            return 0.0
+        return (n * self._stx - self._st * self._sx) / denom
+
+
+class DebouncedPredicate:
+    """
+    布尔条件去抖：连续成立 hold_sec 后 active 为 True；
+    不成立持续超过 release_sec 才复位（容忍短暂抖动）。
+    """
+
+    def __init__(self, hold_sec=0.0, release_sec=0.0):
+        self.hold_sec = hold_sec
+        self.release_sec = release_sec
+        self.active = False
+        self._true_since = None
+        self._false_since = None
+        self._held = 0.0
+
+    def reset(self):
+        self.active = False
+        self._true_since = None
+        self._false_since = None
+        self._held = 0.0
+
+    def update(self, t, value):
+        if value:
+            self._false_since = None
+            if self._true_since is None:
+                self._true_since = t
+        elif self._true_since is not None:
+            if self._false_since is None:
+                self._false_since = t
+            if t - self._false_since > self.release_sec:
+                self._true_since = None
+                self._false_since = None
+        self._held = (t - self._true_since) if self._true_since is not None else 0.0
+        self.active = self._true_since is not None and self._held >= self.hold_sec
+        return self.active
+
+    def held_for(self):
+        """条件已连续成立的秒数"""
+        return self._held
+
+
+class DerivedSignals:
+    def __init__(self, config=None, capacity=512):
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        cfg = self.config
+        self.altitude = RollingWindow(cfg["vs_window_sec"], capacity)
+        self.tas = RollingWindow(cfg["accel_window_sec"], capacity)
+        self.altitude_band = RollingWindow(cfg["stability_window_sec"], capacity)
+        self.stable = DebouncedPredicate(0.0, cfg["stable_release_sec"])
+
+    def reset(self):
+        """数据不连续（暂停、重连）后清空窗口"""
+        self.altitude.clear()
+        self.tas.clear()
+        self.altitude_band.clear()
+        self.stable.reset()
+
+    def update(self, t, altitude_ft, tas_knots):
+        """
+        输入一帧，返回派生信号（可直接合并进 decode_frame 的结果）。
+        """
+        cfg = self.config
+        self.altitude.push(t, altitude_ft)
+        self.tas.push(t, tas_knots)
+        self.altitude_band.push(t, altitude_ft)
+
+        vs_fpm = self.altitude.slope() * 60.0
+        band = self.altitude_band.max() - self.altitude_band.min()
+        level = band <= cfg["stable_band_ft"] and abs(vs_fpm) <= cfg["stable_vs_fpm"]
+        self.stable.update(t, level)
+        return {
+            "vertical_speed_fpm": vs_fpm,
+            "acceleration_kts": self.tas.slope(),
+            "altitude_band_ft": band,
+            "altitude_variance": self.altitude_band.variance(),
+            "altitude_stable": self.stable.active,
+            "altitude_stable_sec": self.stable.held_for(),
+        }
+
+
+def _window_starts(t, window_sec, capacity):
+    """每个样本所在滑动窗口的起始下标（与 RollingWindow 的淘汰规则一致）"""
+    import numpy as np
+
+    lo = np.searchsorted(t, t - window_sec, side="left")
+    return np.maximum(lo, np.arange(len(t)) - capacity + 1)
+
+
+def _range_reduce(x, lo, hi, fn):
+    """
+    对每个 [lo[i], hi[i]] 区间求 fn（np.minimum / np.maximum），稀疏表 O(n log n)。
+    """
+    import numpy as np
+
+    table = [x]
+    width = 1
+    while width * 2 <= int((hi - lo).max()) + 1:
+        prev = table[-1]
+        table.append(fn(prev[:-width], prev[width:]))
+        width *= 2
+    length = hi - lo + 1
+    level = np.floor(np.log2(length)).astype(np.int64)
+    out = np.empty(len(lo))
+    for k in np.unique(level):
+        sel = level == k
+        row = table[k]
+        out[sel] = fn(row[lo[sel]], row[hi[sel] - (1 << int(k)) + 1])
+    return out
+
+
+def _window_sums(lo, *columns):
+    """用前缀和取每个窗口 [lo[i], i] 的各列之和"""
+    import numpy as np
+
+    idx = np.arange(len(lo))
+    sums = []
+    for col in columns:
+        c = np.concatenate(([0.0], np.cumsum(col)))
+        sums.append(c[idx + 1] - c[lo])
+    return sums
+
+
+def _window_slope(t, x, lo):
+    import numpy as np
+
+    n = (np.arange(len(t)) - lo + 1).astype(np.float64)
+    st, sx, stt, stx = _window_sums(lo, t, x, t * t, t * x)
+    denom = n * stt - st * st
+    ok = (n >= 2) & (denom > 1e-9)
+    return np.where(ok, (n * stx - st * sx) / np.where(ok, denom, 1.0), 0.0)
+
+
+def _debounce_columns(t, value, hold_sec, release_sec):
+    """DebouncedPredicate 的整列版本，返回 (active, held_for)"""
+    import numpy as np
+
+    n = len(t)
+    idx = np.arange(n)
+    # 每段连续不成立的起点时间；超过 release_sec 的那些帧让计时复位
+    starts = ~value & np.r_[True, value[:-1]]
+    run_start = np.maximum.accumulate(np.where(starts, idx, 0))
+    killed = ~value & (t - t[run_start] > release_sec)
+    last_kill = np.maximum.accumulate(np.where(killed, idx, -1))
+    # 复位之后第一次成立的帧就是计时起点
+    next_true = np.minimum.accumulate(np.where(value, idx, n)[::-1])[::-1]
+    since = np.r_[next_true, n][last_kill + 1]
+    timing = since <= idx
+    held = np.where(timing, t - t[np.minimum(since, n - 1)], 0.0)
+    return timing & (held >= hold_sec), held
+
+
+def derived_columns(timestamps, altitude_ft, tas_knots, config=None, capacity=512):
+    """
+    对整段记录计算派生信号，返回 NumPy 列（供回归分析向量化求值）。
+    与逐帧 DerivedSignals.update 的结果一致：滑动和用前缀和，窗口极值用稀疏表，去抖按段计算。
+    """
+    import numpy as np
+
+    cfg = dict(DEFAULT_CONFIG, **(config or {}))
+    if not len(timestamps):
+        return {}
+    t = np.asarray(timestamps, dtype=np.float64)
+    t = t - t[0]
+    alt = np.asarray(altitude_ft, dtype=np.float64)
+    tas = np.asarray(tas_knots, dtype=np.float64)
+    # 平移不改变斜率和方差，但能减小前缀和的舍入误差
+    alt_c = alt - alt.mean()
+
+    vs_fpm = _window_slope(t, alt_c, _window_starts(t, cfg["vs_window_sec"], capacity)) * 60.0
+    accel = _window_slope(t, tas - tas.mean(), _window_starts(t, cfg["accel_window_sec"], capacity))
+
+    lo = _window_starts(t, cfg["stability_window_sec"], capacity)
+    hi = np.arange(len(t))
+    band = _range_reduce(alt, lo, hi, np.maximum) - _range_reduce(alt, lo, hi, np.minimum)
+    count = (hi - lo + 1).astype(np.float64)
+    sx, sxx = _window_sums(lo, alt_c, alt_c * alt_c)
+    mean = sx / count
+    variance = np.maximum(0.0, sxx / count - mean * mean)
+
+    level = (band <= cfg["stable_band_ft"]) & (np.abs(vs_fpm) <= cfg["stable_vs_fpm"])
+    stable, stable_sec = _debounce_columns(t, level, 0.0, cfg["stable_release_sec"])
+    return {
+        "vertical_speed_fpm": vs_fpm,
+        "acceleration_kts": accel,
+        "altitude_band_ft": band,
+        "altitude_variance": variance,
+        "altitude_stable": stable,
+        "altitude_stable_sec": stable_sec,
+    }
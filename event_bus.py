@@ -0,0 +1,168 @@
+"""
+后端 -> 前端的有界事件总线（替代无上限的 queue.Queue）：
+- 每种事件一个策略：
+  latest   只保留最新值（status、语音包列表），UI 跟不上时中间值直接合并掉
+  dedup    相同的错误在窗口期内只投递一次，之后汇总成“（重复 N 次）”
+  bounded  定长队列，满了丢最旧的（log）
+  backpressure  有界队列 + 背压（播报、按钮解锁）：队列满时生产者最多等 block_timeout 秒，
+           仍然满就丢弃新事件并计数。UI 停住太久时这类事件也会丢，但检测线程不会被卡死；
+           丢弃数在 stats() 里，前端据此提示
+- 各类型的丢弃 / 合并次数都有计数，UI 停住多久内存都有上限
+- 只登记前端会处理的事件；阶段切换由飞行日志直接订阅，不经过这里
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+
+LATEST = "latest"
+DEDUP = "dedup"
+BOUNDED = "bounded"
+BACKPRESSURE = "backpressure"
+
+DEFAULT_POLICIES = {
+    "status": LATEST,
+    "packs": LATEST,
+    "error": DEDUP,
+    "log": BOUNDED,
+    "announcement": BACKPRESSURE,
+    "enable_descent": BACKPRESSURE,
+}
+
+
+class EventBus:
+    def __init__(self, capacity=256, backpressure_capacity=1024, dedup_window=30.0, block_timeout=0.5,
+                 policies=None, clock=time.time):
+        self.capacity = capacity
+        self.backpressure_capacity = backpressure_capacity
+        self.dedup_window = dedup_window
+        self.block_timeout = block_timeout
+        self.policies = dict(DEFAULT_POLICIES, **(policies or {}))
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._bounded = deque(maxlen=capacity)      # (seq, 类型, 数据)
+        self._backpressure = deque()
+        self._latest = {}                           # 类型 -> (seq, 数据)
+        self._errors = OrderedDict()                # 错误文本 -> [窗口内被合并次数, 上次投递时间]
+        self._max_errors = 64
+
+        self.dropped = {}
+        self.coalesced = {}
+        self.delivered = 0
+
+    def policy(self, event_type):
+        return self.policies.get(event_type, BOUNDED)
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def _count(self, counter, event_type):
+        counter[event_type] = counter.get(event_type, 0) + 1
+
+    # =============== 生产者 ===============
+
+    def put(self, event_type, data):
+        """任意线程调用；只有 backpressure 事件在队列满时会短暂等待，返回是否入队"""
+        policy = self.policy(event_type)
+        with self._cond:
+            if policy == LATEST:
+                if event_type in self._latest:
+                    self._count(self.coalesced, event_type)
+                self._latest[event_type] = (self._next_seq(), data)
+            elif policy == DEDUP:
+                self._put_dedup(event_type, data)
+            elif policy == BACKPRESSURE:
+                if len(self._backpressure) >= self.backpressure_capacity:
+                    self._cond.wait_for(lambda: len(self._backpressure) < self.backpressure_capacity,
+                                        timeout=self.block_timeout)
+                if len(self._backpressure) >= self.backpressure_capacity:
+                    self._count(self.dropped, event_type)
+                    return False
+                self._backpressure.append((self._next_seq(), event_type, data))
+            else:
+                self._append_bounded(event_type, data)
+        return True
+
+    def _append_bounded(self, event_type, data):
+        if len(self._bounded) == self.capacity:
+            self._count(self.dropped, self._bounded[0][1])
+        self._bounded.append((self._next_seq(), event_type, data))
+
+    def _put_dedup(self, event_type, data):
+        key = (event_type, str(data))
+        now = self.clock()
+        entry = self._errors.get(key)
+        if entry is not None and now - entry[1] < self.dedup_window:
+            entry[0] += 1
+            self._count(self.coalesced, event_type)
+            return
+        repeated = entry[0] if entry is not None else 0
+        self._errors[key] = [0, now]
+        self._errors.move_to_end(key)
+        while len(self._errors) > self._max_errors:
+            self._errors.popitem(last=False)
+        self._append_bounded(event_type, _with_repeats(data, repeated))
+
+    def _flush_repeats(self):
+        """窗口期结束仍在重复的错误：补发一条“（重复 N 次）”汇总"""
+        now = self.clock()
+        for key, entry in self._errors.items():
+            if entry[0] and now - entry[1] >= self.dedup_window:
+                event_type, text = key
+                self._append_bounded(event_type, _with_repeats(text, entry[0]))
+                entry[0], entry[1] = 0, now
+
+    # =============== 消费者 ===============
+
+    def drain(self, max_items=None):
+        """
+        取出待处理事件（按入队顺序合并各队列），返回 [(类型, 数据), ...]。
+        """
+        with self._cond:
+            self._flush_repeats()
+            latest = sorted((seq, event_type, data) for event_type, (seq, data) in self._latest.items())
+            merged = list(heapq.merge(self._backpressure, self._bounded, latest, key=lambda e: e[0]))
+            if max_items is not None and len(merged) > max_items:
+                merged, rest = merged[:max_items], merged[max_items:]
+            else:
+                rest = []
+            self._backpressure.clear()
+            self._bounded.clear()
+            self._latest.clear()
+            for entry in rest:
+                # 没取完的放回原队列（顺序不变）
+                seq, event_type, data = entry
+                policy = self.policy(event_type)
+                if policy == LATEST:
+                    self._latest[event_type] = (seq, data)
+                elif policy == BACKPRESSURE:
+                    self._backpressure.append(entry)
+                else:
+                    self._bounded.append(entry)
+            self.delivered += len(merged)
+            self._cond.notify_all()
+        return [(event_type, data) for _seq, event_type, data in merged]
+
+    def qsize(self):
+        with self._cond:
+            return len(self._bounded) + len(self._backpressure) + len(self._latest)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._bounded) + len(self._backpressure) + len(self._latest),
+                "delivered": self.delivered,
+                "dropped": dict(self.dropped),
+                "dropped_total": sum(self.dropped.values()),
+                "coalesced": dict(self.coalesced),
+            }
+
+
+def _with_repeats(data, repeated):
+    return data if not repeated else f"{data}（重复 {repeated} 次）"
@@ -0,0 +1,291 @@
+"""
+假的 pyuipc 模块（open / read / close / FSUIPCException），由 flight_profile 的模拟航班驱动。
+在没有 MSFS / FSUIPC7 的机器（包括 Linux）上运行整个程序或做负载 / 浸泡测试：
+
+    import fake_pyuipc
+    fake_pyuipc.install(fake_pyuipc.SimulatedFlight(time_scale=30))
+    # 之后 import pyuipc 拿到的就是本模块
+
+    python fake_pyuipc.py --flights 50 --time-scale 120      # 并发模拟 50 个航班
+
+负载测试每个航班一个 FlightAnnouncer，走真实的检测路径（FsuipcConnection -> _detect_tick ->
+_process_frame），时钟和等待按倍速缩放，音频交给不出声的 OfflineMixer。
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from flight_profile import INPUT_DESCENT_PRESSED, FlightProfile
+
+# FlightAnnouncer / power_monitor 读取的偏移
+OFFSET_LIGHTS = 0x0D0C
+OFFSET_TAS = 0x02B8
+OFFSET_ALTITUDE = 0x05C0
+OFFSET_SEATBELT = 0x341D
+OFFSET_PAUSE = 0x0264
+OFFSET_READY = 0x3364
+
+
+class FSUIPCException(Exception):
+    def __init__(self, error_code=12, message="FSUIPC 连接已断开（模拟）"):
+        super().__init__(message)
+        self.errorCode = error_code
+
+
+class FaultPlan:
+    """
+    故障注入：周期性断线、暂停、读数噪声。
+    disconnect_every / pause_every 为模拟时间秒数（None 表示不注入）。
+    """
+
+    def __init__(self, disconnect_every=None, disconnect_sec=10.0, pause_every=None, pause_sec=30.0,
+                 tas_noise_kt=0.0, alt_noise_ft=0.0, seed=None):
+        self.disconnect_every = disconnect_every
+        self.disconnect_sec = disconnect_sec
+        self.pause_every = pause_every
+        self.pause_sec = pause_sec
+        self.tas_noise_kt = tas_noise_kt
+        self.alt_noise_ft = alt_noise_ft
+        self.rng = random.Random(seed)
+
+    @staticmethod
+    def _in_window(t, every, length):
+        return every is not None and t > every and (t % every) < length
+
+    def disconnected(self, t):
+        return self._in_window(t, self.disconnect_every, self.disconnect_sec)
+
+    def paused(self, t):
+        return self._in_window(t, self.pause_every, self.pause_sec)
+
+
+class SimulatedFlight:
+    def __init__(self, profile=None, time_scale=1.0, faults=None, clock=time.time):
+        self.profile = profile or FlightProfile()
+        self.time_scale = time_scale
+        self.faults = faults or FaultPlan()
+        self.clock = clock
+        self.started = clock()
+        self.reads = 0
+        self.disconnects = 0
+        self._was_down = False
+
+    def elapsed(self):
+        """模拟时间（秒）"""
+        return (self.clock() - self.started) * self.time_scale
+
+    def sim_time(self):
+        """按倍速走的时间戳（给 FlightAnnouncer 当 clock）"""
+        return self.started + self.elapsed()
+
+    def finished(self):
+        return self.elapsed() >= self.profile.duration
+
+    def available(self):
+        down = self.faults.disconnected(self.elapsed())
+        if down and not self._was_down:
+            self.disconnects += 1
+        self._was_down = down
+        return not down
+
+    def values(self, offsets):
+        t = self.elapsed()
+        sample = self.profile.sample(t)
+        faults = self.faults
+        tas = sample.tas_raw
+        alt = sample.alt_raw
+        if faults.tas_noise_kt and tas:
+            tas = max(0, int(tas + faults.rng.gauss(0, faults.tas_noise_kt) * 128))
+        if faults.alt_noise_ft and alt:
+            alt = max(0, int(alt + faults.rng.gauss(0, faults.alt_noise_ft) * 256))
+        table = {
+            OFFSET_LIGHTS: sample.light_bits,
+            OFFSET_TAS: tas,
+            OFFSET_ALTITUDE: alt,
+            OFFSET_SEATBELT: sample.seatbelt_raw,
+            OFFSET_PAUSE: 1 if faults.paused(t) else 0,
+            OFFSET_READY: 0,
+        }
+        self.reads += 1
+        return [table.get(offset, 0) for offset, _ in offsets]
+
+
+# =============== pyuipc 接口 ===============
+
+class FlightApi:
+    """
+    绑定到一个模拟航班的 pyuipc 接口，传给 FsuipcConnection(api=...)。
+    绑定跟着连接走而不是跟着线程走：生命周期线程 open、检测线程 read 看到的是同一个航班。
+    """
+    FSUIPCException = FSUIPCException
+
+    def __init__(self, flight):
+        self.flight = flight
+
+    def open(self, version=0):
+        if not self.flight.available():
+            raise FSUIPCException(2, "无法连接 FSUIPC（模拟断线）")
+
+    def close(self):
+        pass
+
+    def read(self, offsets):
+        if not self.flight.available():
+            raise FSUIPCException()
+        return self.flight.values(offsets)
+
+
+_default = {"flight": None}
+
+
+def set_flight(flight):
+    """设置模块级接口（import pyuipc）使用的航班"""
+    _default["flight"] = flight
+
+
+def current_flight():
+    flight = _default["flight"]
+    if flight is None:
+        flight = SimulatedFlight()
+        _default["flight"] = flight
+    return flight
+
+
+def open(version=0):
+    FlightApi(current_flight()).open(version)
+
+
+def close():
+    pass
+
+
+def read(offsets):
+    return FlightApi(current_flight()).read(offsets)
+
+
+def install(flight=None):
+    """替换 sys.modules['pyuipc']，之后的 import pyuipc 都拿到本模块"""
+    if flight is not None:
+        set_flight(flight)
+    sys.modules["pyuipc"] = sys.modules[__name__]
+    return sys.modules[__name__]
+
+
+# =============== 并发负载测试 ===============
+
+def _run_flight(index, args, sounds_path, data_path, results):
+    """
+    单个航班线程：一个 FlightAnnouncer 跑真实的检测路径，统计阶段时间线和每拍耗时。
+    """
+    from PyQt5.QtCore import Qt
+
+    from flight_announcer import FlightAnnouncer
+    from offline_render import OfflineMixer
+
+    rng = random.Random(args.seed + index)
+    faults = FaultPlan(disconnect_every=args.disconnect_every, pause_every=args.pause_every,
+                       tas_noise_kt=args.noise, alt_noise_ft=args.noise * 10, seed=args.seed + index)
+    flight = SimulatedFlight(FlightProfile.randomized(rng), args.time_scale, faults)
+    scale = args.time_scale
+
+    announcer = FlightAnnouncer(audio_process=False, audio_manager=OfflineMixer(flight.sim_time),
+                                data_path=data_path, sounds_path=sounds_path, fsuipc_api=FlightApi(flight),
+                                clock=flight.sim_time, sleep=lambda sec: time.sleep(sec / scale))
+    timeline = [(announcer.phase, 0.0)]
+    announcer.event_signal.connect(
+        lambda event_type, data: timeline.append((data, round(flight.elapsed(), 1)))
+        if event_type == "phase" else None, Qt.DirectConnection)
+    # 重连退避同样按倍速缩放
+    announcer.connection = announcer.create_connection(base_delay=0.5 / scale, max_delay=30.0 / scale)
+    announcer.connection.start()
+
+    ticks = 0
+    busy = 0.0
+    prev_inputs = 0
+    try:
+        while not flight.finished() and announcer.phase != "deboarding":
+            # 剖面里的按钮位：上升沿时按一次前端按钮（与离线渲染一致）
+            inputs = flight.profile.sample(flight.elapsed()).inputs
+            if inputs & ~prev_inputs & INPUT_DESCENT_PRESSED:
+                announcer.prepare_descent()
+            prev_inputs = inputs
+
+            started = time.perf_counter()
+            delay = announcer._detect_tick()
+            busy += time.perf_counter() - started
+            ticks += 1
+            if delay:
+                time.sleep(delay / scale)
+    finally:
+        announcer.connection.stop()
+        stats = announcer.connection.stats()
+        frames = announcer.tick_stats["evaluated"] + announcer.tick_stats["skipped"]
+        announcer.shutdown()
+
+    results[index] = {
+        "timeline": timeline,
+        "completed": announcer.phase == "deboarding",
+        "ticks": ticks,
+        "frames": frames,
+        "reconnects": stats["reconnect_count"],
+        "disconnects": flight.disconnects,
+        "busy_ms_per_tick": busy * 1000.0 / max(1, ticks),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并发模拟航班（负载 / 浸泡测试）")
+    parser.add_argument("--flights", type=int, default=10)
+    parser.add_argument("--time-scale", type=float, default=60.0, help="模拟时间倍速")
+    parser.add_argument("--disconnect-every", type=float, default=None, help="每隔多少模拟秒断线一次")
+    parser.add_argument("--pause-every", type=float, default=None, help="每隔多少模拟秒暂停一次")
+    parser.add_argument("--noise", type=float, default=0.0, help="空速噪声标准差（kt），高度噪声为其 10 倍（ft）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from benchmark import make_pack
+    from pack_manifest import load_manifest
+
+    install()
+    workdir = tempfile.mkdtemp(prefix="cabin_load_")
+    sounds_path = os.path.join(workdir, "sounds")
+    # 合成语音包与默认包同名，FlightAnnouncer 构造时直接加载；清单先生成一次，各航班只读
+    load_manifest(make_pack(os.path.join(sounds_path, "CES"), 9, seconds=1.0))
+
+    results = [None] * args.flights
+    threads = []
+    for i in range(args.flights):
+        data_path = os.path.join(workdir, f"flight_{i}")
+        os.makedirs(data_path)
+        threads.append(threading.Thread(target=_run_flight, args=(i, args, sounds_path, data_path, results),
+                                        daemon=True))
+    started = time.time()
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    elapsed = time.time() - started
+
+    done = [r for r in results if r is not None]
+    completed = sum(r["completed"] for r in done)
+    ticks = sum(r["ticks"] for r in done)
+    print(f"{len(done)} 个航班，完成 {completed} 个，用时 {elapsed:.1f}s，共 {ticks} 拍"
+          f"（{ticks / max(elapsed, 1e-9):.0f} 拍/秒，其中 {sum(r['frames'] for r in done)} 帧进入状态机）")
+    print(f"断线 {sum(r['disconnects'] for r in done)} 次，重连 {sum(r['reconnects'] for r in done)} 次，"
+          f"平均每拍耗时 {sum(r['busy_ms_per_tick'] for r in done) / max(1, len(done)):.3f} ms")
+    for i, r in enumerate(done):
+        if not r["completed"]:
+            print(f"  航班 {i} 未完成，停在 {r['timeline'][-1][0]}: {r['timeline']}")
+    return 0 if completed == len(done) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
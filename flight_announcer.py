@@ -1,20 +1,50 @@
-import pyuipc
 import time
 import threading
 import sys
 import os
-import pygame
 import random
 from collections import deque
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
 from audio_manager import AudioManager  # 新增的音频管理器
+from audio_engine import AudioEngineClient
+from clip_prefetcher import ClipPrefetcher
+from derived_signals import DerivedSignals
+from flight_journal import FlightJournal
+from fsuipc_connection import FsuipcConnection
+from flight_log import LOG_EXT, FlightLogWriter
+from flight_phases import (ALL_FIELDS, ARRIVAL_CALLS, DEFAULT_THRESHOLDS, FIELD_ALT, FIELD_DERIVED,
+                           FIELD_TAS, INPUT_DESCENT_PRESSED, INPUT_MANUAL_CRUISE, PHASE_ORDER, PHASE_RULES,
+                           PHASE_TIMERS, change_mask, decode_frame, evaluate, reconcile_phase,
+                           upcoming_clips)
+from mem_profiler import REPORT_NAME, profiler_from_env
+from metrics import MetricsRegistry, MetricsServer, port_from_env
+from pack_archive import archive_path_for, make_ref, open_archive
+from pack_manifest import DEFAULT_MIXER_FORMAT, load_manifest
+from pack_watcher import PackWatcher
+from phrase_engine import PhraseBook
+from power_monitor import (ABSENT_INTERVAL, ECO_INTERVAL, ECO_OFFSETS, FULL_INTERVAL,
+                           PowerMonitor, sim_active)
+from state_snapshot import SNAPSHOT_NAME, SnapshotWriter, load_snapshot
+from telemetry_bus import BusInUseError, TelemetryBus
+from timer_wheel import TimerWheel
 
 
 class FlightAnnouncer(QObject):
     event_signal = pyqtSignal(str, object)  # (event_type, data)
 
-    def __init__(self):
+    # 通过 pygame.mixer.music 播放的音频（必须是真实文件）
+    MUSIC_KEYS = ("boarding_music",)
+
+    def __init__(self, audio_process=True, metrics_port=None, audio_manager=None, data_path=None,
+                 clock=time.time, sleep=time.sleep, sounds_path=None, fsuipc_api=None):
+        """
+        audio_manager / data_path / clock / sleep / sounds_path / fsuipc_api 供离线渲染、测试替换：
+        传入的音频管理器直接使用，数据文件写到 data_path，语音包从 sounds_path 读取，
+        检测路径的时间取自 clock()，FSUIPC 读写走 fsuipc_api（默认 pyuipc 模块）。
+        """
         super().__init__()
+        self.clock = clock
+        self.sleep = sleep
         if getattr(sys, 'frozen', False):
             base_path = sys._MEIPASS
         else:
@@ -22,8 +52,20 @@ class FlightAnnouncer(QObject):
 
         self.base_path = base_path
         print(f"[FlightAnnouncer] Base path: {self.base_path}")
+        self.sounds_path = sounds_path or os.path.join(base_path, "sounds")
+
+        # 可写数据目录（打包后 _MEIPASS 是临时目录，数据放在 exe 旁边）
+        if data_path is not None:
+            self.data_path = data_path
+        elif getattr(sys, 'frozen', False):
+            self.data_path = os.path.dirname(sys.executable)
+        else:
+            self.data_path = base_path
 
         self._stop_flag = threading.Event()
+        self.fsuipc_connected = False
+        self.fsuipc_api = fsuipc_api
+        self.connection = None
 
         # 偏移量定义
         self.offsets = [
@@ -32,6 +74,8 @@ class FlightAnnouncer(QObject):
             (0x05C0, 'l'),  # 高度（真实压力高度）
             (0x341D, 'b'),  # 安全带灯状态
         ]
+        # 暂停 / 菜单 / 未连接时进入低功耗模式（见 power_monitor）
+        self.power = PowerMonitor()
 
         self.states = {
             "boarding_music_playing": False,
@@ -55,31 +99,168 @@ class FlightAnnouncer(QObject):
         self.phase = "boarding"   # boarding -> briefing -> taxi -> takeoff -> climb -> cruise -> descent -> approach -> landing_roll -> shutdown -> deboarding
         self.manual_cruise_request = False
 
+        # 状态机阈值（可用 regression_analyzer 评估修改的影响）
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        # 派生信号（垂直速度、加速度、高度稳定时长），每帧 O(1) 更新
+        self.derived = DerivedSignals()
+        self._derived_active = False
+
+        # 变化检测快速路径：原始帧与上一帧相同且规则的输入字段没动时跳过求值 / 状态刷新
+        self._last_raw = None
+        self._force_eval = True      # 阶段切换、播报失败后下一拍必须重新求值
+        self._shown_status = None    # 最近一次发出的状态文本（任何来源）
+        self._frame_status = None    # 最近一次由遥测帧生成的状态文本
+        self.tick_stats = {"evaluated": 0, "skipped": 0, "status_emitted": 0, "status_skipped": 0}
+
+        # 共享内存遥测总线（检测线程启动时创建，供其他进程零拷贝读取）
+        self.telemetry_bus = None
+        # 二进制遥测记录（flight_logs/*.cvlog），供离线回归分析
+        self.record_telemetry = True
+        self.flight_log = None
+
         self.audio_queue = deque(maxlen=5)
         self.currently_playing = False
 
-        self.audio_manager = AudioManager()
+        self.audio_manager = audio_manager or self._create_audio_manager(audio_process)
 
         # 音频包（可切换的文件夹）
         self.sound_files = {}
+        self.clip_info = {}          # 路径 -> 清单记录（时长、格式、解码字节数等）
         self.current_folder = "CES"  # 默认加载 CES
+        # 动态播报：语音包 phrases.json 中的模板 + 航班信息（航班号、目的地、温度等）
+        self.phrases = PhraseBook()
+        self.flight_info = {}
+        self.prefetcher = ClipPrefetcher(self.audio_manager, self._resolve_sound)
+        self._pack_lock = threading.Lock()
         self.load_sound_folder(self.current_folder)
 
+        # 语音包热重载（作者边改边听，无需重新选择文件夹）
+        self.pack_watcher = PackWatcher(self.sounds_path,
+                                        self._on_pack_changed, self._on_packs_changed)
+        self.pack_watcher.start()
+
         # 语音间隔控制（防止“连珠炮”）
         self.min_gap_sec = 5.0           # 两段播报之间的基础静默秒数
         self.gap_jitter_sec = 2.0        # 随机抖动（-jitter ~ +jitter）
         self.next_allowed_play_ts = 0.0  # 下一次允许播放的时间戳
 
+        # 定时播报（餐饮、免税、距离着陆 30 分钟）：时间轮按“飞行时钟”推进，
+        # 只在正常飞行时走（暂停 / 菜单中不计时）
+        self.timers = TimerWheel(tick_sec=FULL_INTERVAL)
+        self._timer_lock = threading.Lock()
+        self._due_announcements = []
+        self._flight_clock = 0.0
+        self._last_clock_ts = None
+
+        # 状态快照（崩溃 / 重启后从中途恢复），后台线程原子写盘
+        self.snapshot_path = os.path.join(self.data_path, SNAPSHOT_NAME)
+        self.snapshot = SnapshotWriter(self.snapshot_path)
+        self.snapshot_interval = 5.0
+        self._last_snapshot_ts = 0.0
+        self._restored = None        # 待与第一帧核对的快照
+
         # 登机音乐淡出时长
         self.boarding_fade_ms = 1800
 
-        # 初始化 pygame mixer（防止多次 init 出错）
+        # 记录当前显示的状态文本（按钮、连接回调也会发状态），快速路径据此判断是否需要刷新
+        self.event_signal.connect(self._track_status, Qt.DirectConnection)
+
+        # 本地指标端点（可选）：端口来自参数或环境变量 CABIN_METRICS_PORT
+        self.metrics = MetricsRegistry()
+        self._init_metrics()
+        self.metrics_server = None
+        port = metrics_port if metrics_port is not None else port_from_env()
+        if port is not None:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, port)
+                self.metrics_server.start()
+            except OSError as e:
+                print(f"[FlightAnnouncer] 指标端点启动失败: {e}")
+                self.metrics_server = None
+
+        # 内存排查模式（CABIN_MEMPROFILE）：阶段切换时拍快照，退出时写报告
+        self.mem_profiler = profiler_from_env(os.path.join(self.data_path, REPORT_NAME))
+        self.mem_profiler.add_gauge("decoded_audio_bytes", self._decoded_audio_bytes)
+        self.mem_profiler.add_gauge("pending_timers", lambda: self.timers.pending)
+        self.mem_profiler.mark("startup")
+
+        # 飞行事件日志：直接连接，在发出事件的线程里入队（不等 UI 事件循环）
         try:
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-        except Exception:
-            # 不让异常影响主流程
-            pass
+            self.journal = FlightJournal(os.path.join(self.data_path, "flight_journal.db"))
+            self.event_signal.connect(self._journal_event, Qt.DirectConnection)
+        except Exception as e:
+            print(f"[FlightAnnouncer] 飞行日志不可用: {e}")
+            self.journal = None
+
+    def _init_metrics(self):
+        """
+        检测线程只做计数器加法；其余数值注册为采集函数，抓取时才读取。
+        """
+        m = self.metrics
+        self.m_read_latency = m.histogram("fsuipc_read_seconds", "FSUIPC 单次读取耗时")
+        self.m_frames = m.counter("frames_total", "已处理的遥测帧数")
+        self.m_played = m.counter("announcements_total", "播报次数", {"result": "played"})
+        self.m_failed = m.counter("announcements_total", "播报次数", {"result": "failed"})
+
+        m.add_collector("phase", "gauge", "当前飞行阶段（当前阶段为 1）",
+                        lambda: [({"phase": p}, int(p == self.phase)) for p in PHASE_ORDER])
+        m.add_collector("detect_wakeups_total", "counter", "检测线程唤醒次数",
+                        lambda: [({"mode": k}, v) for k, v in self.power.wakeups.items()])
+        m.add_collector("detect_wakeups_per_minute", "gauge", "检测线程每分钟唤醒次数",
+                        lambda: [({"mode": k}, v) for k, v in self.power.report().items()])
+        m.add_collector("ticks_total", "counter", "状态机求值 / 快速路径跳过的帧数",
+                        lambda: [({"result": k}, v) for k, v in self.tick_stats.items()])
+        m.add_collector("audio_cache_total", "counter", "语音解码缓存命中 / 未命中",
+                        self._collect_cache)
+        m.add_collector("audio_command_latency_ms", "gauge", "音频引擎命令平均延迟",
+                        lambda: self.audio_manager.average_latency_ms()
+                        if hasattr(self.audio_manager, "average_latency_ms") else None)
+        m.add_collector("fsuipc_connected", "gauge", "FSUIPC 是否已连接",
+                        lambda: int(self.fsuipc_connected))
+        m.add_collector("fsuipc_reconnects_total", "counter", "FSUIPC 重连次数",
+                        lambda: self.connection.stats()["reconnect_count"] if self.connection else 0)
+        m.add_collector("fsuipc_downtime_seconds", "counter", "FSUIPC 累计断线时长",
+                        lambda: self.connection.stats()["total_downtime_sec"] if self.connection else 0.0)
+        m.add_collector("pending_timers", "gauge", "已布防的定时播报",
+                        lambda: self.timers.pending)
+        m.add_collector("journal_dropped_total", "counter", "飞行日志队列满时丢弃的事件",
+                        lambda: self.journal.dropped if self.journal is not None else None)
+
+    def _collect_cache(self):
+        stats = self.audio_manager.cache_stats() if hasattr(self.audio_manager, "cache_stats") else {}
+        if not stats:
+            return None
+        return [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])]
+
+    def _decoded_audio_bytes(self):
+        # 独立进程引擎的数值来自子进程定期回报的统计
+        stats = self.audio_manager.cache_stats() if hasattr(self.audio_manager, "cache_stats") else {}
+        return stats.get("decoded_bytes")
+
+    def _create_audio_manager(self, audio_process):
+        """
+        优先使用独立进程音频引擎；子进程起不来时退回进程内 AudioManager。
+        """
+        if audio_process:
+            try:
+                client = AudioEngineClient()
+                client.on_voice_finished = self._on_voice_finished
+                print("[FlightAnnouncer] 音频引擎已在独立进程中启动")
+                return client
+            except Exception as e:
+                print(f"[FlightAnnouncer] 音频引擎进程启动失败，改用进程内播放: {e}")
+        return AudioManager()
+
+    def _journal_event(self, event_type, data):
+        self.journal.record(event_type, data, phase=self.phase)
+
+    def _track_status(self, event_type, data):
+        if event_type == "status":
+            self._shown_status = data
+
+    def _on_voice_finished(self, path, played_sec):
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.event_signal.emit("log", f"播报结束: {name}（{played_sec:.1f}s）")
 
     # =============== 外部控制 API（前端会调用的） ===============
 
@@ -88,14 +269,8 @@ class FlightAnnouncer(QObject):
         设置全局音量（0.0 ~ 1.0），同步到 AudioManager 和 登机音乐（pygame.mixer.music）。
         """
         try:
-            # 同步给 AudioManager（若其实现了全局音量）
-            if hasattr(self.audio_manager, "set_global_volume"):
-                self.audio_manager.set_global_volume(volume)
-            # 同步给登机音乐
-            try:
-                pygame.mixer.music.set_volume(max(0.0, min(1.0, float(volume))))
-            except Exception:
-                pass
+            # 同步给 AudioManager（语音与登机音乐共用全局音量）
+            self.audio_manager.set_global_volume(volume)
             self.event_signal.emit("log", f"音量设置为: {volume * 100:.0f}%")
         except Exception as e:
             self.event_signal.emit("error", f"设置音量失败: {e}")
@@ -116,22 +291,12 @@ class FlightAnnouncer(QObject):
             self.event_signal.emit("error", "未找到登机音乐文件（ogg/wav/mp3）")
             return
 
-        try:
-            # 只播一遍
-            pygame.mixer.music.load(path)
-            # 如果 AudioManager 有全局音量，就用它；否则 1.0
-            gv = 1.0
-            if hasattr(self.audio_manager, "get_global_volume"):
-                try:
-                    gv = float(self.audio_manager.get_global_volume())
-                except Exception:
-                    gv = 1.0
-            pygame.mixer.music.set_volume(gv)
-            pygame.mixer.music.play(loops=0)
+        # 只播一遍（音量沿用 AudioManager 的全局音量）
+        if self.audio_manager.play_background(path, loop=False):
             self.states["boarding_music_playing"] = True
             self.event_signal.emit("status", "登机中...")
-        except Exception as e:
-            self.event_signal.emit("error", f"无法播放登机音乐: {e}")
+        else:
+            self.event_signal.emit("error", "无法播放登机音乐")
 
     def prepare_descent(self):
         """
@@ -141,10 +306,20 @@ class FlightAnnouncer(QObject):
         # 播放“descent”语音
         path = self._resolve_sound("descent")
         if path and self._play_voice_with_gap(path):
+            self.event_signal.emit("announcement", "descent")
             self.event_signal.emit("status", "准备下高中...")
         else:
             self.event_signal.emit("error", "无法播放下高广播")
 
+    def set_flight_info(self, **info):
+        """
+        设置动态播报用的航班信息（flight_number / destination / temperature ...），
+        并为接下来的阶段预先拼接模板。
+        """
+        self.flight_info.update({k: v for k, v in info.items() if v is not None})
+        self._prepare_phrases(self.phase)
+        self.event_signal.emit("log", "航班信息: " + ", ".join(f"{k}={v}" for k, v in self.flight_info.items()))
+
     def switch_sound_folder(self, folder_name):
         """切换到指定的语音文件夹"""
         self.load_sound_folder(folder_name)
@@ -156,223 +331,554 @@ class FlightAnnouncer(QObject):
         加载指定的语音文件夹：
         - 支持 mp3/ogg/wav
         - 以“文件名（不含扩展名）”作为键，例如 boarding_music / safety_briefing 等
+        - 通过语音包清单加载，不解码音频即可拿到时长和大小
         """
-        folder_path = os.path.join(self.base_path, "sounds", folder_name)
+        folder_path = os.path.join(self.sounds_path, folder_name)
 
         if not os.path.exists(folder_path):
             self.event_signal.emit("error", f"文件夹 {folder_name} 不存在!")
             return
 
-        self.sound_files.clear()
         try:
-            for filename in os.listdir(folder_path):
-                if filename.lower().endswith((".mp3", ".ogg", ".wav")):
-                    sound_name = os.path.splitext(filename)[0]
-                    self.sound_files[sound_name] = os.path.join(folder_path, filename)
-
-            self.current_folder = folder_name
+            with self._pack_lock:
+                sound_files, clip_info = self._build_sound_table(folder_path)
+                phrases = self._load_phrases(folder_path)
+                # 整体替换，检测线程不会看到“半个语音包”
+                self.sound_files = sound_files
+                self.clip_info = clip_info
+                self.phrases = phrases
+                self.current_folder = folder_name
+                self.prefetcher.reset(self.phase)
+            self._prepare_phrases(self.phase)
             self.event_signal.emit("status", f"已加载 {folder_name} 语音包")
         except Exception as e:
             self.event_signal.emit("error", f"加载语音文件夹失败: {e}")
 
+    def _build_sound_table(self, folder_path):
+        """
+        由语音包清单生成 (键 -> 路径/归档引用, 路径 -> 清单记录)。
+        """
+        manifest = load_manifest(folder_path)
+        sound_files = {key: rec["path"] for key, rec in manifest.items()}
+        compiled = self._use_compiled_archive(folder_path, manifest, sound_files)
+        clip_info = {}
+        for key, rec in manifest.items():
+            if key in compiled:
+                # 归档里是处理过的 PCM，换成归档内容哈希，不能与原始文件共用缓存
+                rec = dict(rec, sha1=compiled[key])
+            clip_info[sound_files[key]] = rec
+        # 按内容哈希登记：各语音包里相同的提示音 / 音乐 / 英文录音只解码一份
+        if hasattr(self.audio_manager, "register_clips"):
+            self.audio_manager.register_clips({path: rec.get("sha1") for path, rec in clip_info.items()})
+        return sound_files, clip_info
+
+    def _load_phrases(self, folder_path):
+        try:
+            return PhraseBook.load(folder_path)
+        except (OSError, ValueError) as e:
+            self.event_signal.emit("error", f"读取动态播报模板失败: {e}")
+            return PhraseBook()
+
+    def _on_pack_changed(self, folder_name):
+        """
+        监视线程回调：当前语音包有文件增删改时，只重载变化的语音。
+        清单会复用未变文件的记录，解码缓存也只丢弃变化的那几条。
+        """
+        if folder_name != self.current_folder:
+            return
+        folder_path = os.path.join(self.sounds_path, folder_name)
+        with self._pack_lock:
+            old_files, old_info = self.sound_files, self.clip_info
+            sound_files, clip_info = self._build_sound_table(folder_path)
+
+            stale = []
+            for key, path in old_files.items():
+                new_path = sound_files.get(key)
+                if new_path != path or clip_info[new_path].get("sha1") != old_info.get(path, {}).get("sha1"):
+                    stale.append(path)
+            added = [k for k in sound_files if k not in old_files]
+
+            for path in stale:
+                self.audio_manager.release(path)
+            self.sound_files = sound_files
+            self.clip_info = clip_info
+            self.phrases = self._load_phrases(folder_path)
+            self.prefetcher.invalidate(stale, self.phase)
+        if stale and hasattr(self.audio_manager, "clear_phrases"):
+            self.audio_manager.clear_phrases()
+        self._prepare_phrases(self.phase)
+
+        if stale or added:
+            self.event_signal.emit("log", f"语音包 {folder_name} 已热重载：{len(stale)} 条更新/删除，{len(added)} 条新增")
+
+    def _on_packs_changed(self, names):
+        self.event_signal.emit("packs", names)
+
+    def _use_compiled_archive(self, folder_path, manifest, sound_files):
+        """
+        若语音包已编译（pack.cvpack），把内容未变的语音换成归档引用。
+        登机音乐走 pygame.mixer.music，需要真实文件，保持原样。
+        返回 {语音键: 归档内容哈希}（只含换成归档引用的语音）。
+        """
+        archive_path = archive_path_for(folder_path)
+        if not os.path.exists(archive_path):
+            return {}
+        try:
+            archive = open_archive(archive_path)
+        except Exception as e:
+            self.event_signal.emit("error", f"语音包归档无法打开: {e}")
+            return {}
+        if archive.format != DEFAULT_MIXER_FORMAT:
+            self.event_signal.emit("log", "语音包归档格式与 mixer 不一致，改用原始文件")
+            return {}
+
+        used = {}
+        for key, rec in manifest.items():
+            if key in self.MUSIC_KEYS:
+                continue
+            compiled = archive.index.get(key)
+            if compiled and compiled.get("sha1") == rec.get("sha1"):
+                sound_files[key] = make_ref(archive_path, key)
+                used[key] = archive.content_sha1(key)
+        self.event_signal.emit("log", f"使用编译归档中的 {len(used)} 条语音")
+        return used
+
+    def _set_phase(self, phase):
+        """
+        切换阶段：通知前端，并让预取器准备后续阶段的语音。
+        """
+        previous = self.phase
+        self.phase = phase
+        self.event_signal.emit("phase", phase)
+        self.prefetcher.on_phase(phase)
+        self._prepare_phrases(phase)
+        with self._timer_lock:
+            self.timers.cancel_tag(previous)
+        for key, delay in PHASE_TIMERS.get(phase, []):
+            self.schedule_announcement(key, delay=delay, phase=phase)
+        self._save_snapshot()
+        self.mem_profiler.mark(phase)
+
     def _resolve_sound(self, basename):
         """
         在当前 sound_files 表中查找 basename 对应的文件路径。
         """
         return self.sound_files.get(basename)
 
+    def _expand_phrase(self, key):
+        """
+        动态播报模板 -> 片段路径列表；没有模板、缺槽位或缺片段时返回 None（改用固定语音）。
+        """
+        if key not in self.phrases:
+            return None
+        try:
+            keys = self.phrases.expand(key, self.flight_info, lambda k: k in self.sound_files)
+        except KeyError:
+            return None
+        return [self.sound_files[k] for k in keys]
+
+    def _prepare_phrases(self, phase):
+        """接下来几个阶段要用的模板先在后台拼好"""
+        if not len(self.phrases):
+            return
+        for key in upcoming_clips(phase, self.prefetcher.lookahead):
+            files = self._expand_phrase(key)
+            if files:
+                self.prefetcher.prepare_phrase(files, self.phrases.crossfade_ms)
+
     def _fadeout_boarding_music_if_playing(self):
         """
         若登机音乐仍在播，进入下一阶段/有高优先级语音时，平滑淡出。
         """
         if self.states.get("boarding_music_playing"):
-            try:
-                pygame.mixer.music.fadeout(self.boarding_fade_ms)
-            except Exception:
-                try:
-                    pygame.mixer.music.stop()
-                except Exception:
-                    pass
-            finally:
-                self.states["boarding_music_playing"] = False
+            self.audio_manager.fadeout_background(self.boarding_fade_ms)
+            self.states["boarding_music_playing"] = False
 
-    def _play_voice_with_gap(self, path: str) -> bool:
+    def _play_voice_with_gap(self, path: str, sequence=None) -> bool:
         """
         执行“带间隔”的语音播报：
-        - 确保与上一条语音间隔 >= min_gap_sec +/- jitter
+        - 确保与上一条语音结束后间隔 >= min_gap_sec +/- jitter（时长取自语音包清单）
         - 播放前会淡出登机音乐（若还在放）
+        - sequence 不为空时播放拼接语音（片段路径列表），path 只用于日志
         """
         # 先让登机音乐淡出（紧急优先级）
         self._fadeout_boarding_music_if_playing()
 
-        now = time.time()
+        now = self.clock()
         if now < self.next_allowed_play_ts:
             remain = max(0.0, self.next_allowed_play_ts - now)
             # 为了不阻塞太久，最多等 2 秒；如果间隔更长，分片等待
             waited = 0.0
             while waited < min(remain, 2.0) and not self._stop_flag.is_set():
-                time.sleep(0.05)
+                self.sleep(0.05)
                 waited += 0.05
 
-        ok = self.audio_manager.play_voice(path)
+        if sequence:
+            ok = self.audio_manager.play_sequence(sequence, self.phrases.crossfade_ms)
+            overlap = self.phrases.crossfade_ms / 1000.0 * (len(sequence) - 1)
+            duration = sum(self.clip_info.get(p, {}).get("duration", 0.0) for p in sequence) - overlap
+        else:
+            ok = self.audio_manager.play_voice(path)
+            duration = self.clip_info.get(path, {}).get("duration", 0.0)
+        (self.m_played if ok else self.m_failed).inc()
         if ok:
             # 计算下一次允许播放的时间（带随机抖动）
             jitter = random.uniform(-self.gap_jitter_sec, self.gap_jitter_sec)
-            self.next_allowed_play_ts = time.time() + max(0.0, self.min_gap_sec + jitter)
+            self.next_allowed_play_ts = self.clock() + duration + max(0.0, self.min_gap_sec + jitter)
         return ok
 
+    # =============== 定时播报 ===============
+
+    def schedule_announcement(self, key, delay=None, at=None, phase=None):
+        """
+        布防一条定时播报：delay 为相对现在的秒数，或 at 为绝对时间戳（与 self.clock() 同一时基）。
+        phase 不为 None 时离开该阶段自动取消，否则到航班结束才取消。
+        """
+        if at is not None:
+            delay = at - self.clock()
+        tag = phase or "flight"
+        with self._timer_lock:
+            return self.timers.schedule_in(max(0.0, delay or 0.0),
+                                           lambda timer: self._due_announcements.append(key), tag, key)
+
+    def set_arrival_time(self, eta):
+        """设置预计到达时间（时间戳），布防“距离着陆 N 分钟”等播报"""
+        with self._timer_lock:
+            self.timers.cancel_tag("arrival")
+        for key, before in ARRIVAL_CALLS:
+            if eta - before > self.clock():
+                self.schedule_announcement(key, at=eta - before, phase="arrival")
+        self.event_signal.emit("log", f"预计到达时间: {time.strftime('%H:%M', time.localtime(eta))}")
+
+    def set_cruise_altitude(self, altitude_ft):
+        """设置计划巡航高度：阶梯爬升中途的改平不会被当成进入巡航"""
+        self.thresholds["planned_cruise_ft"] = max(0.0, float(altitude_ft or 0))
+        self.event_signal.emit("log", f"计划巡航高度: {self.thresholds['planned_cruise_ft']:.0f} ft")
+
+    def _advance_timers(self, now):
+        """
+        推进飞行时钟并触发到期的定时播报。两帧间隔超过几拍（暂停、断线）时只按几拍计，
+        这样暂停期间不会积压播报。
+        """
+        if self._last_clock_ts is not None:
+            self._flight_clock += min(max(0.0, now - self._last_clock_ts), FULL_INTERVAL * 4)
+        self._last_clock_ts = now
+        with self._timer_lock:
+            self.timers.advance(self._flight_clock)
+            due, self._due_announcements = self._due_announcements, []
+        for key in due:
+            if self._resolve_sound(key) is None:
+                self.event_signal.emit("log", f"语音包没有定时播报 {key}，跳过")
+                continue
+            self._announce(key)
+
+    # =============== 状态快照 ===============
+
+    def _snapshot_state(self):
+        with self._timer_lock:
+            timers = [{"key": t.data, "tag": t.tag, "remaining": remaining}
+                      for t, remaining in self.timers.pending_timers() if t.data]
+        return {
+            "phase": self.phase,
+            "states": dict(self.states),
+            "manual_cruise_request": self.manual_cruise_request,
+            "pack": self.current_folder,
+            "flight_info": dict(self.flight_info),
+            "timers": timers,
+        }
+
+    def _save_snapshot(self, now=None):
+        self._last_snapshot_ts = now if now is not None else self.clock()
+        self.snapshot.update(self._snapshot_state())
+
+    def _apply_snapshot(self, snap, raw):
+        """
+        用第一帧核对快照并恢复：阶段、状态标志、语音包、航班信息和未到期的定时播报。
+        """
+        saved_phase = snap.get("phase")
+        phase = reconcile_phase(saved_phase, decode_frame(*raw), self.thresholds)
+        age = time.time() - snap.get("saved_at", time.time())
+        if phase == "boarding" and saved_phase != "boarding":
+            self.event_signal.emit("log", f"快照中的航班（{saved_phase}）已经结束，从登机开始")
+            self.snapshot.clear()
+            return
+
+        pack = snap.get("pack")
+        if pack and pack != self.current_folder:
+            self.load_sound_folder(pack)
+        self.states.update(snap.get("states", {}))
+        self.states["boarding_music_playing"] = False   # 音乐不会随进程恢复
+        self.manual_cruise_request = bool(snap.get("manual_cruise_request"))
+        self.flight_info.update(snap.get("flight_info", {}))
+
+        self.phase = phase
+        self.event_signal.emit("phase", phase)
+        self.prefetcher.on_phase(phase)
+        self._prepare_phrases(phase)
+        if phase in ("climb", "cruise"):
+            self.event_signal.emit("enable_descent", True)
+
+        # 阶段没变时整体恢复定时器；被校正到别的阶段时只保留与阶段无关的，并布防新阶段的
+        for timer in snap.get("timers", []):
+            if phase == saved_phase or timer["tag"] not in PHASE_ORDER:
+                self.schedule_announcement(timer["key"], delay=timer["remaining"],
+                                           phase=None if timer["tag"] == "flight" else timer["tag"])
+        if phase != saved_phase:
+            for key, delay in PHASE_TIMERS.get(phase, []):
+                self.schedule_announcement(key, delay=delay, phase=phase)
+
+        self._force_eval = True
+        note = "" if phase == saved_phase else f"（快照为 {saved_phase}，已按当前数据校正）"
+        self.event_signal.emit("log", f"已从 {age:.0f}s 前的快照恢复：阶段 {phase}{note}")
+        self._save_snapshot()
+
     # =============== 主循环 ===============
 
+    def _announce(self, key: str) -> bool:
+        """
+        根据 key 找到音频并使用“带间隔”的方式播放一次。
+        语音包有同名动态播报模板且航班信息齐全时，播放拼接语音。
+        播放前会自动淡出登机音乐。
+        """
+        sequence = self._expand_phrase(key)
+        path = self._resolve_sound(key)
+        if not path and not sequence:
+            self.m_failed.inc()
+            self.event_signal.emit("error", f"未找到音频: {key}")
+            return False
+        ok = self._play_voice_with_gap(path or key, sequence)
+        if ok:
+            self.event_signal.emit("announcement", key)
+        else:
+            self.event_signal.emit("error", f"无法播放音频: {key}")
+        return ok
+
+    def _current_inputs(self):
+        inputs = 0
+        if self.manual_cruise_request:
+            inputs |= INPUT_MANUAL_CRUISE
+        if self.states.get("descent_button_pressed"):
+            inputs |= INPUT_DESCENT_PRESSED
+        return inputs
+
+    def _on_phase_entered(self, phase):
+        """
+        进入阶段时的附带动作（与播报无关的部分）。
+        """
+        if phase == "climb":
+            # 允许“巡航/下高”按钮
+            self.event_signal.emit("enable_descent", True)
+        elif phase == "cruise":
+            self.manual_cruise_request = False
+        elif phase == "descent":
+            self.states["descent_button_pressed"] = False
+        elif phase == "deboarding":
+            with self._timer_lock:
+                self.timers.clear()
+            self.snapshot.clear()
+            if self.journal is not None:
+                self.journal.end_flight()
+            if self.states["boarding_music_playing"]:
+                self.audio_manager.stop_background()
+                self.states["boarding_music_playing"] = False
+
+    def _process_frame(self, light_bits, tas_raw, alt_raw, seatbelt_raw):
+        """
+        处理一帧遥测：发布到总线 / 记录、刷新状态、驱动状态机。
+        """
+        now = self.clock()
+        inputs = self._current_inputs()
+        raw = (light_bits, tas_raw, alt_raw, seatbelt_raw, inputs)
+        if self.telemetry_bus is not None:
+            self.telemetry_bus.publish(raw, now)
+        if self.flight_log is not None:
+            self.flight_log.append(now, raw)
+
+        if self._restored is not None:
+            snap, self._restored = self._restored, None
+            self._apply_snapshot(snap, raw)
+
+        # 派生信号每帧都要更新（窗口随时间滑动，原始值不变也会变化）
+        derived = self.derived.update(now, alt_raw / 256.0, tas_raw / 128.0)
+        # 定时播报同样逐帧推进（不受快速路径影响）
+        self._advance_timers(now)
+        if now - self._last_snapshot_ts >= self.snapshot_interval and self.phase != "deboarding":
+            self._save_snapshot(now)
+
+        # ================= 变化检测快速路径 =================
+        changed = change_mask(self._last_raw, raw)
+        self._last_raw = raw
+        # 稳定计时进行中（或刚复位）时，依赖派生信号的规则需要逐拍求值
+        stable_timing = derived["altitude_stable_sec"] > 0
+        if stable_timing or self._derived_active:
+            changed |= FIELD_DERIVED
+        self._derived_active = stable_timing
+        if self._force_eval:
+            changed = ALL_FIELDS
+            self._force_eval = False
+        rule = PHASE_RULES.get(self.phase)
+        need_eval = rule is not None and (changed & rule.fields)
+        # 其他来源（按钮、连接、节能模式）改写过状态栏时也要刷新回来
+        need_status = bool(changed & (FIELD_TAS | FIELD_ALT)) or self._shown_status != self._frame_status
+        if not need_eval and not need_status:
+            self.tick_stats["skipped"] += 1
+            self.tick_stats["status_skipped"] += 1
+            return
+
+        signals = decode_frame(*raw)
+        signals.update(derived)
+        tas_knots = signals["tas_knots"]
+        altitude_ft = signals["altitude_ft"]
+
+        status_text = f"阶段:{self.phase} | 高度: {altitude_ft:.0f} ft | 空速: {tas_knots:.0f} kt"
+        self._frame_status = status_text
+        if status_text != self._shown_status:
+            self.event_signal.emit("status", status_text)
+            self.tick_stats["status_emitted"] += 1
+        else:
+            self.tick_stats["status_skipped"] += 1
+
+        # ================= 有限状态机（规则见 flight_phases.PHASE_RULES） =================
+        if need_eval:
+            self.tick_stats["evaluated"] += 1
+            rule = evaluate(self.phase, signals, self.thresholds)
+            if rule is not None:
+                if rule.clip is None or self._announce(rule.clip):
+                    self._set_phase(rule.next_phase)
+                    self._on_phase_entered(rule.next_phase)
+                # 切换后新规则要立即求值；播报失败则下一拍重试
+                self._force_eval = True
+        else:
+            self.tick_stats["skipped"] += 1
+
+        # 记录上一拍数据（保留）
+        self.states["last_tas"] = tas_knots
+        self.states["last_altitude"] = altitude_ft
+
+    def _open_flight_log(self):
+        name = time.strftime("%Y%m%d_%H%M%S") + LOG_EXT
+        try:
+            return FlightLogWriter(os.path.join(self.data_path, "flight_logs", name))
+        except Exception as e:
+            print(f"创建遥测记录失败: {e}")
+            return None
+
+    def _on_fsuipc_connected(self, recover_sec):
+        self.fsuipc_connected = True
+        if recover_sec is None:
+            print("已成功连接到FSUIPC")
+            self.event_signal.emit("status", "已连接FSUIPC")
+        else:
+            stats = self.connection.stats()
+            print(f"重新连接成功（{recover_sec:.1f}s）")
+            self.event_signal.emit("status", "重新连接成功")
+            self.event_signal.emit("log", f"FSUIPC 重新连接成功：恢复用时 {recover_sec:.1f}s，"
+                                          f"累计重连 {stats['reconnect_count']} 次")
+
+    def _on_fsuipc_disconnected(self, error):
+        self.fsuipc_connected = False
+        print(f"FSUIPC 连接断开: {error}")
+        self.event_signal.emit("error", f"FSUIPC 连接断开，后台自动重连: {error}")
+        self.event_signal.emit("status", "等待FSUIPC...")
+
+    def _switch_power_mode(self, mode):
+        previous = self.power.mode
+        if not self.power.switch(mode):
+            return
+        rates = self.power.describe()
+        print(f"[FlightAnnouncer] 运行模式 {previous} -> {mode}（唤醒: {rates}）")
+        self.event_signal.emit("log", f"运行模式切换为 {mode}，唤醒次数: {rates}")
+        if previous != "full":
+            # 暂停 / 断线期间数据不连续，派生窗口重新开始
+            self.derived.reset()
+        if mode == "eco":
+            self.event_signal.emit("status", f"模拟器暂停或在菜单中（节能模式） | 阶段:{self.phase}")
+
+    def _detect_tick(self):
+        """
+        检测线程的一拍，返回下一拍之前的等待秒数。
+        - full：一次读取飞行数据 + 暂停/就绪偏移，模拟器正常时驱动状态机
+        - eco：只读暂停/就绪偏移，不做状态判断、不播报、不刷新状态栏
+        """
+        self.power.wakeup()
+        if not self.connection.connected.is_set():
+            self._switch_power_mode("absent")
+            # 断线期间在这里低成本等待，连上后第一帧立即恢复
+            self.connection.wait_connected(ABSENT_INTERVAL)
+            return 0
+        if self.power.mode == "eco":
+            values = self.connection.read(ECO_OFFSETS)
+            if values is None:
+                return 0
+            if not sim_active(*values):
+                return ECO_INTERVAL
+            self._switch_power_mode("full")
+            return 0
+
+        started = time.perf_counter()
+        values = self.connection.read(self.offsets + ECO_OFFSETS)
+        self.m_read_latency.observe(time.perf_counter() - started)
+        if values is None:
+            return 0
+        light_bits, tas_raw, alt_raw, seatbelt_raw, pause_raw, ready_raw = values
+        if not sim_active(pause_raw, ready_raw):
+            self._switch_power_mode("eco")
+            return ECO_INTERVAL
+        self._switch_power_mode("full")
+        self.m_frames.inc()
+        self._process_frame(light_bits, tas_raw, alt_raw, seatbelt_raw)
+        return FULL_INTERVAL
+
+    def create_connection(self, **kwargs):
+        """创建（未启动的）FSUIPC 连接；kwargs 透传给 FsuipcConnection（如退避时长）"""
+        return FsuipcConnection(on_connected=self._on_fsuipc_connected,
+                                on_disconnected=self._on_fsuipc_disconnected,
+                                api=self.fsuipc_api, **kwargs)
+
     def detect_state(self):
         print("客舱语音系统已启动，等待飞行数据...")
         self.event_signal.emit("status", "等待飞行数据...")
 
+        # 连接由独立线程维护（指数退避重连），本线程只负责读数据
+        self.connection = self.create_connection()
+        self.connection.start()
+
         try:
-            pyuipc.open(0)
-            self.fsuipc_connected = True
-            print("已成功连接到FSUIPC")
-            self.event_signal.emit("status", "已连接FSUIPC")
+            self.telemetry_bus = TelemetryBus()
+        except BusInUseError as e:
+            # 另一个实例正在写总线：本实例不发布，不抢占对方的数据
+            self.event_signal.emit("log", f"遥测总线不可用: {e}")
+            self.telemetry_bus = None
         except Exception as e:
-            print(f"连接FSUIPC失败: {e}")
-            self.event_signal.emit("error", f"无法连接到FSUIPC: {e}")
-            return
+            # 总线只是旁路输出，创建失败不影响播报
+            print(f"创建遥测总线失败: {e}")
+            self.telemetry_bus = None
+        self.flight_log = self._open_flight_log() if self.record_telemetry else None
 
-        def _play_once_by_key(key: str) -> bool:
-            """
-            根据 key 找到音频并使用“带间隔”的方式播放一次。
-            播放前会自动淡出登机音乐。
-            """
-            path = self._resolve_sound(key)
-            if not path:
-                self.event_signal.emit("error", f"未找到音频: {key}")
-                return False
-            ok = self._play_voice_with_gap(path)
-            if not ok:
-                self.event_signal.emit("error", f"无法播放音频: {key}")
-            return ok
+        # 中途重启：读取快照，等第一帧到来后核对并恢复
+        self._restored = load_snapshot(self.snapshot_path) if self.phase == "boarding" else None
 
+        self.power = PowerMonitor()
         while not self._stop_flag.is_set():
             try:
-                light_bits, tas_raw, alt_raw, seatbelt_raw = pyuipc.read(self.offsets)
-
-                # 灯光 & 空速
-                nav_light     = bool(light_bits & 0x0001)
-                beacon_light  = bool(light_bits & 0x0002)                    # 防撞
-                landing_light = bool(light_bits & 0x0004 or light_bits & 0x0008)  # 着陆或机鼻
-                taxi_light    = bool(light_bits & 0x0008)                    # 机鼻
-                tas_knots     = tas_raw / 128.0
-
-                # 高度（仅显示）
-                altitude_ft   = alt_raw / 256.0
-                seatbelt_sign = bool(seatbelt_raw)
-
-                status_text = f"阶段:{self.phase} | 高度: {altitude_ft:.0f} ft | 空速: {tas_knots:.0f} kt"
-                self.event_signal.emit("status", status_text)
-
-                # ================= 有限状态机 =================
-
-                # boarding -> briefing（防撞灯 ON 触发安全须知）
-                if self.phase == "boarding":
-                    if beacon_light:
-                        if _play_once_by_key("safety_briefing"):
-                            self.phase = "briefing"
-
-                # briefing -> taxi（防撞 ON + 滑行灯 ON + 速度 3~30kt）
-                elif self.phase == "briefing":
-                    if beacon_light and taxi_light and 3 < tas_knots < 30:
-                        if _play_once_by_key("taxi_check"):
-                            self.phase = "taxi"
-
-                # taxi -> takeoff（在上一条基础上再加着陆灯 ON）
-                elif self.phase == "taxi":
-                    if beacon_light and taxi_light and landing_light:
-                        if _play_once_by_key("takeoff"):
-                            self.phase = "takeoff"
-
-                # takeoff -> climb（起飞后：着陆灯 OFF 且速度>30）
-                elif self.phase == "takeoff":
-                    if not landing_light and tas_knots > 30:
-                        if _play_once_by_key("climb"):
-                            self.phase = "climb"
-                            # 允许“巡航/下高”按钮
-                            self.event_signal.emit("enable_descent", True)
-
-                # climb -> cruise（优先手动按钮；其次 seatbelt OFF）
-                elif self.phase == "climb":
-                    if self.manual_cruise_request or (not seatbelt_sign):
-                        if _play_once_by_key("cruise"):
-                            self.phase = "cruise"
-                            self.manual_cruise_request = False
-
-                # cruise -> descent（只接受“下高”按钮）
-                elif self.phase == "cruise":
-                    if self.states.get("descent_button_pressed"):
-                        # prepare_descent 已经播放了“descent”，这里只切阶段
-                        self.phase = "descent"
-                        self.states["descent_button_pressed"] = False
-
-                # descent -> approach（着陆灯 + 滑行灯都 ON 认为进近）
-                elif self.phase == "descent":
-                    if landing_light and taxi_light:
-                        if _play_once_by_key("landing"):
-                            self.phase = "approach"
-
-                # approach -> landing_roll（速度<80 认为接地滑跑）
-                elif self.phase == "approach":
-                    if tas_knots < 80:
-                        self.phase = "landing_roll"
-
-                # landing_roll -> shutdown（到达阶段：着陆灯 OFF 且防撞灯仍 ON）
-                elif self.phase == "landing_roll":
-                    if (not landing_light) and beacon_light:
-                        if _play_once_by_key("arrival"):
-                            self.phase = "shutdown"
-
-                # shutdown -> deboarding（完全停稳且防撞灯 OFF）
-                elif self.phase == "shutdown":
-                    if tas_knots < 3 and not beacon_light:
-                        if _play_once_by_key("deboarding"):
-                            self.phase = "deboarding"
-                            if self.states["boarding_music_playing"]:
-                                try:
-                                    pygame.mixer.music.stop()
-                                except Exception:
-                                    pass
-                                self.states["boarding_music_playing"] = False
-
-                # 记录上一拍数据（保留）
-                self.states["last_tas"] = tas_knots
-                self.states["last_altitude"] = altitude_ft
-
-                time.sleep(0.5)
-
-            except pyuipc.FSUIPCException as e:
-                print(f"读取数据错误: {e}")
-                self.event_signal.emit("error", f"读取数据错误: {e}")
-                self.fsuipc_connected = False
-                try:
-                    pyuipc.close()
-                except:
-                    pass
-                try:
-                    pyuipc.open(0)
-                    self.fsuipc_connected = True
-                    print("重新连接成功")
-                    self.event_signal.emit("status", "重新连接成功")
-                except Exception as e2:
-                    print(f"重新连接失败: {e2}")
-                    self.event_signal.emit("error", f"重新连接失败: {e2}")
-                    time.sleep(2)
+                delay = self._detect_tick()
+                if delay:
+                    self._stop_flag.wait(delay)
 
             except Exception as e:
                 print(f"检测状态错误: {e}")
                 self.event_signal.emit("error", f"检测状态错误: {e}")
-                time.sleep(1)
-
-        try:
-            pyuipc.close()
-        except:
-            pass
+                self._stop_flag.wait(1)
+
+        self.connection.stop()
+        print(f"[FlightAnnouncer] 唤醒统计: {self.power.report()}")
+        print(f"[FlightAnnouncer] 快速路径统计: {self.tick_stats}")
+        if self.telemetry_bus is not None:
+            self.telemetry_bus.close()
+            self.telemetry_bus = None
+        if self.flight_log is not None:
+            self.flight_log.close()
+            self.flight_log = None
         self.fsuipc_connected = False
         self.event_signal.emit("status", "已断开FSUIPC连接")
 
@@ -383,6 +889,8 @@ class FlightAnnouncer(QObject):
             print("检测线程已在运行")
             return
         self._stop_flag.clear()
+        if self.journal is not None:
+            self.journal.begin_flight(self.current_folder)
         self._thread = threading.Thread(target=self.detect_state, daemon=True)
         self._thread.start()
 
@@ -390,3 +898,26 @@ class FlightAnnouncer(QObject):
         self._stop_flag.set()
         if hasattr(self, "_thread"):
             self._thread.join(timeout=2)
+
+    def shutdown(self):
+        """
+        程序退出时调用：停止检测并关闭音频引擎进程。
+        """
+        self.stop_detection()
+        self.pack_watcher.stop()
+        self.prefetcher.stop()
+        if self.journal is not None:
+            if self.journal.in_flight:
+                # 已在下客阶段结束的航班不再重复结束
+                self.journal.end_flight()
+            self.journal.close()
+        if self.phase != "deboarding":
+            self._save_snapshot()
+        self.snapshot.close()
+        self.mem_profiler.mark("shutdown")
+        self.mem_profiler.write_report()
+        self.mem_profiler.stop()
+        if hasattr(self.audio_manager, "close"):
+            self.audio_manager.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
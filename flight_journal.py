@@ -0,0 +1,202 @@
+"""
+飞行事件日志（SQLite）：
+- record() 只做一次 put_nowait，检测线程和 UI 线程都不会碰磁盘
+- 后台写线程批量提交事务，数据库使用 WAL 模式
+- 队列有上限，写不过来时丢弃并计数，而不是无限占用内存
+
+用法（查询）：
+    python flight_journal.py flight_journal.db taxi takeoff [最近航班数]
+"""
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    ended   REAL,
+    pack    TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    flight_id INTEGER NOT NULL,
+    ts        REAL NOT NULL,
+    phase     TEXT,
+    type      TEXT NOT NULL,
+    data      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_flight ON events(flight_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_phase ON events(type, phase, flight_id);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+"""
+
+# 需要落盘的事件类型（逐拍的 status 不记录）
+JOURNAL_TYPES = ("phase", "announcement", "error", "log")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class FlightJournal:
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.flight_id = None           # 写线程当前打开的航班
+        self.in_flight = False          # 调用方视角：begin_flight 之后、end_flight 之前
+        self._last_flight_id = None     # 已结束的上一个航班（收尾事件仍归属它）
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._thread = threading.Thread(target=self._writer, name="FlightJournal", daemon=True)
+        self._thread.start()
+
+    # =============== 写入（任意线程，非阻塞） ===============
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def begin_flight(self, pack=None):
+        """开始新航班；航班 id 由写线程分配，之后的事件自动归属该航班"""
+        self.in_flight = True
+        self._put(("begin", time.time(), pack))
+
+    def end_flight(self):
+        """结束当前航班；没有打开的航班时什么也不做（不会覆盖已记录的结束时间）"""
+        if not self.in_flight:
+            return
+        self.in_flight = False
+        self._put(("end", time.time()))
+
+    def record(self, event_type, data, phase=None):
+        if event_type not in JOURNAL_TYPES:
+            return
+        if not isinstance(data, str):
+            data = json.dumps(data, ensure_ascii=False, default=str)
+        self._put(("event", time.time(), phase, event_type, data))
+
+    def close(self, timeout=2.0):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=timeout)
+
+    # =============== 后台写线程 ===============
+
+    def _writer(self):
+        conn = _connect(self.path)
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size and time.time() < deadline:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+            try:
+                self._write_batch(conn, batch)
+            except sqlite3.Error as e:
+                print(f"[FlightJournal] 写入失败: {e}")
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        rows = []
+        with conn:
+            for item in batch:
+                kind = item[0]
+                if kind == "event":
+                    flight_id = self.flight_id or self._last_flight_id
+                    if flight_id is None:
+                        flight_id = self.flight_id = self._insert_flight(conn, item[1], None)
+                    rows.append((flight_id,) + item[1:])
+                    continue
+                # 航班边界：先把之前的事件写掉，保证归属正确
+                if rows:
+                    conn.executemany(
+                        "INSERT INTO events(flight_id, ts, phase, type, data) VALUES (?, ?, ?, ?, ?)", rows)
+                    self.written += len(rows)
+                    rows = []
+                if kind == "begin":
+                    self.flight_id = self._insert_flight(conn, item[1], item[2])
+                elif kind == "end" and self.flight_id is not None:
+                    conn.execute("UPDATE flights SET ended = ? WHERE id = ?", (item[1], self.flight_id))
+                    self._last_flight_id, self.flight_id = self.flight_id, None
+            if rows:
+                conn.executemany(
+                    "INSERT INTO events(flight_id, ts, phase, type, data) VALUES (?, ?, ?, ?, ?)", rows)
+                self.written += len(rows)
+
+    @staticmethod
+    def _insert_flight(conn, started, pack):
+        return conn.execute("INSERT INTO flights(started, pack) VALUES (?, ?)", (started, pack)).lastrowid
+
+    # =============== 查询（调用方线程，独立只读连接） ===============
+
+    def average_phase_duration(self, from_phase, to_phase, last_flights=500):
+        return average_phase_duration(self.path, from_phase, to_phase, last_flights)
+
+
+def average_phase_duration(path, from_phase, to_phase, last_flights=500):
+    """
+    最近 last_flights 个航班中，从进入 from_phase 到进入 to_phase 的平均秒数。
+    每个航班只取首次进入 from_phase 与其后首次进入 to_phase，航班之间再取平均。
+    """
+    conn = sqlite3.connect(path, timeout=5.0)
+    try:
+        row = conn.execute(
+            """
+            WITH a AS (
+                SELECT flight_id, MIN(ts) AS ts FROM events
+                WHERE type = 'phase' AND phase = ?
+                  AND flight_id IN (SELECT id FROM flights ORDER BY id DESC LIMIT ?)
+                GROUP BY flight_id
+            ), b AS (
+                SELECT e.flight_id, MIN(e.ts) AS ts FROM events e
+                JOIN a ON a.flight_id = e.flight_id
+                WHERE e.type = 'phase' AND e.phase = ? AND e.ts >= a.ts
+                GROUP BY e.flight_id
+            )
+            SELECT AVG(b.ts - a.ts), COUNT(*) FROM a JOIN b ON b.flight_id = a.flight_id
+            """,
+            (from_phase, last_flights, to_phase),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0], row[1]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+    last = int(sys.argv[4]) if len(sys.argv) > 4 else 500
+    avg, count = average_phase_duration(sys.argv[1], sys.argv[2], sys.argv[3], last)
+    if avg is None:
+        print("没有匹配的航班")
+    else:
+        print(f"{sys.argv[2]} -> {sys.argv[3]}：平均 {avg:.1f}s（{count} 个航班）")
@@ -0,0 +1,84 @@
+"""
+二进制遥测记录（flight_logs/*.cvlog）：
+- 头部 + 定长记录，记录布局与遥测总线的帧一致（含手动输入位）
+- 写入走缓冲文件，每拍只是一次 struct.pack
+- 读取用 mmap；装有 NumPy 时直接映射为结构化数组（零拷贝）
+"""
+import mmap
+import os
+import struct
+
+from telemetry_bus import FRAME_FIELDS
+
+LOG_MAGIC = b"CVFL"
+LOG_VERSION = 1
+LOG_EXT = ".cvlog"
+
+# magic, version, 记录长度, 记录格式串
+_HEADER = struct.Struct("<4sHH32s")
+
+# struct 格式字符 -> NumPy dtype（小端、无对齐）
+_NUMPY_TYPES = {"d": "<f8", "f": "<f4", "H": "<u2", "h": "<i2", "I": "<u4",
+                "i": "<i4", "l": "<i4", "q": "<i8", "Q": "<u8", "b": "i1", "B": "u1"}
+
+
+class FlightLogWriter:
+    def __init__(self, path, fields=None):
+        self.path = path
+        self.fields = list(fields or FRAME_FIELDS)
+        self._record = struct.Struct("<" + "".join(fmt for _, fmt in self.fields))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "wb", buffering=64 * 1024)
+        self._file.write(_HEADER.pack(LOG_MAGIC, LOG_VERSION, self._record.size,
+                                      self._record.format.encode("ascii")))
+        self.count = 0
+
+    def append(self, timestamp, values):
+        self._file.write(self._record.pack(timestamp, *values))
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _read_header(buf, path):
+    magic, version, size, fmt = _HEADER.unpack_from(buf, 0)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path} 不是有效的遥测记录")
+    return struct.Struct(fmt.rstrip(b"\0").decode("ascii"))
+
+
+def field_names(record):
+    count = len(record.unpack(bytes(record.size)))
+    names = [n for n, _ in FRAME_FIELDS][:count]
+    return names + [f"field_{i}" for i in range(len(names), count)]
+
+
+def read_log(path):
+    """纯 Python 读取：返回 (字段名列表, 记录元组列表)"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            record = _read_header(m, path)
+            body = m[_HEADER.size:]
+    usable = len(body) - len(body) % record.size   # 异常退出可能留下半条记录
+    return field_names(record), list(record.iter_unpack(body[:usable]))
+
+
+def load_log_array(path):
+    """
+    NumPy 读取：返回结构化数组（直接映射文件，不复制）。
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size)
+    record = _read_header(head, path)
+    dtype = np.dtype([(name, _NUMPY_TYPES[fmt]) for name, fmt in
+                      zip(field_names(record), record.format.lstrip("<"))])
+    size = os.path.getsize(path) - _HEADER.size
+    count = size // record.size
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=_HEADER.size, shape=(count,))
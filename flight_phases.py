@@ -0,0 +1,210 @@
+"""
+飞行阶段定义与状态机规则（FlightAnnouncer、预取器、回归分析共用）。
+
+守卫条件只用比较和 & / | 组合，既可以对单帧的标量求值，
+也可以直接对整段日志的 NumPy 列做向量化求值。
+"""
+from collections import namedtuple
+
+# 固定的阶段顺序
+PHASE_ORDER = [
+    "boarding",
+    "briefing",
+    "taxi",
+    "takeoff",
+    "climb",
+    "cruise",
+    "descent",
+    "approach",
+    "landing_roll",
+    "shutdown",
+    "deboarding",
+]
+
+# 离开某阶段时会播放的语音（键为当前阶段）
+PHASE_EXIT_CLIPS = {
+    "boarding": ["safety_briefing"],
+    "briefing": ["taxi_check"],
+    "taxi": ["takeoff"],
+    "takeoff": ["climb"],
+    "climb": ["cruise"],
+    "cruise": ["descent"],        # 由“准备下高”按钮播放
+    "descent": ["landing"],
+    "approach": [],
+    "landing_roll": ["arrival"],
+    "shutdown": ["deboarding"],
+    "deboarding": [],
+}
+
+
+# 阶段内定时播报：进入阶段 delay 秒后播放，离开该阶段时自动取消
+PHASE_TIMERS = {
+    "cruise": [("meal_service", 20 * 60), ("duty_free", 75 * 60)],
+}
+
+# 绝对时间播报：距离预计到达时间多少秒时播放（set_arrival_time 设置）
+ARRIVAL_CALLS = [("landing_30min", 30 * 60)]
+
+
+def upcoming_clips(phase, lookahead=2):
+    """
+    返回从 phase 起往后 lookahead 个阶段内即将用到的语音键（按播放顺序去重）。
+    """
+    if phase not in PHASE_ORDER:
+        return []
+    idx = PHASE_ORDER.index(phase)
+    keys = []
+    for p in PHASE_ORDER[idx:idx + lookahead]:
+        for key in PHASE_EXIT_CLIPS.get(p, []):
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+# =============== 状态机规则 ===============
+
+# 可调阈值（回归分析会用候选值替换后与基线对比）
+DEFAULT_THRESHOLDS = {
+    "taxi_min_kt": 3,           # briefing -> taxi 速度下限
+    "taxi_max_kt": 30,          # briefing -> taxi 速度上限
+    "climb_min_kt": 30,         # takeoff -> climb 速度下限
+    "landing_roll_max_kt": 80,  # approach -> landing_roll 速度上限
+    "deboard_max_kt": 3,        # shutdown -> deboarding 速度上限
+    "cruise_stable_sec": 60,    # climb -> cruise 高度持续稳定秒数（派生信号）
+    "cruise_min_alt_ft": 10000, # 高度稳定判巡航的最低高度（低于它的平飞视为阶梯爬升中的改平）
+    "cruise_alt_fraction": 0.9, # 已知计划巡航高度时，还要达到它的这个比例
+    "planned_cruise_ft": 0,     # 计划巡航高度（0 表示未知，由 set_cruise_altitude 设置）
+}
+
+# 手动输入位（记录在遥测帧 inputs 字段中）
+INPUT_MANUAL_CRUISE = 0x01
+INPUT_DESCENT_PRESSED = 0x02
+
+# 原始帧字段位（顺序与 decode_frame 的参数 / 遥测总线帧一致，不含时间戳）
+FIELD_LIGHTS = 0x01
+FIELD_TAS = 0x02
+FIELD_ALT = 0x04
+FIELD_SEATBELT = 0x08
+FIELD_INPUTS = 0x10
+FIELD_DERIVED = 0x20        # 派生信号（derived_signals），随时间变化，不来自单帧比较
+ALL_FIELDS = 0x3F
+
+
+def change_mask(previous, current):
+    """
+    比较两帧原始值，返回变化字段的位掩码（没有上一帧时视为全部变化）。
+    """
+    if previous is None:
+        return ALL_FIELDS
+    mask = 0
+    for i, (a, b) in enumerate(zip(previous, current)):
+        if a != b:
+            mask |= 1 << i
+    return mask
+
+
+# phase: 当前阶段；next_phase: 满足条件后进入的阶段；
+# clip: 切换前要播放的语音（None 表示直接切换）；guard(s, th) -> bool
+# fields: 守卫用到的原始字段（这些字段都没变时结果不会变，可以跳过求值）
+PhaseRule = namedtuple("PhaseRule", "phase next_phase clip guard fields")
+
+
+def decode_frame(light_bits, tas_raw, alt_raw, seatbelt_raw, inputs=0):
+    """
+    把 FSUIPC 原始值解码成状态机使用的信号。参数可以是标量，也可以是 NumPy 数组。
+    派生信号（垂直速度、稳定时长等）由 derived_signals 计算后合并进来。
+    """
+    return {
+        "nav_light": (light_bits & 0x0001) != 0,
+        "beacon_light": (light_bits & 0x0002) != 0,      # 防撞
+        "landing_light": (light_bits & 0x000C) != 0,     # 着陆或机鼻
+        "taxi_light": (light_bits & 0x0008) != 0,        # 机鼻
+        "tas_knots": tas_raw / 128.0,
+        "altitude_ft": alt_raw / 256.0,
+        "seatbelt_sign": seatbelt_raw != 0,
+        "manual_cruise": (inputs & INPUT_MANUAL_CRUISE) != 0,
+        "descent_pressed": (inputs & INPUT_DESCENT_PRESSED) != 0,
+    }
+
+
+def _off(x):
+    # 标量和数组通用的“取反”（~ 作用在 Python bool 上会得到 -2）
+    return x == 0
+
+
+PHASE_RULES = {r.phase: r for r in [
+    # boarding -> briefing（防撞灯 ON 触发安全须知）
+    PhaseRule("boarding", "briefing", "safety_briefing",
+              lambda s, th: s["beacon_light"],
+              FIELD_LIGHTS),
+    # briefing -> taxi（防撞 ON + 滑行灯 ON + 速度 3~30kt）
+    PhaseRule("briefing", "taxi", "taxi_check",
+              lambda s, th: s["beacon_light"] & s["taxi_light"]
+              & (s["tas_knots"] > th["taxi_min_kt"]) & (s["tas_knots"] < th["taxi_max_kt"]),
+              FIELD_LIGHTS | FIELD_TAS),
+    # taxi -> takeoff（在上一条基础上再加着陆灯 ON）
+    PhaseRule("taxi", "takeoff", "takeoff",
+              lambda s, th: s["beacon_light"] & s["taxi_light"] & s["landing_light"],
+              FIELD_LIGHTS),
+    # takeoff -> climb（起飞后：着陆灯 OFF 且速度>30）
+    PhaseRule("takeoff", "climb", "climb",
+              lambda s, th: _off(s["landing_light"]) & (s["tas_knots"] > th["climb_min_kt"]),
+              FIELD_LIGHTS | FIELD_TAS),
+    # climb -> cruise（优先手动按钮；其次 seatbelt OFF；或在巡航高度附近持续稳定）
+    PhaseRule("climb", "cruise", "cruise",
+              lambda s, th: s["manual_cruise"] | _off(s["seatbelt_sign"])
+              | ((s["altitude_stable_sec"] >= th["cruise_stable_sec"])
+                 & (s["altitude_ft"] >= th["cruise_min_alt_ft"])
+                 & (s["altitude_ft"] >= th["cruise_alt_fraction"] * th["planned_cruise_ft"])),
+              FIELD_INPUTS | FIELD_SEATBELT | FIELD_ALT | FIELD_DERIVED),
+    # cruise -> descent（只接受“下高”按钮；语音已由按钮播放）
+    PhaseRule("cruise", "descent", None,
+              lambda s, th: s["descent_pressed"],
+              FIELD_INPUTS),
+    # descent -> approach（着陆灯 + 滑行灯都 ON 认为进近）
+    PhaseRule("descent", "approach", "landing",
+              lambda s, th: s["landing_light"] & s["taxi_light"],
+              FIELD_LIGHTS),
+    # approach -> landing_roll（速度<80 认为接地滑跑）
+    PhaseRule("approach", "landing_roll", None,
+              lambda s, th: s["tas_knots"] < th["landing_roll_max_kt"],
+              FIELD_TAS),
+    # landing_roll -> shutdown（到达阶段：着陆灯 OFF 且防撞灯仍 ON）
+    PhaseRule("landing_roll", "shutdown", "arrival",
+              lambda s, th: _off(s["landing_light"]) & s["beacon_light"],
+              FIELD_LIGHTS),
+    # shutdown -> deboarding（完全停稳且防撞灯 OFF）
+    PhaseRule("shutdown", "deboarding", "deboarding",
+              lambda s, th: (s["tas_knots"] < th["deboard_max_kt"]) & _off(s["beacon_light"]),
+              FIELD_TAS | FIELD_LIGHTS),
+]}
+
+
+# 快照恢复时用第一帧校正阶段
+GROUND_PHASES = ("boarding", "briefing", "taxi")
+AIRBORNE_PHASES = ("climb", "cruise", "descent", "approach")
+
+
+def reconcile_phase(phase, signals, thresholds=DEFAULT_THRESHOLDS):
+    """
+    用恢复后的第一帧（标量信号）校正快照中的阶段：
+    - 快照在起飞前，但飞机已经在空中 -> climb（不再补播起飞前的广播）
+    - 快照在空中，但飞机已停稳且防撞灯关闭 -> boarding（上一个航班已经结束）
+    """
+    airborne = signals["tas_knots"] > thresholds["landing_roll_max_kt"]
+    parked = signals["tas_knots"] < thresholds["deboard_max_kt"] and not signals["beacon_light"]
+    if phase in GROUND_PHASES and airborne:
+        return "climb"
+    if phase in AIRBORNE_PHASES and parked:
+        return "boarding"
+    return phase
+
+
+def evaluate(phase, signals, thresholds=DEFAULT_THRESHOLDS):
+    """
+    单帧求值：满足当前阶段的切换条件时返回对应规则，否则返回 None。
+    """
+    rule = PHASE_RULES.get(phase)
+    if rule is not None and rule.guard(signals, thresholds):
+        return rule
+    return None
@@ -0,0 +1,156 @@
+"""
+参数化的模拟航班剖面（供 fake_pyuipc、负载测试、离线渲染使用）：
+登机 -> 推出 -> 滑出 -> 起飞 -> 爬升 -> 巡航 -> 下降 -> 进近 -> 滑跑 -> 滑入 -> 关车 -> 下客。
+sample(t) 返回与 FlightAnnouncer.offsets 相同编码的原始值（灯光位、TAS*128、高度*256、安全带）。
+"""
+import random
+from collections import namedtuple
+
+# 灯光位（0x0D0C）
+LIGHT_NAV = 0x0001
+LIGHT_BEACON = 0x0002
+LIGHT_LANDING = 0x0004
+LIGHT_TAXI = 0x0008
+
+# 机组在前端按的按钮（记录在遥测帧的 inputs 字段，与 flight_phases.INPUT_* 一致）
+INPUT_DESCENT_PRESSED = 0x02
+
+DEFAULT_PROFILE = {
+    "gate_sec": 300.0,          # 登机
+    "pushback_sec": 120.0,      # 推出（防撞灯已开，速度 < 3kt）
+    "taxi_out_sec": 300.0,
+    "taxi_kt": 15.0,
+    "takeoff_sec": 45.0,        # 起飞滑跑到离地
+    "rotate_kt": 150.0,
+    "climb_fpm": 2000.0,
+    "climb_kt": 300.0,
+    "cruise_alt_ft": 35000.0,
+    "cruise_kt": 450.0,
+    "cruise_sec": 3600.0,
+    "descent_fpm": 1500.0,
+    "approach_alt_ft": 3000.0,
+    "approach_sec": 360.0,
+    "approach_kt": 140.0,
+    "rollout_sec": 40.0,
+    "taxi_in_sec": 240.0,
+    "shutdown_sec": 120.0,
+    "deboard_sec": 300.0,
+    "landing_lights_ft": 10000.0,   # 低于该高度开着陆灯
+}
+
+Segment = namedtuple("Segment", "name start duration")
+Sample = namedtuple("Sample", "segment light_bits tas_raw alt_raw seatbelt_raw inputs")
+
+
+def _lerp(a, b, u):
+    return a + (b - a) * max(0.0, min(1.0, u))
+
+
+class FlightProfile:
+    def __init__(self, **params):
+        unknown = set(params) - set(DEFAULT_PROFILE)
+        if unknown:
+            raise ValueError(f"未知的剖面参数: {', '.join(sorted(unknown))}")
+        self.params = dict(DEFAULT_PROFILE, **params)
+        p = self.params
+        climb_sec = p["cruise_alt_ft"] / p["climb_fpm"] * 60.0
+        descent_sec = (p["cruise_alt_ft"] - p["approach_alt_ft"]) / p["descent_fpm"] * 60.0
+        durations = [
+            ("gate", p["gate_sec"]),
+            ("pushback", p["pushback_sec"]),
+            ("taxi_out", p["taxi_out_sec"]),
+            ("takeoff", p["takeoff_sec"]),
+            ("climb", climb_sec),
+            ("cruise", p["cruise_sec"]),
+            ("descent", descent_sec),
+            ("approach", p["approach_sec"]),
+            ("rollout", p["rollout_sec"]),
+            ("taxi_in", p["taxi_in_sec"]),
+            ("shutdown", p["shutdown_sec"]),
+            ("deboard", p["deboard_sec"]),
+        ]
+        self.segments = []
+        t = 0.0
+        for name, duration in durations:
+            self.segments.append(Segment(name, t, duration))
+            t += duration
+        self.duration = t
+
+    @classmethod
+    def randomized(cls, rng=None, **overrides):
+        """随机化各段时长 / 巡航高度，用于批量生成不同的航班"""
+        rng = rng or random
+        p = {
+            "gate_sec": rng.uniform(120, 900),
+            "taxi_out_sec": rng.uniform(120, 900),
+            "cruise_alt_ft": rng.choice([24000, 29000, 33000, 35000, 37000, 39000]),
+            "cruise_sec": rng.uniform(600, 5 * 3600),
+            "approach_sec": rng.uniform(240, 600),
+            "taxi_in_sec": rng.uniform(60, 600),
+        }
+        p.update(overrides)
+        return cls(**p)
+
+    def segment_at(self, t):
+        for seg in self.segments:
+            if t < seg.start + seg.duration:
+                return seg
+        return self.segments[-1]
+
+    def sample(self, t):
+        """
+        t 秒（相对航班开始）时的原始值；超出剖面长度时停在最后状态。
+        """
+        p = self.params
+        seg = self.segment_at(t)
+        u = (t - seg.start) / seg.duration if seg.duration > 0 else 1.0
+        lights = LIGHT_NAV | LIGHT_BEACON
+        seatbelt = 1
+        inputs = 0
+        name = seg.name
+
+        if name == "gate":
+            lights, tas, alt = LIGHT_NAV, 0.0, 0.0
+        elif name == "pushback":
+            tas, alt = 2.0, 0.0
+        elif name == "taxi_out":
+            lights |= LIGHT_TAXI
+            tas, alt = p["taxi_kt"], 0.0
+        elif name == "takeoff":
+            lights |= LIGHT_TAXI | LIGHT_LANDING
+            tas, alt = _lerp(p["taxi_kt"], p["rotate_kt"], u), 0.0
+        elif name == "climb":
+            alt = _lerp(0.0, p["cruise_alt_ft"], u)
+            tas = _lerp(p["rotate_kt"], p["climb_kt"], u * 3)
+            if alt < p["landing_lights_ft"]:
+                lights |= LIGHT_LANDING
+        elif name == "cruise":
+            alt, tas = p["cruise_alt_ft"], p["cruise_kt"]
+            # 平飞两分钟后关安全带灯
+            if t - seg.start > 120:
+                seatbelt = 0
+        elif name == "descent":
+            alt = _lerp(p["cruise_alt_ft"], p["approach_alt_ft"], u)
+            tas = _lerp(p["cruise_kt"], 250.0, u * 2)
+            # “准备下高”按钮保持整个下降段（与前端按钮置位到离开巡航一致），
+            # 暂停 / 断线错过开头几秒也不会丢
+            inputs = INPUT_DESCENT_PRESSED
+            if alt < p["landing_lights_ft"]:
+                lights |= LIGHT_LANDING
+        elif name == "approach":
+            lights |= LIGHT_LANDING | LIGHT_TAXI
+            alt = _lerp(p["approach_alt_ft"], 0.0, u)
+            tas = _lerp(200.0, p["approach_kt"], u * 2)
+        elif name == "rollout":
+            lights |= LIGHT_LANDING | LIGHT_TAXI
+            alt, tas = 0.0, _lerp(p["approach_kt"], p["taxi_kt"], u)
+        elif name == "taxi_in":
+            alt, tas = 0.0, p["taxi_kt"]
+        elif name == "shutdown":
+            alt, tas = 0.0, 0.0
+            if u > 0.5:
+                lights = LIGHT_NAV
+        else:   # deboard
+            lights, alt, tas, seatbelt = LIGHT_NAV, 0.0, 0.0, 0
+
+        return Sample(name, lights, int(tas * 128), int(alt * 256), seatbelt, inputs)
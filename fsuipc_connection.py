@@ -0,0 +1,168 @@
+"""
+FSUIPC 连接管理：
+- 独立的生命周期线程负责 open/close，失败时指数退避（带随机抖动），不阻塞检测线程
+- 检测线程断线期间只是等待 connected 事件，几乎不占 CPU
+- 连接断开只通知一次；恢复以“第一帧读取成功”为准，并统计恢复耗时
+"""
+import random
+import threading
+import time
+
+import pyuipc
+
+
+class FsuipcConnection:
+    def __init__(self, on_connected=None, on_disconnected=None,
+                 base_delay=0.5, max_delay=30.0, api=None):
+        """
+        on_connected(recover_sec): 连接后第一帧读取成功（首次连接时 recover_sec 为 None）
+        on_disconnected(error): 连接失效（每次断开只调用一次）
+        api: 提供 open / read / close / FSUIPCException 的对象，默认 pyuipc 模块
+             （负载测试给每个连接一个模拟航班，生命周期线程和检测线程看到的是同一个）
+        """
+        self.api = api if api is not None else pyuipc
+        self.on_connected = on_connected
+        self.on_disconnected = on_disconnected
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()       # open/close 与 read 互斥
+        self._thread = None
+
+        # 健康指标
+        self.open_attempts = 0
+        self.reconnect_count = 0
+        self.last_recover_sec = None
+        self.total_downtime_sec = 0.0
+        self.last_error = None
+        self._down_since = None             # 断开时刻
+        self._awaiting_frame = False        # 已 open，等待第一帧
+        self._ever_connected = False
+
+    # =============== 生命周期 ===============
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._lifecycle, name="FsuipcConnection", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        with self._lock:
+            try:
+                self.api.close()
+            except Exception:
+                pass
+        self.connected.clear()
+
+    def _lifecycle(self):
+        attempt = 0
+        while not self._stop.is_set():
+            if self.connected.is_set():
+                # 已连接：睡到 read 发现断线再醒
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            self.open_attempts += 1
+            with self._lock:
+                try:
+                    self.api.close()
+                except Exception:
+                    pass
+                try:
+                    self.api.open(0)
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    self.last_error = e
+            if ok:
+                attempt = 0
+                self._awaiting_frame = True
+                self.connected.set()
+                continue
+
+            if self._down_since is None:
+                # 首次连接就失败：也算断开，只通知一次
+                self._down_since = time.time()
+                self._notify_disconnected(self.last_error)
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)
+            attempt = min(attempt + 1, 16)
+            self._stop.wait(delay)
+
+    # =============== 检测线程调用 ===============
+
+    def wait_connected(self, timeout):
+        return self.connected.wait(timeout)
+
+    def read(self, offsets):
+        """
+        读取一帧；断线时返回 None（并唤醒生命周期线程重连）。
+        """
+        if not self.connected.is_set():
+            return None
+        with self._lock:
+            try:
+                values = self.api.read(offsets)
+            except self.api.FSUIPCException as e:
+                values = None
+                error = e
+        if values is None:
+            self._mark_disconnected(error)
+            return None
+
+        if self._awaiting_frame:
+            self._awaiting_frame = False
+            recover = None
+            if self._down_since is not None:
+                recover = time.time() - self._down_since
+                self.total_downtime_sec += recover
+                self._down_since = None
+                if self._ever_connected:
+                    self.reconnect_count += 1
+                    self.last_recover_sec = recover
+            first = not self._ever_connected
+            self._ever_connected = True
+            if self.on_connected is not None:
+                try:
+                    self.on_connected(None if first else recover)
+                except Exception as e:
+                    print(f"[FsuipcConnection] 连接回调异常: {e}")
+        return values
+
+    def _mark_disconnected(self, error):
+        self.last_error = error
+        self.connected.clear()
+        self._awaiting_frame = False
+        if self._down_since is None:
+            self._down_since = time.time()
+            self._notify_disconnected(error)
+        self._wake.set()
+
+    def _notify_disconnected(self, error):
+        if self.on_disconnected is not None:
+            try:
+                self.on_disconnected(error)
+            except Exception as e:
+                print(f"[FsuipcConnection] 断开回调异常: {e}")
+
+    def stats(self):
+        down = self.total_downtime_sec
+        if self._down_since is not None:
+            down += time.time() - self._down_since
+        return {
+            "connected": self.connected.is_set(),
+            "open_attempts": self.open_attempts,
+            "reconnect_count": self.reconnect_count,
+            "last_recover_sec": self.last_recover_sec,
+            "total_downtime_sec": down,
+        }
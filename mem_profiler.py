@@ -0,0 +1,140 @@
+"""
+内存排查模式（长途航班 RSS 缓慢上涨时用）：
+- 设置环境变量 CABIN_MEMPROFILE=1（或 tracemalloc 保留的栈帧数，如 CABIN_MEMPROFILE=10）后启用
+- 每次阶段切换调用 mark(阶段名)：拍一张 tracemalloc 快照，记录 RSS、线程数和各组件登记的量
+  （已解码语音字节数、日志文档大小、事件队列深度等），并与上一张快照做差
+- 退出时 write_report() 写出每个阶段的增长最多的分配位置与各项数值的变化
+未启用时 mark / write_report 直接返回，不启动 tracemalloc。
+"""
+import os
+import threading
+import time
+import tracemalloc
+
+MEMPROFILE_ENV = "CABIN_MEMPROFILE"
+REPORT_NAME = "mem_report.txt"
+
+# 快照里不统计的文件（tracemalloc 自身、导入机制）
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes():
+    """当前进程常驻内存；拿不到时返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _mb(n):
+    return "-" if n is None else f"{n / 2 ** 20:.1f} MiB"
+
+
+class MemoryProfiler:
+    def __init__(self, report_path, frames=0, top=15):
+        self.report_path = report_path
+        self.frames = frames
+        self.enabled = frames > 0
+        self.top = top
+        self._gauges = {}
+        self._marks = []                 # [(阶段, 时间, RSS, traced, {量: 值}, [增长最多的分配])]
+        self._previous = None
+        self._lock = threading.Lock()
+        if self.enabled:
+            tracemalloc.start(frames)
+            print(f"[MemoryProfiler] 已启用（{frames} 层栈帧），报告: {report_path}")
+
+    def add_gauge(self, name, fn):
+        """登记一个每次 mark 时采集的数值（fn 返回 int / float / None）"""
+        if self.enabled:
+            self._gauges[name] = fn
+
+    def _sample_gauges(self):
+        values = {"threads": threading.active_count()}
+        for name, fn in self._gauges.items():
+            try:
+                values[name] = fn()
+            except Exception as e:
+                values[name] = None
+                print(f"[MemoryProfiler] 采集 {name} 失败: {e}")
+        return values
+
+    def mark(self, label):
+        if not self.enabled:
+            return
+        with self._lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            if self._previous is None:
+                stats = snapshot.statistics("lineno")[:self.top]
+                growth = [(str(s.traceback), s.size, s.count) for s in stats]
+            else:
+                stats = snapshot.compare_to(self._previous, "lineno")[:self.top]
+                growth = [(str(s.traceback), s.size_diff, s.count_diff) for s in stats]
+            self._previous = snapshot
+            traced, _peak = tracemalloc.get_traced_memory()
+            self._marks.append((label, time.time(), rss_bytes(), traced, self._sample_gauges(), growth))
+
+    def write_report(self):
+        if not self.enabled or not self._marks:
+            return None
+        lines = [f"内存报告 {time.strftime('%Y-%m-%d %H:%M:%S')}，{len(self._marks)} 个采样点", ""]
+        first = self._marks[0]
+        prev = None
+        for label, ts, rss, traced, gauges, growth in self._marks:
+            elapsed = ts - first[1]
+            lines.append(f"== {label}（+{elapsed / 60:.1f} 分钟）==")
+            lines.append(f"  RSS {_mb(rss)}，Python 分配 {_mb(traced)}")
+            if prev is not None and rss is not None and prev[2] is not None:
+                lines.append(f"  较上一阶段 RSS {(rss - prev[2]) / 2 ** 20:+.1f} MiB，"
+                             f"Python 分配 {(traced - prev[3]) / 2 ** 20:+.1f} MiB")
+            for name, value in gauges.items():
+                before = prev[4].get(name) if prev is not None else None
+                delta = f"（{value - before:+}）" if isinstance(value, (int, float)) and isinstance(before, (int, float)) else ""
+                lines.append(f"  {name}: {value}{delta}")
+            lines.append("  增长最多的分配位置：" if prev is not None else "  占用最多的分配位置：")
+            for where, size, count in growth:
+                lines.append(f"    {size / 1024:+10.1f} KiB {count:+7d} 块  {where}")
+            lines.append("")
+            prev = (label, ts, rss, traced, gauges)
+
+        last = self._marks[-1]
+        if first[2] is not None and last[2] is not None:
+            lines.append(f"全程 RSS {_mb(first[2])} -> {_mb(last[2])}，Python 分配 {_mb(first[3])} -> {_mb(last[3])}")
+        try:
+            with open(self.report_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"[MemoryProfiler] 写入报告失败: {e}")
+            return None
+        print(f"[MemoryProfiler] 报告已写入 {self.report_path}")
+        return self.report_path
+
+    def stop(self):
+        if self.enabled:
+            tracemalloc.stop()
+            self.enabled = False
+
+
+def profiler_from_env(report_path):
+    """
+    读取 CABIN_MEMPROFILE：未设置 / 0 时返回未启用的分析器（调用开销只有一次属性判断）。
+    """
+    value = os.environ.get(MEMPROFILE_ENV, "").strip()
+    if not value:
+        return MemoryProfiler(report_path)
+    try:
+        frames = int(value)
+    except ValueError:
+        frames = 1 if value.lower() in ("true", "yes", "on") else 0
+    return MemoryProfiler(report_path, frames=max(0, frames))
@@ -0,0 +1,210 @@
+"""
+本地指标端点（Prometheus 文本格式）：
+- 计数器 / 仪表 / 直方图只在写入线程里做一次加法，抓取时不加锁、不进检测线程
+- 需要从各组件现取的数值（阶段、缓存命中、队列深度、重连次数）注册为采集函数，抓取时才计算
+- HTTP 服务只监听 127.0.0.1，在独立线程运行；端口来自构造参数或环境变量 CABIN_METRICS_PORT
+
+    curl http://127.0.0.1:9464/metrics
+"""
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT_ENV = "CABIN_METRICS_PORT"
+
+# FSUIPC 读取等短耗时操作的默认分桶（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        return [(self.name, self.labels, self.value)]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [(self.name, self.labels, self.value)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)   # 最后一格是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        counts = list(self._counts)
+        out = []
+        total = 0
+        for bound, n in zip(self.buckets, counts):
+            total += n
+            out.append((self.name + "_bucket", {"le": repr(float(bound))}, total))
+        total += counts[-1]
+        out.append((self.name + "_bucket", {"le": "+Inf"}, total))
+        out.append((self.name + "_sum", None, self.sum))
+        out.append((self.name + "_count", None, total))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="cabin_"):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()   # 只保护注册表本身，不参与计数
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=None):
+        return self._register(Counter(self.prefix + name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=None):
+        return self._register(Gauge(self.prefix + name, help_text, labels))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self.prefix + name, help_text, buckets))
+
+    def add_collector(self, name, kind, help_text, fn):
+        """
+        抓取时调用 fn()，返回数值，或 [(标签字典, 数值), ...]。
+        """
+        with self._lock:
+            self._collectors.append((self.prefix + name, kind, help_text, fn))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        families = {}
+        for metric in metrics:
+            fam = families.setdefault(metric.name, [metric.kind, metric.help, []])
+            fam[2].extend(metric.samples())
+        for name, kind, help_text, fn in collectors:
+            try:
+                result = fn()
+            except Exception as e:
+                print(f"[Metrics] 采集 {name} 失败: {e}")
+                continue
+            if result is None:
+                continue
+            if not isinstance(result, list):
+                result = [(None, result)]
+            fam = families.setdefault(name, [kind, help_text, []])
+            fam[2].extend((name, labels, value) for labels, value in result)
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass    # 不刷屏
+
+
+class MetricsServer:
+    def __init__(self, registry, port, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        handler = type("MetricsHandler", (_Handler,), {"registry": self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        print(f"[Metrics] 指标端点: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def port_from_env():
+    """读取 CABIN_METRICS_PORT；未设置或无效时返回 None（不启用）"""
+    value = os.environ.get(METRICS_PORT_ENV, "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        print(f"[Metrics] 无效的端口: {value}")
+        return None
@@ -0,0 +1,486 @@
+"""
+离线渲染整段航班的广播时间线（比实时快几个数量级）：
+- 用虚拟时钟驱动 FlightAnnouncer._process_frame，遥测来自录制的 flight_logs/*.cvlog 或 flight_profile 合成剖面
+- OfflineMixer 顶替 AudioManager，只记录音乐 / 语音 / 淡出 / 闪避事件，不出声
+- 最后按块用 NumPy 把所有事件混成一个 WAV，并写出 cue 表（每段的开始 / 结束 / 与上一段的间隔）
+
+    python offline_render.py --pack CES -o flight.wav                  # 默认合成剖面
+    python offline_render.py --pack CES --log flight_logs/x.cvlog -o x.wav
+    python offline_render.py --pack CES --cruise-sec 600 --rate 16000 --mono -o short.wav
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from flight_phases import INPUT_DESCENT_PRESSED, INPUT_MANUAL_CRUISE
+from pack_archive import resolve_ref, split_ref
+from pack_manifest import DEFAULT_MIXER_FORMAT
+from phrase_engine import DEFAULT_CROSSFADE_MS, concat_pcm
+from power_monitor import FULL_INTERVAL
+
+# 与 AudioManager._fade_out_current_voice 的默认时长一致
+VOICE_FADE_SEC = 1.0
+# 每次混音处理的块长（秒），内存占用与航班长度无关
+MIX_BLOCK_SEC = 30.0
+
+
+class VirtualClock:
+    """虚拟时钟：sleep 只推进时间，不真的等待"""
+
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+        self.start = self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def advance_to(self, t):
+        # 播报等待可能已经把时钟推到下一帧之后
+        self.now = max(self.now, t)
+
+    def elapsed(self):
+        return self.now - self.start
+
+
+class _Event:
+    """一段被播放的音频：kind 为 voice / phrase / music"""
+
+    __slots__ = ("kind", "name", "source", "start", "end", "fade_at", "fade_sec", "loop", "phase", "ending")
+
+    def __init__(self, kind, name, source, start, duration, loop=False, phase=None):
+        self.kind = kind
+        self.name = name
+        self.source = source        # 文件路径 / 归档引用，或 (PCM bytes, 格式)
+        self.start = start
+        self.end = start + duration if not loop else float("inf")
+        self.fade_at = None
+        self.fade_sec = 0.0
+        self.loop = loop
+        self.phase = phase
+        self.ending = "complete"
+
+    def fade(self, at, seconds):
+        if at >= self.end:
+            return
+        self.fade_at = at
+        self.fade_sec = max(0.0, seconds)
+        self.end = min(self.end, at + self.fade_sec)
+        self.ending = "faded"
+
+    def stop(self, at):
+        if at >= self.end:
+            return
+        self.end = at
+        self.ending = "stopped"
+
+
+class OfflineMixer:
+    """
+    AudioManager 的离线替身：接口与 FlightAnnouncer 用到的部分一致，播放只是记下事件。
+    """
+
+    def __init__(self, clock, rate=None, channels=None, phase_fn=None):
+        default_rate, _width, default_channels = DEFAULT_MIXER_FORMAT
+        self.clock = clock
+        self.rate = rate or default_rate
+        self.channels = channels or default_channels
+        self.phase_fn = phase_fn or (lambda: None)
+        self.events = []
+        self.background_volume = 1.0
+        self.voice_volume = 1.0
+        self.volume_steps = [(float("-inf"), 1.0)]   # (时间, 全局音量)
+        self.duck_steps = [(float("-inf"), 1.0)]     # (时间, 闪避系数)
+        self.current_voice = None
+        self.current_music = None
+        self._pcm = {}          # 源 -> float32 数组（输出采样率 / 声道）
+
+    # ---------- 解码 ----------
+
+    def _to_output(self, data, fmt):
+        rate, width, channels = fmt
+        if width != 2:
+            raise ValueError(f"只支持 16 位 PCM（{width * 8} 位）")
+        pcm = np.frombuffer(data, dtype="<i2")
+        pcm = pcm[:len(pcm) - len(pcm) % channels].reshape(-1, channels).astype(np.float32) / 32768.0
+        if channels != self.channels:
+            pcm = pcm.mean(axis=1, keepdims=True) if self.channels == 1 else np.repeat(pcm[:, :1], self.channels, 1)
+        if rate != self.rate and len(pcm):
+            count = int(round(len(pcm) * self.rate / rate))
+            x = np.linspace(0.0, len(pcm) - 1, count)
+            pcm = np.stack([np.interp(x, np.arange(len(pcm)), pcm[:, c]) for c in range(self.channels)],
+                           axis=1).astype(np.float32)
+        return pcm
+
+    def _read_raw(self, file):
+        """文件 / 归档引用 -> (PCM bytes, (采样率, 字节数, 声道))"""
+        if split_ref(file) is not None:
+            view, fmt = resolve_ref(file)
+            return bytes(view), tuple(fmt)
+        if file.lower().endswith(".wav"):
+            with wave.open(file, "rb") as w:
+                return w.readframes(w.getnframes()), (w.getframerate(), w.getsampwidth(), w.getnchannels())
+        # ogg / mp3 交给 pygame 解码（离线渲染时用 dummy 驱动初始化 mixer）
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        import pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=self.rate, size=-16, channels=self.channels)
+        freq, size, channels = pygame.mixer.get_init()
+        return pygame.mixer.Sound(file).get_raw(), (freq, abs(size) // 8, channels)
+
+    def _decode(self, source):
+        key = source if isinstance(source, str) else id(source)
+        pcm = self._pcm.get(key)
+        if pcm is None:
+            data, fmt = self._read_raw(source) if isinstance(source, str) else source
+            pcm = self._to_output(data, fmt)
+            self._pcm[key] = pcm
+        return pcm
+
+    def _duration(self, source):
+        return len(self._decode(source)) / float(self.rate)
+
+    # ---------- AudioManager 接口 ----------
+
+    def set_global_volume(self, volume):
+        volume = max(0.0, min(1.0, float(volume)))
+        self.background_volume = self.voice_volume = volume
+        self.volume_steps.append((self.clock(), volume))
+
+    def get_global_volume(self):
+        return self.voice_volume
+
+    def play_background(self, file, loop=True):
+        try:
+            self._decode(file)
+        except Exception as e:
+            print(f"[OfflineMixer] 无法解码背景音乐 {file}: {e}")
+            return False
+        if self.current_music is not None:
+            self.current_music.stop(self.clock())
+        now = self.clock()
+        self.current_music = _Event("music", _clip_name(file), file, now, self._duration(file),
+                                    loop=loop, phase=self.phase_fn())
+        self.events.append(self.current_music)
+        return True
+
+    def fadeout_background(self, ms):
+        if self.current_music is not None:
+            self.current_music.fade(self.clock(), ms / 1000.0)
+
+    def stop_background(self):
+        if self.current_music is not None:
+            self.current_music.stop(self.clock())
+
+    def duck_background(self, level):
+        self.duck_steps.append((self.clock(), max(0.0, min(1.0, float(level)))))
+
+    def voice_busy(self):
+        return self.current_voice is not None and self.current_voice.end > self.clock()
+
+    def _start_voice(self, event):
+        # 与 AudioManager 一致：新语音立即开始，正在播的那段同时淡出
+        if self.voice_busy():
+            self.current_voice.fade(self.clock(), VOICE_FADE_SEC)
+        self.current_voice = event
+        self.events.append(event)
+        return True
+
+    def play_voice(self, file):
+        try:
+            duration = self._duration(file)
+        except Exception as e:
+            print(f"[OfflineMixer] 播放语音失败: {e}")
+            return False
+        return self._start_voice(_Event("voice", _clip_name(file), file, self.clock(), duration,
+                                        phase=self.phase_fn()))
+
+    def prepare_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        fmt = (self.rate, 2, self.channels)
+        chunks = [(np.clip(self._decode(f), -1.0, 1.0) * 32767).astype("<i2").tobytes() for f in files]
+        return concat_pcm(chunks, fmt, crossfade_ms), fmt
+
+    def play_sequence(self, files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        try:
+            source = self.prepare_sequence(files, crossfade_ms)
+        except Exception as e:
+            print(f"[OfflineMixer] 拼接语音失败: {e}")
+            return False
+        name = "+".join(_clip_name(f) for f in files)
+        duration = self._duration(source)
+        return self._start_voice(_Event("phrase", name, source, self.clock(), duration, phase=self.phase_fn()))
+
+    def fade_out_voice(self, duration=1.0):
+        if self.voice_busy():
+            self.current_voice.fade(self.clock(), duration)
+
+    def preload(self, file):
+        return True
+
+    def release(self, file):
+        pass
+
+    def clear_phrases(self):
+        pass
+
+    def cache_stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+    # ---------- 混音 ----------
+
+    def _gain(self, steps, times):
+        """分段常数包络（音量 / 闪避）在 times 处的取值"""
+        at = np.array([t for t, _ in steps])
+        values = np.array([v for _, v in steps], dtype=np.float32)
+        return values[np.searchsorted(at, times, side="right") - 1]
+
+    def timeline_end(self):
+        ends = [e.end for e in self.events if e.end != float("inf")]
+        return max(ends) if ends else 0.0
+
+    def render(self, path, origin, end=None):
+        """
+        按块混音写 WAV：origin 为时间线零点（时钟值），end 为结束时钟值（循环音乐截止于此）。
+        """
+        end = self.timeline_end() if end is None else end
+        total = max(0, int(round((end - origin) * self.rate)))
+        block = int(MIX_BLOCK_SEC * self.rate)
+        peak = 0.0
+        with wave.open(path, "wb") as out:
+            out.setnchannels(self.channels)
+            out.setsampwidth(2)
+            out.setframerate(self.rate)
+            for b0 in range(0, total, block):
+                b1 = min(total, b0 + block)
+                buf = np.zeros((b1 - b0, self.channels), dtype=np.float32)
+                t0 = origin + b0 / self.rate
+                t1 = origin + b1 / self.rate
+                for event in self.events:
+                    if event.start >= t1 or min(event.end, end) <= t0:
+                        continue
+                    self._mix_event(buf, event, t0, t1, end)
+                if len(buf):
+                    peak = max(peak, float(np.abs(buf).max()))
+                out.writeframes((np.clip(buf, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        return total / float(self.rate), peak
+
+    def _mix_event(self, buf, event, t0, t1, end):
+        rate = self.rate
+        pcm = self._decode(event.source)
+        if not len(pcm):
+            return
+        s0 = int(round((event.start - t0) * rate))           # 事件起点在块内的位置（可为负）
+        stop = min(event.end, end, t1)
+        a = max(0, s0)
+        b = int(round((stop - t0) * rate))
+        if b <= a:
+            return
+        idx = np.arange(a - s0, b - s0)                       # 事件内的采样下标
+        src = pcm[idx % len(pcm)] if event.loop else pcm[np.minimum(idx, len(pcm) - 1)]
+        if not event.loop:
+            src = np.where((idx < len(pcm))[:, None], src, 0.0)
+        times = t0 + np.arange(a, b) / rate
+        gain = self._gain(self.volume_steps, times)
+        if event.kind == "music":
+            gain = gain * self._gain(self.duck_steps, times)
+        if event.fade_at is not None:
+            if event.fade_sec > 0:
+                gain = gain * np.clip(1.0 - (times - event.fade_at) / event.fade_sec, 0.0, 1.0)
+            else:
+                gain = gain * (times < event.fade_at)
+        buf[a:b] += src * gain[:, None]
+
+    def write_cue_sheet(self, path, origin):
+        """
+        cue 表：每段的开始 / 结束（相对时间线零点的秒数）、结束方式、与上一段语音的静默间隔。
+        """
+        rows = []
+        last_voice_end = None
+        for event in sorted(self.events, key=lambda e: e.start):
+            end = event.end if event.end != float("inf") else None
+            gap = ""
+            if event.kind != "music":
+                if last_voice_end is not None:
+                    gap = f"{event.start - last_voice_end:.3f}"
+                last_voice_end = event.end
+            rows.append({
+                "start_sec": f"{event.start - origin:.3f}",
+                "end_sec": "" if end is None else f"{end - origin:.3f}",
+                "start": _hms(event.start - origin),
+                "kind": event.kind,
+                "clip": event.name,
+                "phase": event.phase or "",
+                "ending": event.ending if end is not None else "open",
+                "gap_sec": gap,
+            })
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["start_sec", "end_sec", "start", "kind", "clip", "phase",
+                                                   "ending", "gap_sec"])
+            writer.writeheader()
+            writer.writerows(rows)
+        return rows
+
+
+def _clip_name(file):
+    ref = split_ref(file)
+    if ref is not None:
+        return ref[1]
+    return os.path.splitext(os.path.basename(file))[0]
+
+
+def _hms(seconds):
+    seconds = max(0, int(seconds))
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# =============== 遥测来源 ===============
+
+def profile_frames(profile, interval=FULL_INTERVAL):
+    """合成剖面 -> [(相对秒数, 灯光位, TAS, 高度, 安全带, 输入位)]"""
+    frames = []
+    t = 0.0
+    while t < profile.duration:
+        s = profile.sample(t)
+        frames.append((t, s.light_bits, s.tas_raw, s.alt_raw, s.seatbelt_raw, s.inputs))
+        t += interval
+    return frames
+
+
+def log_frames(path):
+    """录制的 .cvlog -> 与 profile_frames 相同的帧列表（时间改为相对第一帧）"""
+    from flight_log import read_log
+
+    names, records = read_log(path)
+    if not records:
+        return []
+    col = {name: i for i, name in enumerate(names)}
+    t0 = records[0][col["timestamp"]]
+    has_inputs = "inputs" in col
+    return [(r[col["timestamp"]] - t0, r[col["light_bits"]], r[col["tas_raw"]], r[col["alt_raw"]],
+             r[col["seatbelt_raw"]], r[col["inputs"]] if has_inputs else 0) for r in records]
+
+
+# =============== 渲染 ===============
+
+def render_flight(frames, output, pack=None, rate=None, channels=None, boarding_music=True,
+                  min_gap_sec=None, gap_jitter_sec=None, seed=None):
+    """
+    用虚拟时钟把帧喂给 FlightAnnouncer，混音写到 output，cue 表写到 output 同名 .csv。
+    返回 (cue 行列表, 统计字典)。
+    """
+    import random
+
+    from flight_announcer import FlightAnnouncer
+
+    if seed is not None:
+        random.seed(seed)
+    clock = VirtualClock()
+    workdir = tempfile.mkdtemp(prefix="cabin_render_")
+    holder = {}
+    mixer = OfflineMixer(clock.time, rate=rate, channels=channels,
+                         phase_fn=lambda: getattr(holder.get("announcer"), "phase", None))
+    announcer = FlightAnnouncer(audio_process=False, audio_manager=mixer, data_path=workdir,
+                                clock=clock.time, sleep=clock.sleep)
+    holder["announcer"] = announcer
+    announcer.record_telemetry = False
+    if pack:
+        announcer.load_sound_folder(pack)
+    if min_gap_sec is not None:
+        announcer.min_gap_sec = min_gap_sec
+    if gap_jitter_sec is not None:
+        announcer.gap_jitter_sec = gap_jitter_sec
+
+    started = time.perf_counter()
+    try:
+        if boarding_music:
+            announcer.start_boarding()
+        prev_inputs = 0
+        for t, light_bits, tas_raw, alt_raw, seatbelt_raw, inputs in frames:
+            clock.advance_to(clock.start + t)
+            # 录制 / 合成数据里的按钮位：上升沿时按一次前端按钮
+            pressed = inputs & ~prev_inputs
+            prev_inputs = inputs
+            if pressed & INPUT_MANUAL_CRUISE:
+                announcer.trigger_cruise()
+            if pressed & INPUT_DESCENT_PRESSED:
+                announcer.prepare_descent()
+            announcer._process_frame(light_bits, tas_raw, alt_raw, seatbelt_raw)
+    finally:
+        announcer.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    simulated = time.perf_counter() - started
+
+    end = max(clock.now, mixer.timeline_end())
+    started = time.perf_counter()
+    seconds, peak = mixer.render(output, clock.start, end)
+    mixed = time.perf_counter() - started
+    cue_path = os.path.splitext(output)[0] + ".csv"
+    rows = mixer.write_cue_sheet(cue_path, clock.start)
+
+    gaps = [float(r["gap_sec"]) for r in rows if r["gap_sec"]]
+    stats = {
+        "audio_sec": seconds,
+        "simulate_sec": simulated,
+        "mix_sec": mixed,
+        "speedup": seconds / max(simulated + mixed, 1e-9),
+        "clips": sum(1 for r in rows if r["kind"] != "music"),
+        "min_gap_sec": min(gaps) if gaps else None,
+        "overlaps": sum(1 for g in gaps if g < 0),
+        "peak": peak,
+        "final_phase": announcer.phase,
+        "cue_sheet": cue_path,
+    }
+    return rows, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线渲染航班广播时间线为 WAV")
+    parser.add_argument("-o", "--output", default="flight_render.wav")
+    parser.add_argument("--pack", help="语音包文件夹名（sounds 下）或路径")
+    parser.add_argument("--log", help="录制的遥测 .cvlog；不指定时用合成剖面")
+    parser.add_argument("--cruise-sec", type=float, help="合成剖面的巡航时长（秒）")
+    parser.add_argument("--rate", type=int, help="输出采样率（默认与语音包 mixer 格式一致）")
+    parser.add_argument("--mono", action="store_true", help="输出单声道")
+    parser.add_argument("--min-gap", type=float, help="覆盖 min_gap_sec")
+    parser.add_argument("--jitter", type=float, help="覆盖 gap_jitter_sec")
+    parser.add_argument("--seed", type=int, default=1, help="间隔抖动的随机种子")
+    parser.add_argument("--no-music", action="store_true", help="不播放登机音乐")
+    args = parser.parse_args(argv)
+
+    if args.log:
+        frames = log_frames(args.log)
+    else:
+        from flight_profile import FlightProfile
+        params = {"cruise_sec": args.cruise_sec} if args.cruise_sec is not None else {}
+        frames = profile_frames(FlightProfile(**params))
+    if not frames:
+        print("没有可用的遥测帧")
+        return 1
+
+    rows, stats = render_flight(frames, args.output, pack=args.pack, rate=args.rate,
+                                channels=1 if args.mono else None, boarding_music=not args.no_music,
+                                min_gap_sec=args.min_gap, gap_jitter_sec=args.jitter, seed=args.seed)
+    for r in rows:
+        print(f"  {r['start']}  {r['kind']:<6} {r['clip']:<24} {r['phase']:<14} {r['ending']:<8} {r['gap_sec']}")
+    print(f"渲染 {stats['audio_sec'] / 60:.1f} 分钟音频，模拟 {stats['simulate_sec']:.1f}s + 混音 {stats['mix_sec']:.1f}s"
+          f"（{stats['speedup']:.0f} 倍实时），{stats['clips']} 段播报，结束阶段 {stats['final_phase']}")
+    if stats["min_gap_sec"] is not None:
+        print(f"最短间隔 {stats['min_gap_sec']:.2f}s，重叠 {stats['overlaps']} 次，峰值 {stats['peak']:.2f}")
+    print(f"输出: {args.output}，cue 表: {stats['cue_sheet']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
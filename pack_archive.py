@@ -0,0 +1,150 @@
+"""
+编译后的语音包归档（sounds/<pack>/pack.cvpack）：
+- 头部 + PCM 数据块 + JSON 索引，PCM 已按 mixer 格式重采样并做响度归一
+- 运行时一次 mmap，各语音是指向映射区的 memoryview（零拷贝）
+- 归档文件被重新编译（大小或修改时间变化）后，下次打开时换成新映射；
+  旧映射在没有 memoryview 引用之后才真正关闭
+- 语音引用写作 "<归档路径>|<语音键>"（'|' 不会出现在 Windows 路径中）
+- 归档里的 PCM 已重采样、归一，内容键由源文件 sha1、归档格式和增益推出，不与原始文件共用
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+ARCHIVE_NAME = "pack.cvpack"
+ARCHIVE_MAGIC = b"CVPK"
+ARCHIVE_VERSION = 1
+CLIP_REF_SEP = "|"
+DATA_ALIGN = 16
+
+# magic, version, 保留, 采样率, 每样本字节数, 声道数, 索引偏移, 索引长度
+HEADER = struct.Struct("<4sHHIHHQI")
+
+
+def make_ref(archive_path, key):
+    return f"{archive_path}{CLIP_REF_SEP}{key}"
+
+
+def split_ref(ref):
+    """语音引用 -> (归档路径, 语音键)；普通文件路径返回 None"""
+    if not isinstance(ref, str) or CLIP_REF_SEP not in ref:
+        return None
+    archive_path, key = ref.rsplit(CLIP_REF_SEP, 1)
+    return archive_path, key
+
+
+class PackArchive:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            st = os.fstat(self._file.fileno())
+            self.file_key = (st.st_size, st.st_mtime_ns)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._map)
+
+        magic, version, _, rate, width, channels, index_off, index_len = HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"{path} 不是有效的语音包归档")
+        self.format = (rate, width, channels)
+        self.index = json.loads(bytes(self._view[index_off:index_off + index_len]).decode("utf-8"))
+
+    def keys(self):
+        return list(self.index.keys())
+
+    def clip(self, key):
+        """返回语音 PCM 的 memoryview（不复制数据）"""
+        rec = self.index[key]
+        return self._view[rec["offset"]:rec["offset"] + rec["length"]]
+
+    def duration(self, key):
+        return self.index[key]["duration"]
+
+    def content_sha1(self, key):
+        """
+        这段 PCM 的内容哈希。同一源文件按同样格式、同样增益编译出的 PCM 相同，可以共享解码数据；
+        与原始文件（清单里的 sha1）一定不同。
+        """
+        rec = self.index[key]
+        rate, width, channels = self.format
+        text = f"{rec.get('sha1')}|cvpack{ARCHIVE_VERSION}|{rate}/{width}/{channels}|{rec.get('gain_db')}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def close(self):
+        """
+        关闭映射。仍有语音的 memoryview 在用时不关闭，返回 False（之后再试）。
+        """
+        if self._map is None:
+            return True
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            return False
+        self._map = None
+        self._file.close()
+        return True
+
+
+# 进程内共享已打开的归档（同一个文件只映射一次）
+_open_archives = {}
+_retired = []           # 已被替换或关闭、但还有 memoryview 在用的旧归档
+_open_lock = threading.Lock()
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _retire(archive):
+    if not archive.close():
+        _retired.append(archive)
+
+
+def _reap_retired():
+    _retired[:] = [a for a in _retired if not a.close()]
+
+
+def open_archive(path):
+    with _open_lock:
+        _reap_retired()
+        archive = _open_archives.get(path)
+        if archive is not None and archive.file_key != _file_key(path):
+            # 归档被重新编译或删除：旧映射作废
+            del _open_archives[path]
+            _retire(archive)
+            archive = None
+        if archive is None:
+            archive = PackArchive(path)
+            _open_archives[path] = archive
+        return archive
+
+
+def close_archive(path):
+    with _open_lock:
+        archive = _open_archives.pop(path, None)
+        if archive is not None:
+            _retire(archive)
+        _reap_retired()
+
+
+def resolve_ref(ref):
+    """语音引用 -> (PCM memoryview, 归档格式)"""
+    archive_path, key = split_ref(ref)
+    archive = open_archive(archive_path)
+    return archive.clip(key), archive.format
+
+
+def archive_path_for(folder):
+    return os.path.join(folder, ARCHIVE_NAME)
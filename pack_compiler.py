@@ -0,0 +1,134 @@
+"""
+语音包编译器：把 sounds/<pack>/ 里的零散 mp3/ogg/wav 编译成一个 pack.cvpack 归档。
+- 多进程并行解码（每个工作进程自带一个静音的 pygame mixer）
+- PCM 统一重采样为 mixer 格式，并按 RMS 做响度归一（带峰值保护）
+
+用法：
+    python pack_compiler.py sounds/CES [sounds/其他包 ...] [--target-dbfs -20] [--jobs N]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pack_archive import (ARCHIVE_MAGIC, ARCHIVE_VERSION, DATA_ALIGN, HEADER,
+                          archive_path_for, close_archive)
+from pack_manifest import DEFAULT_MIXER_FORMAT, load_manifest
+
+DEFAULT_TARGET_DBFS = -20.0
+PEAK_CEILING_DBFS = -1.0
+FULL_SCALE = 32767.0
+
+
+# =============== 工作进程 ===============
+
+def _init_worker(mixer_format):
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    rate, width, channels = mixer_format
+    pygame.mixer.init(frequency=rate, size=-8 * width, channels=channels)
+
+
+def _db_to_ratio(db):
+    return 10.0 ** (db / 20.0)
+
+
+def _decode_and_normalize(key, path, target_dbfs):
+    """
+    解码一个语音并归一响度，返回 (key, pcm, 增益 dB)。
+    """
+    import pygame
+    pcm = pygame.mixer.Sound(path).get_raw()
+    samples = np.frombuffer(pcm, "<i2").astype(np.float64)
+
+    rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    if rms <= 0:
+        return key, pcm, 0.0
+
+    gain = _db_to_ratio(target_dbfs) * FULL_SCALE / rms
+    # 峰值保护：归一后峰值不超过 PEAK_CEILING_DBFS
+    gain = min(gain, _db_to_ratio(PEAK_CEILING_DBFS) * FULL_SCALE / max(peak, 1))
+    if abs(gain - 1.0) > 1e-3:
+        pcm = np.clip(np.rint(samples * gain), -32768, 32767).astype("<i2").tobytes()
+    return key, pcm, 20.0 * math.log10(gain)
+
+
+# =============== 编译 ===============
+
+def compile_pack(folder, output=None, target_dbfs=DEFAULT_TARGET_DBFS,
+                 mixer_format=DEFAULT_MIXER_FORMAT, jobs=None):
+    """
+    编译一个语音包文件夹，返回归档路径。
+    """
+    output = output or archive_path_for(folder)
+    manifest = load_manifest(folder, mixer_format)
+    if not manifest:
+        raise ValueError(f"{folder} 中没有可编译的语音")
+
+    rate, width, channels = mixer_format
+    frame_bytes = width * channels
+    started = time.time()
+
+    tmp = output + ".tmp"
+    index = {}
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(),
+                             initializer=_init_worker, initargs=(mixer_format,)) as pool:
+        futures = [pool.submit(_decode_and_normalize, key, rec["path"], target_dbfs)
+                   for key, rec in sorted(manifest.items())]
+
+        with open(tmp, "wb") as out:
+            out.write(b"\0" * HEADER.size)
+            for fut in futures:
+                key, pcm, gain_db = fut.result()
+                pad = (-out.tell()) % DATA_ALIGN
+                out.write(b"\0" * pad)
+                index[key] = {
+                    "offset": out.tell(),
+                    "length": len(pcm),
+                    "duration": len(pcm) / float(frame_bytes * rate),
+                    "sha1": manifest[key]["sha1"],
+                    "gain_db": round(gain_db, 2),
+                }
+                out.write(pcm)
+                print(f"  {key}: {index[key]['duration']:.1f}s, 增益 {gain_db:+.1f} dB")
+
+            index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+            index_off = out.tell()
+            out.write(index_bytes)
+            out.seek(0)
+            out.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, rate, width, channels,
+                                  index_off, len(index_bytes)))
+
+    # 本进程若已映射旧归档，先关闭再替换（Windows 不允许替换已映射的文件）
+    close_archive(output)
+    os.replace(tmp, output)
+    print(f"已生成 {output}：{len(index)} 条语音，用时 {time.time() - started:.1f}s")
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把语音包文件夹编译成单个可 mmap 的归档")
+    parser.add_argument("folders", nargs="+", help="语音包文件夹，例如 sounds/CES")
+    parser.add_argument("-o", "--output", help="输出文件（只编译一个文件夹时可用）")
+    parser.add_argument("--target-dbfs", type=float, default=DEFAULT_TARGET_DBFS,
+                        help="响度归一目标（RMS dBFS，默认 -20）")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数（默认全部核心）")
+    args = parser.parse_args(argv)
+
+    if args.output and len(args.folders) > 1:
+        parser.error("--output 只能与单个文件夹一起使用")
+
+    for folder in args.folders:
+        print(f"编译 {folder} ...")
+        compile_pack(folder, args.output, args.target_dbfs, jobs=args.jobs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+语音包清单（sounds/<pack>/manifest.json）：
+- 每个语音一条记录：键、文件名、大小、mtime、sha1、时长、原始格式、解码后字节数
+- 只解析文件头，不解码音频；只有 mtime/大小变化的文件才会重新探测
+- 加载语音包 = 一次目录列举 + 读取一个小 JSON
+"""
+import hashlib
+import json
+import os
+import struct
+import wave
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+AUDIO_EXTS = (".mp3", ".ogg", ".wav")
+
+# 运行时 mixer 的格式（采样率, 每样本字节数, 声道数），用于估算解码后内存
+DEFAULT_MIXER_FORMAT = (44100, 2, 2)
+
+
+# =============== 文件头探测 ===============
+
+def _probe_wav(path):
+    with wave.open(path, "rb") as w:
+        rate = w.getframerate()
+        return {
+            "format": "wav",
+            "sample_rate": rate,
+            "channels": w.getnchannels(),
+            "sample_width": w.getsampwidth(),
+            "duration": w.getnframes() / float(rate) if rate else 0.0,
+        }
+
+
+def _probe_ogg(path):
+    with open(path, "rb") as f:
+        head = f.read(4096)
+        idx = head.find(b"\x01vorbis")
+        if idx < 0:
+            raise ValueError("不是 Vorbis 流")
+        channels = head[idx + 11]
+        rate = struct.unpack_from("<I", head, idx + 12)[0]
+
+        # 最后一页的 granule position 即总采样数
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        last = tail.rfind(b"OggS")
+        granule = struct.unpack_from("<q", tail, last + 6)[0] if last >= 0 else 0
+    return {
+        "format": "ogg",
+        "sample_rate": rate,
+        "channels": channels,
+        "sample_width": 2,
+        "duration": granule / float(rate) if rate and granule > 0 else 0.0,
+    }
+
+
+_MP3_BITRATES = {
+    # (MPEG1?, layer) -> kbps 表
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _probe_mp3(path):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = 0
+        if head[:3] == b"ID3":
+            # 跳过 ID3v2 标签（长度是 synchsafe 整数）
+            start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+        f.seek(start)
+        data = f.read(65536)
+
+    pos = 0
+    while pos + 4 <= len(data):
+        if data[pos] == 0xFF and (data[pos + 1] & 0xE0) == 0xE0:
+            break
+        pos += 1
+    else:
+        raise ValueError("找不到 MP3 帧头")
+
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 0x03           # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    mpeg1 = version == 3
+    layer = 4 - ((b1 >> 1) & 0x03)
+    rate = _MP3_RATES[version][(b2 >> 2) & 0x03]
+    kbps = _MP3_BITRATES.get((mpeg1, 3), [0] * 16)[(b2 >> 4) & 0x0F]
+    channels = 1 if (b3 >> 6) == 3 else 2
+    samples_per_frame = 1152 if (mpeg1 or layer != 3) else 576
+
+    duration = 0.0
+    # Xing/Info 头里有总帧数（VBR 文件）
+    side = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    xing = pos + 4 + side
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 0x01:
+            frames = struct.unpack_from(">I", data, xing + 8)[0]
+            duration = frames * samples_per_frame / float(rate)
+    if not duration and kbps:
+        duration = (size - start - pos) * 8 / (kbps * 1000.0)
+
+    return {
+        "format": "mp3",
+        "sample_rate": rate,
+        "channels": channels,
+        "sample_width": 2,
+        "duration": duration,
+    }
+
+
+def probe_clip(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        return _probe_wav(path)
+    if ext == ".ogg":
+        return _probe_ogg(path)
+    return _probe_mp3(path)
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def decoded_bytes(duration, mixer_format=DEFAULT_MIXER_FORMAT):
+    rate, width, channels = mixer_format
+    return int(round(duration * rate)) * width * channels
+
+
+# =============== 清单读写 ===============
+
+def _build_entry(folder, entry, mixer_format):
+    path = os.path.join(folder, entry.name)
+    st = entry.stat()
+    record = {
+        "key": os.path.splitext(entry.name)[0],
+        "file": entry.name,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha1": file_sha1(path),
+        "format": os.path.splitext(entry.name)[1].lower().lstrip("."),
+        "sample_rate": 0,
+        "channels": 0,
+        "sample_width": 0,
+        "duration": 0.0,
+    }
+    try:
+        record.update(probe_clip(path))
+    except Exception as e:
+        # 头部解析失败不影响播放，只是拿不到时长
+        print(f"[PackManifest] 无法解析 {entry.name}: {e}")
+    record["decoded_bytes"] = decoded_bytes(record["duration"], mixer_format)
+    return record
+
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_manifest(folder, data):
+    path = os.path.join(folder, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        # 只读目录（例如打包后的临时目录）只保留内存中的结果
+        print(f"[PackManifest] 无法写入清单: {e}")
+
+
+def scan_entries(folder):
+    """列出语音包中的音频文件（os.DirEntry）"""
+    with os.scandir(folder) as it:
+        return [e for e in it if e.is_file() and e.name.lower().endswith(AUDIO_EXTS)]
+
+
+def load_manifest(folder, mixer_format=DEFAULT_MIXER_FORMAT, verify=True):
+    """
+    返回 {语音键: 记录}，记录中的 "path" 为绝对路径。
+    verify=True 时对比目录中的 mtime/大小，只重新探测变化的文件；
+    verify=False 时直接信任已有清单（只读一个文件）。
+    """
+    data = _read_manifest(folder)
+    if data is not None and tuple(data.get("mixer_format", ())) != tuple(mixer_format):
+        data = None
+    if data is not None and not verify:
+        return _with_paths(folder, data["clips"])
+
+    old = {c["file"]: c for c in data["clips"]} if data else {}
+    clips = []
+    changed = data is None
+    for entry in scan_entries(folder):
+        st = entry.stat()
+        rec = old.pop(entry.name, None)
+        if rec is None or rec["size"] != st.st_size or rec["mtime_ns"] != st.st_mtime_ns:
+            rec = _build_entry(folder, entry, mixer_format)
+            changed = True
+        clips.append(rec)
+    if old:
+        changed = True   # 有文件被删除
+
+    if changed:
+        _write_manifest(folder, {
+            "version": MANIFEST_VERSION,
+            "mixer_format": list(mixer_format),
+            "clips": clips,
+        })
+    return _with_paths(folder, clips)
+
+
+def _with_paths(folder, clips):
+    result = {}
+    for rec in clips:
+        rec = dict(rec)
+        rec["path"] = os.path.join(folder, rec["file"])
+        result[rec["key"]] = rec
+    return result
+
+
+def list_packs(sounds_path):
+    """列出 sounds 目录下的语音包文件夹（按名称排序）"""
+    with os.scandir(sounds_path) as it:
+        return sorted(e.name for e in it if e.is_dir())
@@ -0,0 +1,164 @@
+"""
+语音包热重载：监视 sounds/ 目录
+- 安装了 watchdog 时使用系统文件通知（Windows 为 ReadDirectoryChangesW，Linux 为 inotify）
+- 否则退化为轮询（每次只 scandir，不读文件内容）
+- 文件写入过程中会连续变化，等一个周期内不再变化后才通知，避免读到半个文件
+回调都在监视线程上执行，不占用检测线程。
+"""
+import os
+import threading
+import time
+
+from pack_archive import ARCHIVE_NAME
+from pack_manifest import AUDIO_EXTS, list_packs
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # 可选依赖
+    Observer = None
+    FileSystemEventHandler = object
+
+
+def _is_pack_file(name):
+    """语音文件或编译后的归档（重新编译也要触发重载）"""
+    name = name.lower()
+    return name.endswith(AUDIO_EXTS) or name == ARCHIVE_NAME
+
+
+class _DirtyHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        self.watcher._mark_dirty(event.src_path, event.is_directory)
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            self.watcher._mark_dirty(dest, event.is_directory)
+
+
+class PackWatcher:
+    def __init__(self, sounds_path, on_pack_changed, on_packs_changed, interval=1.0):
+        """
+        on_pack_changed(pack_name): 某个语音包里的音频文件或归档有增删改
+        on_packs_changed(names): 语音包文件夹列表变化
+        """
+        self.sounds_path = sounds_path
+        self.on_pack_changed = on_pack_changed
+        self.on_packs_changed = on_packs_changed
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._dirty = set()          # 有变化的语音包
+        self._packs_dirty = False
+        self._last_event = 0.0
+        self._observer = None
+        self._thread = None
+
+    # =============== 生命周期 ===============
+
+    def start(self):
+        if not os.path.isdir(self.sounds_path):
+            return False
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_DirtyHandler(self), self.sounds_path, recursive=True)
+                self._observer.start()
+                target = self._notify_loop
+            except Exception as e:
+                print(f"[PackWatcher] 文件通知不可用，改用轮询: {e}")
+                self._observer = None
+                target = self._poll_loop
+        else:
+            target = self._poll_loop
+        self._thread = threading.Thread(target=target, name="PackWatcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+            except Exception:
+                pass
+
+    # =============== 文件通知模式 ===============
+
+    def _mark_dirty(self, path, is_directory):
+        rel = os.path.relpath(path, self.sounds_path)
+        parts = rel.split(os.sep)
+        with self._lock:
+            if len(parts) == 1:
+                if is_directory:
+                    self._packs_dirty = True
+            elif _is_pack_file(parts[-1]):
+                self._dirty.add(parts[0])
+            else:
+                return
+            self._last_event = time.time()
+
+    def _notify_loop(self):
+        while not self._stop.wait(self.interval / 2):
+            with self._lock:
+                quiet = time.time() - self._last_event >= self.interval
+                if not quiet or not (self._dirty or self._packs_dirty):
+                    continue
+                dirty, self._dirty = self._dirty, set()
+                packs_dirty, self._packs_dirty = self._packs_dirty, False
+            self._dispatch(dirty, packs_dirty)
+
+    # =============== 轮询模式 ===============
+
+    def _snapshot(self):
+        snap = {}
+        try:
+            packs = list_packs(self.sounds_path)
+        except OSError:
+            return snap
+        for pack in packs:
+            files = {}
+            try:
+                with os.scandir(os.path.join(self.sounds_path, pack)) as it:
+                    for e in it:
+                        if e.is_file() and _is_pack_file(e.name):
+                            st = e.stat()
+                            files[e.name] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+            snap[pack] = files
+        return snap
+
+    def _poll_loop(self):
+        known = self._snapshot()
+        pending = None
+        while not self._stop.wait(self.interval):
+            snap = self._snapshot()
+            if snap == known:
+                pending = None
+                continue
+            if snap != pending:
+                # 仍在变化（例如文件正在写入），下个周期再确认
+                pending = snap
+                continue
+            dirty = {p for p in snap if p in known and snap[p] != known[p]}
+            packs_dirty = set(snap) != set(known)
+            known, pending = snap, None
+            self._dispatch(dirty, packs_dirty)
+
+    # =============== 通知 ===============
+
+    def _dispatch(self, dirty, packs_dirty):
+        if packs_dirty:
+            try:
+                self.on_packs_changed(list_packs(self.sounds_path))
+            except Exception as e:
+                print(f"[PackWatcher] 语音包列表回调失败: {e}")
+        for pack in sorted(dirty):
+            try:
+                self.on_pack_changed(pack)
+            except Exception as e:
+                print(f"[PackWatcher] 重载 {pack} 失败: {e}")
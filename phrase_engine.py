@@ -0,0 +1,142 @@
+"""
+拼接式动态播报（航班号、目的地、到达时间、温度）：
+- 模板来自语音包里的 phrases.json，由固定语音和槽位组成
+- 槽位用包里预录的片段填充（数字、城市名、单位等）
+- 片段 PCM 直接拼成一段，衔接处做短交叉淡化；拼好的结果按内容键缓存
+
+phrases.json 示例：
+    {
+      "crossfade_ms": 30,
+      "templates": {
+        "safety_briefing": ["welcome_aboard", "flight", "{flight_number:digits}",
+                            "bound_for", "{destination:city}", "safety_briefing"],
+        "arrival": ["arrival", "local_temperature", "{temperature:number}", "degrees"]
+      }
+    }
+槽位写法：
+    {slot}          直接把值当作片段键
+    {slot:digits}   逐字符朗读：digit_0 … digit_9 / letter_a …
+    {slot:number}   优先用 num_<值>，包里没有时退回逐位朗读
+    {slot:xxx}      片段键为 xxx_<值>（如 city_pvg）
+模板名与阶段语音同名时，播报时优先使用模板（缺槽位或缺片段则退回固定语音）。
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+PHRASES_NAME = "phrases.json"
+DEFAULT_CROSSFADE_MS = 30
+_MIN_CROSSFADE_FRAMES = 16
+_SAMPLE_TYPES = {2: "<i2", 4: "<i4"}
+
+
+class PhraseBook:
+    def __init__(self, templates=None, crossfade_ms=DEFAULT_CROSSFADE_MS):
+        self.templates = dict(templates or {})
+        self.crossfade_ms = crossfade_ms
+
+    @classmethod
+    def load(cls, folder):
+        """读取语音包的 phrases.json，不存在时返回空模板集"""
+        path = os.path.join(folder, PHRASES_NAME)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("templates", {}), data.get("crossfade_ms", DEFAULT_CROSSFADE_MS))
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def __len__(self):
+        return len(self.templates)
+
+    def expand(self, name, info, has_snippet):
+        """
+        把模板展开成片段键列表。
+        info: 槽位值（set_flight_info 设置）；has_snippet(key) -> bool
+        缺少槽位值或片段时抛出 KeyError。
+        """
+        keys = []
+        for part in self.templates[name]:
+            if not (part.startswith("{") and part.endswith("}")):
+                keys.append(part)
+                continue
+            slot, _, kind = part[1:-1].partition(":")
+            value = info.get(slot)
+            if value is None or value == "":
+                raise KeyError(f"缺少槽位值: {slot}")
+            keys.extend(_slot_keys(str(value).strip().lower(), kind, has_snippet))
+        missing = [k for k in keys if not has_snippet(k)]
+        if missing:
+            raise KeyError(f"缺少片段: {', '.join(missing)}")
+        return keys
+
+
+def _spell(value):
+    keys = []
+    for ch in value:
+        if ch.isdigit():
+            keys.append(f"digit_{ch}")
+        elif ch.isalpha():
+            keys.append(f"letter_{ch}")
+        elif ch == "-":
+            keys.append("minus")
+    return keys
+
+
+def _slot_keys(value, kind, has_snippet):
+    if kind == "digits":
+        return _spell(value)
+    if kind == "number":
+        key = f"num_{value}"
+        return [key] if has_snippet(key) else _spell(value)
+    if kind:
+        return [f"{kind}_{value.replace(' ', '_')}"]
+    return [value]
+
+
+def phrase_key(files, crossfade_ms=DEFAULT_CROSSFADE_MS):
+    """按内容（片段路径 + 交叉淡化长度）生成缓存键"""
+    digest = hashlib.sha1("\n".join(files).encode("utf-8") + f"|{crossfade_ms}".encode("ascii"))
+    return "phrase:" + digest.hexdigest()[:16]
+
+
+def concat_pcm(chunks, fmt, crossfade_ms=DEFAULT_CROSSFADE_MS):
+    """
+    拼接同一格式的 PCM 片段：fmt = (采样率, 每样本字节数, 声道数)。
+    相邻片段重叠 crossfade_ms，前一段线性淡出、后一段线性淡入。
+    """
+    rate, width, channels = fmt
+    dtype = _SAMPLE_TYPES.get(width)
+    if dtype is None:
+        raise ValueError(f"不支持的样本宽度: {width}")
+    info = np.iinfo(dtype)
+    xf_frames = int(rate * crossfade_ms / 1000)
+    parts = []
+    tail = None                 # 上一段末尾待交叉淡化的帧
+    for chunk in chunks:
+        frames = np.frombuffer(chunk, dtype, count=len(chunk) // width // channels * channels)
+        frames = frames.reshape(-1, channels)
+        overlap = 0 if tail is None else min(xf_frames, len(tail), len(frames))
+        if overlap < _MIN_CROSSFADE_FRAMES:
+            if tail is not None:
+                parts.append(tail)
+        else:
+            if overlap < len(tail):
+                parts.append(tail[:len(tail) - overlap])
+            ramp = ((np.arange(overlap) + 0.5) / overlap)[:, None]
+            mixed = tail[len(tail) - overlap:] * (1.0 - ramp) + frames[:overlap] * ramp
+            parts.append(np.clip(np.rint(mixed), info.min, info.max).astype(dtype))
+            frames = frames[overlap:]
+        # 每段只留末尾 xf_frames 帧等下一段来淡化，其余直接输出
+        keep = min(xf_frames, len(frames))
+        parts.append(frames[:len(frames) - keep])
+        tail = frames[len(frames) - keep:]
+    if tail is not None:
+        parts.append(tail)
+    if not parts:
+        return b""
+    return np.concatenate(parts).astype(dtype, copy=False).tobytes()
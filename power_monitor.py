@@ -0,0 +1,62 @@
+"""
+低功耗模式：
+- full：正常 0.5s 一拍，完整读取并驱动状态机
+- eco：模拟器暂停 / 在菜单中，只以慢节奏读取暂停与就绪偏移，不做状态判断、不刷新 UI
+- absent：FSUIPC 未连接，等待连接事件
+并统计每种模式下检测线程每分钟的唤醒次数。
+"""
+import time
+
+# 暂停 / 就绪偏移（eco 模式只读这两个）
+ECO_OFFSETS = [
+    (0x0264, 'H'),  # 暂停指示（非 0 = 暂停）
+    (0x3364, 'b'),  # 就绪指示（0 = 已可飞行；非 0 = 菜单 / 加载中）
+]
+
+FULL_INTERVAL = 0.5     # full 模式节拍
+ECO_INTERVAL = 2.0      # eco 模式节拍
+ABSENT_INTERVAL = 1.5   # 未连接时的最长等待（要小于 stop_detection 的 join 超时）
+
+MODES = ("full", "eco", "absent")
+
+
+def sim_active(pause_raw, ready_raw):
+    """模拟器正在飞行（未暂停且不在菜单中）"""
+    return pause_raw == 0 and ready_raw == 0
+
+
+class PowerMonitor:
+    def __init__(self, mode="absent"):
+        self.mode = mode
+        self._since = time.time()
+        self.wakeups = {m: 0 for m in MODES}
+        self.seconds = {m: 0.0 for m in MODES}
+
+    def wakeup(self):
+        self.wakeups[self.mode] += 1
+
+    def switch(self, mode):
+        """切换模式，返回是否真的发生了变化"""
+        if mode == self.mode:
+            return False
+        now = time.time()
+        self.seconds[self.mode] += now - self._since
+        self._since = now
+        self.mode = mode
+        return True
+
+    def rate(self, mode):
+        """某模式下每分钟唤醒次数"""
+        seconds = self.seconds[mode]
+        if mode == self.mode:
+            seconds += time.time() - self._since
+        if seconds <= 0:
+            return 0.0
+        return self.wakeups[mode] * 60.0 / seconds
+
+    def report(self):
+        return {m: round(self.rate(m), 1) for m in MODES}
+
+    def describe(self):
+        names = {"full": "全速", "eco": "节能", "absent": "未连接"}
+        return "，".join(f"{names[m]} {self.rate(m):.0f} 次/分" for m in MODES if self.seconds[m] or m == self.mode)
@@ -0,0 +1,229 @@
+"""
+批量回归分析：修改状态机阈值后，在大量历史遥测记录上对比阶段时间线。
+- 每个记录文件 mmap 读取，装有 NumPy 时整列向量化求值守卫条件
+- 多进程并行（默认使用全部核心）
+- 输出每个航班的基线 / 候选时间线及差异汇总
+
+用法：
+    python regression_analyzer.py flight_logs/ --set taxi_max_kt=25 --set landing_roll_max_kt=70
+    python regression_analyzer.py a.cvlog b.cvlog --jobs 8 --json report.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from derived_signals import DerivedSignals, derived_columns
+from flight_log import LOG_EXT, load_log_array, read_log
+from flight_phases import DEFAULT_THRESHOLDS, PHASE_ORDER, PHASE_RULES, decode_frame, evaluate
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖：没有 NumPy 时逐帧求值
+    np = None
+
+
+# =============== 单个记录 ===============
+
+def _decode_columns(data):
+    """整列解码，并整列补上派生信号（与阈值无关，基线 / 候选共用一次）"""
+    signals = decode_frame(data["light_bits"].astype(np.int64), data["tas_raw"].astype(np.float64),
+                           data["alt_raw"].astype(np.float64), data["seatbelt_raw"], data["inputs"])
+    signals.update(derived_columns(data["timestamp"], signals["altitude_ft"], signals["tas_knots"]))
+    return signals
+
+
+def _timeline_vectorized(data, signals, thresholds):
+    """
+    整列求值：每个阶段的守卫只算一次布尔数组，再找下一次命中的下标。
+    与实时状态机一致：切换发生在第 k 帧，下一条规则从第 k+1 帧开始判断。
+    """
+    ts = data["timestamp"]
+    n = len(ts)
+    phase = PHASE_ORDER[0]
+    timeline = [(phase, float(ts[0]))]
+    i = 0
+    while phase in PHASE_RULES and i < n:
+        rule = PHASE_RULES[phase]
+        mask = np.broadcast_to(np.asarray(rule.guard(signals, thresholds)), (n,))
+        hits = np.flatnonzero(mask[i:])
+        if len(hits) == 0:
+            break
+        k = i + int(hits[0])
+        phase = rule.next_phase
+        timeline.append((phase, float(ts[k])))
+        i = k + 1
+    return timeline
+
+
+def _timeline_scalar(names, rows, thresholds):
+    idx = {name: names.index(name) for name in ("timestamp", "light_bits", "tas_raw",
+                                                  "alt_raw", "seatbelt_raw", "inputs")}
+    phase = PHASE_ORDER[0]
+    timeline = [(phase, rows[0][idx["timestamp"]])]
+    derived = DerivedSignals()
+    for row in rows:
+        signals = decode_frame(row[idx["light_bits"]], row[idx["tas_raw"]], row[idx["alt_raw"]],
+                               row[idx["seatbelt_raw"]], row[idx["inputs"]])
+        signals.update(derived.update(row[idx["timestamp"]], signals["altitude_ft"], signals["tas_knots"]))
+        rule = evaluate(phase, signals, thresholds)
+        if rule is not None:
+            phase = rule.next_phase
+            timeline.append((phase, row[idx["timestamp"]]))
+    return timeline
+
+
+def diff_timelines(baseline, candidate, tolerance=0.5):
+    """
+    对比两条时间线（时间相对记录开头），返回有差异的阶段列表。
+    """
+    t0 = baseline[0][1] if baseline else 0.0
+    base = {p: t - t0 for p, t in baseline}
+    cand = {p: t - t0 for p, t in candidate}
+    diffs = []
+    for phase in PHASE_ORDER:
+        b, c = base.get(phase), cand.get(phase)
+        if b is None and c is None:
+            continue
+        if b is None or c is None or abs(b - c) > tolerance:
+            diffs.append({
+                "phase": phase,
+                "baseline": b,
+                "candidate": c,
+                "shift": (c - b) if (b is not None and c is not None) else None,
+            })
+    return diffs
+
+
+def analyze_file(path, baseline, candidate, tolerance=0.5):
+    if np is not None:
+        data = load_log_array(path)
+        frames = len(data)
+        if frames == 0:
+            return {"file": path, "frames": 0, "baseline": [], "candidate": [], "diff": []}
+        signals = _decode_columns(data)
+        base_tl = _timeline_vectorized(data, signals, baseline)
+        cand_tl = _timeline_vectorized(data, signals, candidate)
+    else:
+        names, rows = read_log(path)
+        frames = len(rows)
+        if frames == 0:
+            return {"file": path, "frames": 0, "baseline": [], "candidate": [], "diff": []}
+        base_tl = _timeline_scalar(names, rows, baseline)
+        cand_tl = _timeline_scalar(names, rows, candidate)
+    return {
+        "file": path,
+        "frames": frames,
+        "baseline": base_tl,
+        "candidate": cand_tl,
+        "diff": diff_timelines(base_tl, cand_tl, tolerance),
+    }
+
+
+def _analyze_job(args):
+    return analyze_file(*args)
+
+
+# =============== 批量 ===============
+
+def collect_logs(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*" + LOG_EXT))))
+        else:
+            paths.append(item)
+    return paths
+
+
+def analyze_corpus(paths, baseline, candidate, jobs=None, tolerance=0.5):
+    jobs = jobs or os.cpu_count() or 1
+    tasks = [(p, baseline, candidate, tolerance) for p in paths]
+    if jobs == 1 or len(tasks) < 2:
+        return [_analyze_job(t) for t in tasks]
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_analyze_job, tasks, chunksize=chunksize))
+
+
+def summarize(results):
+    """
+    汇总：受影响航班数、每个阶段的平均偏移、缺失 / 新增次数。
+    """
+    per_phase = {}
+    changed = 0
+    for res in results:
+        if res["diff"]:
+            changed += 1
+        for d in res["diff"]:
+            stat = per_phase.setdefault(d["phase"], {"flights": 0, "shift_sum": 0.0, "shifted": 0,
+                                                     "missing": 0, "new": 0})
+            stat["flights"] += 1
+            if d["shift"] is not None:
+                stat["shift_sum"] += d["shift"]
+                stat["shifted"] += 1
+            elif d["candidate"] is None:
+                stat["missing"] += 1
+            else:
+                stat["new"] += 1
+    for stat in per_phase.values():
+        stat["mean_shift"] = stat["shift_sum"] / stat["shifted"] if stat["shifted"] else 0.0
+        del stat["shift_sum"]
+    return {"flights": len(results), "changed": changed, "phases": per_phase}
+
+
+def _parse_overrides(items):
+    overrides = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        if key not in DEFAULT_THRESHOLDS:
+            raise SystemExit(f"未知阈值: {key}（可选: {', '.join(DEFAULT_THRESHOLDS)}）")
+        overrides[key] = float(value)
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在历史遥测记录上对比状态机阈值修改的影响")
+    parser.add_argument("inputs", nargs="+", help="记录文件或包含 .cvlog 的目录")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="候选阈值")
+    parser.add_argument("--baseline-set", action="append", metavar="KEY=VALUE",
+                        help="基线阈值（默认取 flight_phases.DEFAULT_THRESHOLDS）")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数（默认全部核心）")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="视为相同的时间差（秒）")
+    parser.add_argument("--json", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    baseline = dict(DEFAULT_THRESHOLDS, **_parse_overrides(args.baseline_set))
+    candidate = dict(baseline, **_parse_overrides(args.set))
+    paths = collect_logs(args.inputs)
+    if not paths:
+        print("没有找到遥测记录")
+        return 1
+
+    started = time.time()
+    results = analyze_corpus(paths, baseline, candidate, args.jobs, args.tolerance)
+    summary = summarize(results)
+    elapsed = time.time() - started
+
+    print(f"分析 {summary['flights']} 个航班，用时 {elapsed:.2f}s"
+          f"（{'NumPy 向量化' if np is not None else '逐帧求值'}）")
+    print(f"时间线有变化的航班: {summary['changed']}")
+    for phase in PHASE_ORDER:
+        stat = summary["phases"].get(phase)
+        if stat:
+            print(f"  {phase:<13} 受影响 {stat['flights']:>5}  平均偏移 {stat['mean_shift']:+8.1f}s"
+                  f"  缺失 {stat['missing']:>4}  新增 {stat['new']:>4}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"baseline": baseline, "candidate": candidate,
+                       "summary": summary, "flights": results}, f, ensure_ascii=False, indent=1)
+        print(f"完整结果已写入 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+飞行状态快照（崩溃 / 重启后从中途恢复）：
+- 检测线程只把一个小字典交给 update()，序列化和写盘在后台线程完成
+- 先写临时文件再 os.replace，任何时刻磁盘上都是完整的快照
+- 内容未变时不重复写盘
+"""
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_NAME = "state_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+
+def write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, max_age=12 * 3600):
+    """
+    读取快照；不存在、损坏、版本不符或超过 max_age 秒时返回 None。
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    if time.time() - data.get("saved_at", 0) > max_age:
+        return None
+    return data
+
+
+class SnapshotWriter:
+    def __init__(self, path):
+        self.path = path
+        self.written = 0
+        self._pending = None
+        self._clear = False
+        self._last_text = None
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._writer, name="SnapshotWriter", daemon=True)
+        self._thread.start()
+
+    def update(self, state):
+        """提交最新状态（任意线程，非阻塞）；写线程只写最后一次提交的内容"""
+        with self._lock:
+            self._pending = state
+            self._clear = False
+        self._event.set()
+
+    def clear(self):
+        """航班结束：删除快照，下次启动从头开始"""
+        with self._lock:
+            self._pending = None
+            self._clear = True
+        self._event.set()
+
+    def close(self, timeout=2.0):
+        self._stop = True
+        self._event.set()
+        self._thread.join(timeout=timeout)
+
+    def _writer(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            with self._lock:
+                state, clear = self._pending, self._clear
+                self._pending, self._clear = None, False
+            try:
+                if clear:
+                    self._last_text = None
+                    if os.path.exists(self.path):
+                        os.remove(self.path)
+                elif state is not None:
+                    self._write(state)
+            except OSError as e:
+                print(f"[SnapshotWriter] 写入快照失败: {e}")
+            if self._stop:
+                break
+
+    def _write(self, state):
+        body = json.dumps(state, ensure_ascii=False, sort_keys=True, default=str)
+        if body == self._last_text:
+            return
+        data = dict(state, version=SNAPSHOT_VERSION, saved_at=time.time())
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1, default=str))
+        self._last_text = body
+        self.written += 1
@@ -0,0 +1,274 @@
+"""
+遥测共享内存总线：
+- 检测线程每拍只读一次 FSUIPC，把解码前的原始帧写入共享内存环形缓冲
+- 任意数量的其他进程（记录器、UI 仪表、调试工具）通过 TelemetryReader 零拷贝读取
+- 每个槽位使用 seqlock：写入前序号置为奇数，写完置为偶数；读者发现序号变化即重读
+- 同一总线名只允许一个写端：头部记录写端 PID，该进程还活着时再创建写端会抛出 BusInUseError，
+  只有异常退出遗留的共享内存才会被接管
+"""
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+DEFAULT_BUS_NAME = "cabinvoice_telemetry"
+DEFAULT_SLOTS = 256
+
+BUS_MAGIC = b"CVTB"
+BUS_VERSION = 2
+
+# 帧字段（新增偏移量时在末尾追加即可，读者会通过格式串校验布局）
+FRAME_FIELDS = [
+    ("timestamp", "d"),
+    ("light_bits", "H"),     # 0x0D0C 灯光位图
+    ("tas_raw", "H"),        # 0x02B8 真空速 *128
+    ("alt_raw", "q"),        # 0x05C0 高度
+    ("seatbelt_raw", "b"),   # 0x341D 安全带灯
+    ("inputs", "B"),         # 手动输入位（巡航 / 下高按钮，见 flight_phases）
+]
+
+# 头部：magic, version, 槽数, 槽大小, 已发布帧数, 帧格式串, 写端 PID
+_HEADER = struct.Struct("<4sHxxIIQ32sI")
+_SLOT_SEQ = struct.Struct("<Q")
+
+# 本进程创建的总线名（同进程内的读者不能注销写端的资源跟踪）
+_OWNED_NAMES = set()
+
+
+class BusInUseError(RuntimeError):
+    """总线已有存活的写端（另一个程序实例、基准或离线工具）"""
+
+
+def _frame_struct(fields):
+    return struct.Struct("<" + "".join(fmt for _, fmt in fields))
+
+
+def _pid_alive(pid):
+    if pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # Windows 上 os.kill 会直接结束进程，只能查询句柄
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)     # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return False
+            return code.value == 259                          # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _untrack(shm):
+    """只是附加到别人的共享内存：从 resource_tracker 注销，避免退出时把它删掉"""
+    if os.name != "posix":
+        return
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _owner_pid(buf):
+    """读取已有共享内存头部里的写端 PID；布局不认识时返回 0（视为遗留数据）"""
+    if len(buf) < _HEADER.size:
+        return 0
+    magic, version, *_rest, pid = _HEADER.unpack_from(buf, 0)
+    if magic != BUS_MAGIC or version != BUS_VERSION:
+        return 0
+    return pid
+
+
+class TelemetryBus:
+    """
+    写端（单一采样者）。只应由检测线程调用 publish。
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME, slots=DEFAULT_SLOTS, fields=None):
+        self.name = name
+        self.fields = list(fields or FRAME_FIELDS)
+        self.field_names = [n for n, _ in self.fields]
+        self._frame = _frame_struct(self.fields)
+        self._fmt = self._frame.format.encode("ascii")
+        if len(self._fmt) > 32:
+            raise ValueError("帧格式过长，无法写入总线头部")
+
+        self.slots = int(slots)
+        self.slot_size = _SLOT_SEQ.size + self._frame.size
+        # 8 字节对齐，避免槽位跨缓存行撕裂
+        self.slot_size = (self.slot_size + 7) & ~7
+        size = _HEADER.size + self.slots * self.slot_size
+
+        if name in _OWNED_NAMES:
+            raise BusInUseError(f"遥测总线 {name} 已由本进程写入")
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            owner = _owner_pid(self._shm.buf)
+            if _pid_alive(owner):
+                _untrack(self._shm)
+                self._shm.close()
+                raise BusInUseError(f"遥测总线 {name} 正由进程 {owner} 写入，"
+                                    f"请换一个总线名或先关闭该进程")
+            # 上次异常退出留下的共享内存：接管并重新初始化
+            if self._shm.size < size:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        _OWNED_NAMES.add(name)
+        self._buf = self._shm.buf
+        for i in range(self.slots):
+            _SLOT_SEQ.pack_into(self._buf, self._slot_offset(i), 0)
+        self.published = 0
+        self._write_header()
+
+    def _slot_offset(self, index):
+        return _HEADER.size + index * self.slot_size
+
+    def _write_header(self):
+        _HEADER.pack_into(self._buf, 0, BUS_MAGIC, BUS_VERSION,
+                          self.slots, self.slot_size, self.published, self._fmt, os.getpid())
+
+    def publish(self, values, timestamp=None):
+        """
+        写入一帧。values 为按 FRAME_FIELDS（去掉 timestamp）顺序排列的原始值。
+        返回该帧的序号（从 0 开始）。
+        """
+        n = self.published
+        off = self._slot_offset(n % self.slots)
+        ts = time.time() if timestamp is None else timestamp
+
+        _SLOT_SEQ.pack_into(self._buf, off, 2 * n + 1)          # 写入中（奇数）
+        self._frame.pack_into(self._buf, off + _SLOT_SEQ.size, ts, *values)
+        _SLOT_SEQ.pack_into(self._buf, off, 2 * n + 2)          # 写入完成（偶数）
+
+        self.published = n + 1
+        self._write_header()
+        return n
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._buf = None
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except Exception:
+            pass
+        self._shm = None
+        _OWNED_NAMES.discard(self.name)
+
+
+class TelemetryReader:
+    """
+    读端：可在任意进程中创建，不会触碰 FSUIPC。
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME):
+        self.name = name
+        self._shm = shared_memory.SharedMemory(name=name)
+        if name not in _OWNED_NAMES:
+            _untrack(self._shm)
+
+        magic, version, slots, slot_size, _, fmt, self.owner_pid = _HEADER.unpack_from(self._shm.buf, 0)
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            self._shm.close()
+            raise ValueError(f"遥测总线 {name} 格式不匹配")
+
+        self.slots = slots
+        self.slot_size = slot_size
+        self._frame = struct.Struct(fmt.rstrip(b"\0").decode("ascii"))
+        # 写端字段可能比本端新：已知前缀按名字，多出来的按位置命名
+        count = len(self._frame.unpack(bytes(self._frame.size)))
+        self.field_names = [n for n, _ in FRAME_FIELDS][:count]
+        self.field_names += [f"field_{i}" for i in range(len(self.field_names), count)]
+        self.next_seq = 0
+
+    def published(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)[4]
+
+    def writer_alive(self):
+        """写端进程是否还在（写端退出后读者可以据此重新打开）"""
+        return _pid_alive(self.owner_pid)
+
+    def _read_slot(self, n, retries=3):
+        off = _HEADER.size + (n % self.slots) * self.slot_size
+        buf = self._shm.buf
+        want = 2 * n + 2
+        for _ in range(retries):
+            s1 = _SLOT_SEQ.unpack_from(buf, off)[0]
+            if s1 != want:
+                # 已被更新的帧覆盖，或写端正在写
+                if s1 > want:
+                    return None
+                continue
+            values = self._frame.unpack_from(buf, off + _SLOT_SEQ.size)
+            if _SLOT_SEQ.unpack_from(buf, off)[0] == s1:
+                return dict(zip(self.field_names, values))
+        return None
+
+    def latest(self):
+        """返回 (seq, frame) 或 None（尚无数据）"""
+        total = self.published()
+        if total == 0:
+            return None
+        frame = self._read_slot(total - 1)
+        if frame is None:
+            return None
+        return total - 1, frame
+
+    def read_new(self):
+        """
+        返回自上次调用以来的新帧列表 [(seq, frame), ...]。
+        若读者落后超过一圈，会跳到仍然有效的最旧帧。
+        """
+        total = self.published()
+        start = max(self.next_seq, total - self.slots)
+        frames = []
+        for n in range(start, total):
+            frame = self._read_slot(n)
+            if frame is not None:
+                frames.append((n, frame))
+        self.next_seq = total
+        return frames
+
+    def close(self):
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except Exception:
+            pass
+        self._shm = None
+
+
+if __name__ == "__main__":
+    # 简易调试工具：在另一个进程中实时查看总线上的遥测帧
+    bus_name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BUS_NAME
+    reader = TelemetryReader(bus_name)
+    print(f"已连接遥测总线 {bus_name}（{reader.slots} 槽）")
+    try:
+        while True:
+            for seq, frame in reader.read_new():
+                print(seq, frame)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,234 @@
+"""
+UI 遥测曲线（高度 / 空速 / 垂直速度），用于在飞行中排查阶段触发：
+- 数据来自遥测共享内存总线（TelemetryReader），与检测线程零耦合
+- 每条曲线一个定长 NumPy 环形缓冲，历史再长内存也不变
+- 绘制前按像素列做 min/max 降采样，耗时只与控件宽度有关
+- 整条曲线合成一个 QPainterPath 一次画完；只有新帧到达时才重建路径、请求重绘
+"""
+import numpy as np
+from PyQt5.QtCore import QRectF, Qt, QTimer
+from PyQt5.QtGui import QColor, QFont, QPainter, QPainterPath, QPen
+from PyQt5.QtWidgets import QHBoxLayout, QWidget
+
+from derived_signals import DerivedSignals
+from flight_phases import decode_frame
+from telemetry_bus import DEFAULT_BUS_NAME, TelemetryReader
+
+# 曲线显示的时间跨度（秒）与环形缓冲容量（帧，0.5s 一拍约 1 小时）
+DEFAULT_SPAN_SEC = 600.0
+DEFAULT_CAPACITY = 7200
+POLL_MS = 500
+
+
+class SeriesRing:
+    """定长环形缓冲：时间戳与数值各一个 float64 数组"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.t = np.zeros(capacity)
+        self.v = np.zeros(capacity)
+        self.head = 0           # 下一个写入位置
+        self.count = 0
+
+    def append(self, t, value):
+        self.t[self.head] = t
+        self.v[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def last(self):
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.t[i], self.v[i]
+
+    def since(self, t_start):
+        """按时间顺序返回 t >= t_start 的 (t, v)（环绕时拼接两段）"""
+        if not self.count:
+            return self.t[:0], self.v[:0]
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            t = self.t[start:start + self.count]
+            v = self.v[start:start + self.count]
+        else:
+            t = np.concatenate((self.t[start:], self.t[:self.head]))
+            v = np.concatenate((self.v[start:], self.v[:self.head]))
+        i = int(np.searchsorted(t, t_start))
+        return t[i:], v[i:]
+
+
+def minmax_columns(t, v, t0, t1, columns):
+    """
+    把 [t0, t1] 内的点按像素列分组，返回 (列号, 每列最小值, 每列最大值)；空列不返回。
+    """
+    if not len(t) or columns <= 0 or t1 <= t0:
+        empty = np.zeros(0)
+        return empty.astype(int), empty, empty
+    cols = ((t - t0) / (t1 - t0) * (columns - 1)).astype(int)
+    np.clip(cols, 0, columns - 1, out=cols)
+    # t 有序，所以 cols 单调不减：每列第一个点的位置就是 reduceat 的分段起点
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    return cols[starts], np.minimum.reduceat(v, starts), np.maximum.reduceat(v, starts)
+
+
+class StripChart(QWidget):
+    def __init__(self, title, unit, color, min_range, span_sec=DEFAULT_SPAN_SEC,
+                 capacity=DEFAULT_CAPACITY, fmt="{:.0f}"):
+        super().__init__()
+        self.title = title
+        self.unit = unit
+        self.color = QColor(color)
+        self.min_range = min_range      # 纵轴最小跨度，平飞时不把噪声放大成锯齿
+        self.span_sec = span_sec
+        self.fmt = fmt
+        self.ring = SeriesRing(capacity)
+        self._path = None
+        self._path_key = None
+        self._range = (0.0, 1.0)
+        self._dirty = True
+        self.setMinimumHeight(48)
+
+    def append(self, t, value):
+        """写入一个点（不立即重绘，调用方一批写完后调 refresh）"""
+        self.ring.append(t, value)
+        self._dirty = True
+
+    def clear(self):
+        self.ring.clear()
+        self._dirty = True
+        self.update()
+
+    def refresh(self):
+        if self._dirty:
+            self.update()
+
+    def _build_path(self, plot):
+        last = self.ring.last()
+        if last is None:
+            return None
+        t1 = last[0]
+        t0 = t1 - self.span_sec
+        t, v = self.ring.since(t0)
+        cols, mins, maxs = minmax_columns(t, v, t0, t1, int(plot.width()))
+        if not len(cols):
+            return None
+        lo, hi = float(mins.min()), float(maxs.max())
+        if hi - lo < self.min_range:
+            mid = (hi + lo) / 2.0
+            lo, hi = mid - self.min_range / 2.0, mid + self.min_range / 2.0
+        self._range = (lo, hi)
+        scale = plot.height() / (hi - lo)
+        xs = plot.left() + cols
+        y_max = plot.bottom() - (maxs - lo) * scale
+        y_min = plot.bottom() - (mins - lo) * scale
+
+        # 每列一段竖线（最大 -> 最小），相邻列首尾相连，整条曲线一个路径
+        path = QPainterPath()
+        path.moveTo(float(xs[0]), float(y_max[0]))
+        for x, a, b in zip(xs.tolist(), y_max.tolist(), y_min.tolist()):
+            path.lineTo(x, a)
+            if b != a:
+                path.lineTo(x, b)
+        return path
+
+    def paintEvent(self, event):
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        plot = rect.adjusted(6, 16, -6, -4)
+        key = (plot.width(), plot.height())
+        if self._dirty or key != self._path_key:
+            self._path = self._build_path(plot)
+            self._path_key = key
+            self._dirty = False
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 50))
+        painter.drawRoundedRect(rect, 8, 8)
+
+        painter.setFont(QFont("Consolas", 8))
+        painter.setPen(QColor("#a6c8ff"))
+        last = self.ring.last()
+        value = self.fmt.format(last[1]) if last is not None else "--"
+        painter.drawText(rect.adjusted(8, 2, -8, 0), Qt.AlignLeft | Qt.AlignTop, f"{self.title} {value} {self.unit}")
+        if self._path is not None:
+            lo, hi = self._range
+            painter.drawText(rect.adjusted(8, 2, -8, 0), Qt.AlignRight | Qt.AlignTop,
+                             f"{self.fmt.format(lo)} ~ {self.fmt.format(hi)}")
+            painter.setPen(QPen(self.color, 1.2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPath(self._path)
+
+
+class TelemetryCharts(QWidget):
+    """
+    三条曲线 + 总线轮询。总线在检测线程启动后才创建，打开失败时下次轮询再试。
+    """
+
+    def __init__(self, bus_name=DEFAULT_BUS_NAME, span_sec=DEFAULT_SPAN_SEC, poll_ms=POLL_MS):
+        super().__init__()
+        self.bus_name = bus_name
+        self.reader = None
+        self.derived = DerivedSignals()
+        self._last_ts = None
+        self.altitude = StripChart("高度", "ft", "#7ec8ff", 200, span_sec)
+        self.tas = StripChart("空速", "kt", "#9be7a0", 20, span_sec)
+        self.vertical_speed = StripChart("垂直速度", "fpm", "#ffc77e", 500, span_sec)
+        self.charts = (self.altitude, self.tas, self.vertical_speed)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+        for chart in self.charts:
+            layout.addWidget(chart)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(poll_ms)
+
+    def _open_reader(self):
+        try:
+            self.reader = TelemetryReader(self.bus_name)
+        except (FileNotFoundError, ValueError, OSError):
+            self.reader = None
+        return self.reader
+
+    def poll(self):
+        if self.reader is None and self._open_reader() is None:
+            return
+        try:
+            frames = self.reader.read_new()
+        except Exception as e:
+            # 写端重建了总线（重新开始检测），下次轮询重新打开
+            print(f"[TelemetryCharts] 读取遥测总线失败: {e}")
+            self.reader.close()
+            self.reader = None
+            return
+        if not frames:
+            return
+        for _seq, frame in frames:
+            ts = frame["timestamp"]
+            if self._last_ts is not None and ts < self._last_ts:
+                # 时间倒退：新的检测会话，清空历史
+                self.derived.reset()
+                for chart in self.charts:
+                    chart.clear()
+            self._last_ts = ts
+            signals = decode_frame(frame["light_bits"], frame["tas_raw"], frame["alt_raw"],
+                                   frame["seatbelt_raw"], frame.get("inputs", 0))
+            derived = self.derived.update(ts, signals["altitude_ft"], signals["tas_knots"])
+            self.altitude.append(ts, signals["altitude_ft"])
+            self.tas.append(ts, signals["tas_knots"])
+            self.vertical_speed.append(ts, derived["vertical_speed_fpm"])
+        for chart in self.charts:
+            chart.refresh()
+
+    def close_reader(self):
+        self.timer.stop()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
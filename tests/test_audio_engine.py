@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import types
+
+from audio_engine import AudioEngineClient, _engine_main
+
+# 子进程里的假 AudioManager 把动作追加到这个文件（spawn 子进程继承环境变量）
+LOG_ENV = "CABIN_TEST_ENGINE_LOG"
+DELAY_ENV = "CABIN_TEST_ENGINE_DELAY"
+
+
+class _Channel:
+    def __init__(self):
+        self.until = time.time() + 0.2
+
+    def get_busy(self):
+        return time.time() < self.until
+
+
+class _SlowAudioManager:
+    """解码很慢的 AudioManager：play_voice 要 DELAY 秒才返回"""
+
+    def __init__(self):
+        self.current_voice_channel = None
+
+    def _log(self, text):
+        with open(os.environ[LOG_ENV], "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    def play_voice(self, path):
+        time.sleep(float(os.environ[DELAY_ENV]))
+        self.current_voice_channel = _Channel()
+        self._log(f"play {path}")
+        return True
+
+    def fade_out_voice(self, duration=1.0):
+        self._log("stop")
+
+    def cache_stats(self):
+        return {}
+
+
+def _slow_engine_main(conn):
+    sys.modules["audio_manager"] = types.SimpleNamespace(AudioManager=_SlowAudioManager)
+    _engine_main(conn)
+
+
+def _start(tmp_path, monkeypatch, delay, **kwargs):
+    log = tmp_path / "engine.log"
+    log.write_text("", encoding="utf-8")
+    monkeypatch.setenv(LOG_ENV, str(log))
+    monkeypatch.setenv(DELAY_ENV, str(delay))
+    return AudioEngineClient(engine_main=_slow_engine_main, **kwargs), log
+
+
+def test_slow_start_still_plays_exactly_once(tmp_path, monkeypatch):
+    client, log = _start(tmp_path, monkeypatch, delay=1.5)
+    finished = []
+    client.on_voice_finished = lambda path, sec: finished.append(path)
+    try:
+        # 冷启动解码超过 1 秒：仍按子进程的真实结果返回成功，调用方不会重试
+        assert client.play_voice("a.wav") is True
+        deadline = time.time() + 3.0
+        while not finished and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        client.close()
+    assert log.read_text(encoding="utf-8").split() == ["play", "a.wav"]
+    assert finished == ["a.wav"]
+
+
+def test_request_past_deadline_is_stopped_and_reported_failed(tmp_path, monkeypatch):
+    client, log = _start(tmp_path, monkeypatch, delay=1.0, request_timeout=0.3)
+    try:
+        assert client.play_voice("a.wav") is False
+        assert not client.voice_busy()
+    finally:
+        client.close()
+    # 过了截止时间才开始的语音被子进程立即停掉，与主进程的“失败”一致
+    assert log.read_text(encoding="utf-8").splitlines() == ["play a.wav", "stop"]
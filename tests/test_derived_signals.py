@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+
+from derived_signals import DebouncedPredicate, DerivedSignals, _debounce_columns, derived_columns
+from flight_phases import DEFAULT_THRESHOLDS, PHASE_RULES, decode_frame
+from flight_profile import FlightProfile
+
+
+def _recorded_flight(seed):
+    rng = random.Random(seed)
+    profile = FlightProfile.randomized(rng, cruise_sec=900)
+    ts, alt, tas = [], [], []
+    t = 0.0
+    while t < profile.duration:
+        s = profile.sample(t)
+        ts.append(1.7e9 + t)
+        alt.append(s.alt_raw / 256.0 + rng.gauss(0, 3))
+        tas.append(s.tas_raw / 128.0)
+        # 偶尔掉几拍（暂停、卡顿）
+        t += 0.5 if rng.random() > 0.01 else rng.uniform(1, 6)
+    return np.array(ts), np.array(alt), np.array(tas)
+
+
+def test_derived_columns_match_frame_by_frame():
+    for seed in range(3):
+        ts, alt, tas = _recorded_flight(seed)
+        engine = DerivedSignals()
+        rows = [engine.update(*frame) for frame in zip(ts.tolist(), alt.tolist(), tas.tolist())]
+        cols = derived_columns(ts, alt, tas)
+        for key in ("altitude_band_ft", "altitude_stable", "altitude_stable_sec"):
+            assert np.array_equal(cols[key], np.array([r[key] for r in rows])), key
+        for key in ("vertical_speed_fpm", "acceleration_kts", "altitude_variance"):
+            assert np.allclose(cols[key], [r[key] for r in rows], atol=0.05), key
+
+
+def test_debounce_columns_match_predicate():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        n = int(rng.integers(1, 60))
+        t = np.cumsum(rng.random(n) * 2)
+        value = rng.random(n) < 0.6
+        pred = DebouncedPredicate(rng.random() * 2, rng.random() * 3)
+        expected = [(pred.update(a, b), pred.held_for()) for a, b in zip(t.tolist(), value.tolist())]
+        active, held = _debounce_columns(t, value, pred.hold_sec, pred.release_sec)
+        assert active.tolist() == [e[0] for e in expected]
+        assert np.allclose(held, [e[1] for e in expected])
+
+
+def _climb_signals(altitude_ft, stable_sec):
+    s = decode_frame(0x03, int(280 * 128), int(altitude_ft * 256), 1)
+    s.update(altitude_stable_sec=stable_sec)
+    return s
+
+
+def test_low_level_off_is_not_cruise():
+    guard = PHASE_RULES["climb"].guard
+    th = dict(DEFAULT_THRESHOLDS)
+    assert not guard(_climb_signals(6000, 120), th)
+    assert guard(_climb_signals(35000, 120), th)
+    # 已知计划巡航高度时，中途的阶梯改平也不算
+    th["planned_cruise_ft"] = 37000
+    assert not guard(_climb_signals(29000, 120), th)
+    assert guard(_climb_signals(37000, 120), th)
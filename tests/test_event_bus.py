@@ -0,0 +1,78 @@
+import threading
+
+from event_bus import BACKPRESSURE, BOUNDED, DEFAULT_POLICIES, EventBus
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_latest_keeps_only_newest_status():
+    bus = EventBus()
+    for i in range(5):
+        bus.put("status", f"s{i}")
+    assert bus.drain() == [("status", "s4")]
+    assert bus.stats()["coalesced"] == {"status": 4}
+
+
+def test_bounded_drops_oldest_and_counts():
+    bus = EventBus(capacity=3)
+    for i in range(5):
+        bus.put("log", i)
+    assert bus.drain() == [("log", 2), ("log", 3), ("log", 4)]
+    stats = bus.stats()
+    assert stats["dropped"] == {"log": 2} and stats["dropped_total"] == 2
+
+
+def test_dedup_collapses_repeats_and_reports_count():
+    clock = _Clock()
+    bus = EventBus(dedup_window=10.0, clock=clock)
+    for _ in range(4):
+        bus.put("error", "断线")
+    assert bus.drain() == [("error", "断线")]
+    clock.now = 11.0
+    assert bus.drain() == [("error", "断线（重复 3 次）")]
+    assert bus.drain() == []
+
+
+def test_backpressure_waits_then_drops_and_counts():
+    bus = EventBus(backpressure_capacity=2, block_timeout=0.01)
+    assert bus.put("announcement", "a") and bus.put("announcement", "b")
+    assert bus.put("announcement", "c") is False
+    assert bus.stats()["dropped"] == {"announcement": 1}
+    assert bus.drain() == [("announcement", "a"), ("announcement", "b")]
+
+
+def test_backpressure_producer_resumes_after_drain():
+    bus = EventBus(backpressure_capacity=1, block_timeout=5.0)
+    bus.put("announcement", "a")
+    result = []
+    producer = threading.Thread(target=lambda: result.append(bus.put("announcement", "b")))
+    producer.start()
+    drained = bus.drain()
+    producer.join(timeout=5.0)
+    assert drained == [("announcement", "a")] and result == [True]
+    assert bus.drain() == [("announcement", "b")]
+
+
+def test_drain_merges_in_order_and_requeues_rest():
+    bus = EventBus()
+    bus.put("log", "l1")
+    bus.put("announcement", "a1")
+    bus.put("status", "s1")
+    bus.put("log", "l2")
+    assert bus.drain(max_items=2) == [("log", "l1"), ("announcement", "a1")]
+    assert bus.qsize() == 2
+    assert bus.drain() == [("status", "s1"), ("log", "l2")]
+
+
+def test_policies_cover_only_ui_events():
+    bus = EventBus()
+    assert bus.policy("announcement") == BACKPRESSURE
+    # 阶段事件不经过前端事件总线
+    assert "phase" not in DEFAULT_POLICIES
+    assert bus.policy("unknown") == BOUNDED
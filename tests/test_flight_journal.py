@@ -0,0 +1,46 @@
+import sqlite3
+
+from flight_journal import SCHEMA, FlightJournal, average_phase_duration
+
+
+def _rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_end_is_written_once_and_late_events_stay_with_flight(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.db")
+    clock = iter([100.0, 200.0, 210.0, 300.0])
+    monkeypatch.setattr("flight_journal.time.time", lambda: next(clock, 400.0))
+    journal = FlightJournal(path, flush_interval=0.05)
+    journal.begin_flight("CES")                     # 100
+    journal.end_flight()                            # 200（下客）
+    journal.record("log", "deboarding done")        # 210
+    journal.end_flight()                            # 程序退出：已结束，不再写
+    journal.close()
+
+    assert _rows(path, "SELECT id, started, ended, pack FROM flights") == [(1, 100.0, 200.0, "CES")]
+    assert _rows(path, "SELECT flight_id, data FROM events") == [(1, "deboarding done")]
+
+
+def test_average_phase_duration_uses_first_entry_per_flight(tmp_path):
+    path = str(tmp_path / "journal.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO flights(id, started) VALUES (?, 0)", [(1,), (2,), (3,)])
+    events = [
+        # 航班 1：两次进入 taxi、两次 takeoff 事件，只算 0 -> 100
+        (1, 0.0, "taxi"), (1, 50.0, "taxi"), (1, 100.0, "takeoff"), (1, 120.0, "takeoff"),
+        (2, 10.0, "taxi"), (2, 70.0, "takeoff"),
+        # 航班 3：没有 takeoff，不计入
+        (3, 0.0, "taxi"),
+    ]
+    conn.executemany("INSERT INTO events(flight_id, ts, phase, type) VALUES (?, ?, ?, 'phase')", events)
+    conn.commit()
+    conn.close()
+
+    assert average_phase_duration(path, "taxi", "takeoff") == (80.0, 2)
+    assert average_phase_duration(path, "taxi", "takeoff", last_flights=2) == (60.0, 1)
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from flight_phases import (ALL_FIELDS, DEFAULT_THRESHOLDS, INPUT_DESCENT_PRESSED, PHASE_RULES,
+                           change_mask, decode_frame, evaluate, reconcile_phase)
+from flight_profile import FlightProfile
+
+# 原始帧各字段的取值范围（顺序与 change_mask 的位一致）
+_FIELD_VALUES = [
+    lambda rng: rng.randrange(0, 0x10),                 # 灯光位
+    lambda rng: rng.choice([0, 2, 20, 60, 250]) * 128,  # 空速
+    lambda rng: rng.choice([0, 3000, 12000, 36000]) * 256,
+    lambda rng: rng.randrange(0, 2),                    # 安全带
+    lambda rng: rng.randrange(0, 4),                    # 按钮位
+]
+
+
+def _signals(raw, derived):
+    signals = decode_frame(*raw)
+    signals.update(derived)
+    return signals
+
+
+def test_guards_only_read_declared_fields():
+    """快速路径的前提：规则声明的字段都没变时，求值结果不会变"""
+    rng = random.Random(3)
+    for phase, rule in PHASE_RULES.items():
+        for _ in range(300):
+            a = tuple(gen(rng) for gen in _FIELD_VALUES)
+            b = tuple(v if rule.fields & (1 << i) else _FIELD_VALUES[i](rng) for i, v in enumerate(a))
+            assert not change_mask(a, b) & rule.fields
+            derived = {"altitude_stable_sec": rng.choice([0.0, 30.0, 90.0])}
+            assert evaluate(phase, _signals(a, derived)) == evaluate(phase, _signals(b, derived)), phase
+
+
+def test_change_mask_bits():
+    assert change_mask(None, (0, 0, 0, 0, 0)) == ALL_FIELDS
+    assert change_mask((1, 2, 3, 4, 5), (1, 9, 3, 4, 6)) == 0x02 | 0x10
+
+
+def test_reconcile_phase():
+    th = DEFAULT_THRESHOLDS
+    airborne = {"tas_knots": 250.0, "beacon_light": True}
+    parked = {"tas_knots": 0.0, "beacon_light": False}
+    assert reconcile_phase("briefing", airborne, th) == "climb"
+    assert reconcile_phase("cruise", parked, th) == "boarding"
+    assert reconcile_phase("cruise", airborne, th) == "cruise"
+    assert reconcile_phase("taxi", {"tas_knots": 10.0, "beacon_light": True}, th) == "taxi"
+
+
+def _run_profile(tmp_path, monkeypatch, full_eval):
+    pytest.importorskip("PyQt5")
+    import fake_pyuipc
+    fake_pyuipc.install()
+    import flight_announcer
+    from benchmark import _make_announcer
+    from offline_render import OfflineMixer, VirtualClock
+    from power_monitor import FULL_INTERVAL
+
+    if full_eval:
+        monkeypatch.setattr(flight_announcer, "change_mask", lambda previous, current: ALL_FIELDS)
+    clock = VirtualClock()
+    announcer = _make_announcer(str(tmp_path), clock=clock.time, sleep=clock.sleep,
+                                audio_manager=OfflineMixer(clock.time))
+    timeline = []
+    try:
+        profile = FlightProfile(cruise_sec=900, gate_sec=120)
+        prev_inputs = 0
+        t = 0.0
+        while t < profile.duration:
+            s = profile.sample(t)
+            clock.advance_to(clock.start + t)
+            if s.inputs & ~prev_inputs & INPUT_DESCENT_PRESSED:
+                announcer.prepare_descent()
+            prev_inputs = s.inputs
+            phase = announcer.phase
+            announcer._process_frame(s.light_bits, s.tas_raw, s.alt_raw, s.seatbelt_raw)
+            if announcer.phase != phase:
+                timeline.append((announcer.phase, t))
+            t += FULL_INTERVAL
+        return timeline, dict(announcer.tick_stats)
+    finally:
+        announcer.shutdown()
+
+
+def test_fast_path_matches_full_evaluation(tmp_path, monkeypatch):
+    fast, fast_stats = _run_profile(tmp_path / "fast", monkeypatch, full_eval=False)
+    full, _ = _run_profile(tmp_path / "full", monkeypatch, full_eval=True)
+    assert fast == full
+    assert fast[-1][0] == "deboarding"
+    assert fast_stats["skipped"] > 0
@@ -0,0 +1,56 @@
+import fake_pyuipc
+from fake_pyuipc import OFFSET_ALTITUDE, FaultPlan, FlightApi, SimulatedFlight
+from flight_profile import FlightProfile
+
+fake_pyuipc.install()
+
+from fsuipc_connection import FsuipcConnection  # noqa: E402  需要先装好假的 pyuipc
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bound_flight_is_seen_by_lifecycle_thread():
+    clock = _Clock()
+    flight = SimulatedFlight(FlightProfile(), clock=clock)
+    clock.now += flight.profile.segments[5].start       # 巡航段
+    # 模块级默认航班一直断线：连接必须用自己绑定的航班
+    fake_pyuipc.set_flight(SimulatedFlight(faults=FaultPlan(disconnect_every=1e-9, disconnect_sec=1e9)))
+    conn = FsuipcConnection(api=FlightApi(flight), base_delay=0.01)
+    conn.start()
+    try:
+        assert conn.wait_connected(2.0)
+        values = conn.read([(OFFSET_ALTITUDE, "l")])
+        assert values == [int(flight.profile.params["cruise_alt_ft"] * 256)]
+    finally:
+        conn.stop()
+        fake_pyuipc.set_flight(None)
+
+
+def test_disconnect_is_reported_once_and_recovers():
+    clock = _Clock()
+    faults = FaultPlan(disconnect_every=100.0, disconnect_sec=10.0)
+    flight = SimulatedFlight(FlightProfile(), faults=faults, clock=clock)
+    events = []
+    conn = FsuipcConnection(on_connected=lambda rec: events.append(("up", rec)),
+                            on_disconnected=lambda err: events.append(("down", None)),
+                            api=FlightApi(flight), base_delay=0.01, max_delay=0.02)
+    conn.start()
+    try:
+        assert conn.wait_connected(2.0)
+        assert conn.read([(OFFSET_ALTITUDE, "l")]) is not None
+        clock.now += 101.0                                  # 进入断线窗口
+        assert conn.read([(OFFSET_ALTITUDE, "l")]) is None
+        assert conn.read([(OFFSET_ALTITUDE, "l")]) is None
+        clock.now += 10.0                                   # 恢复
+        assert conn.wait_connected(2.0)
+        assert conn.read([(OFFSET_ALTITUDE, "l")]) is not None
+    finally:
+        conn.stop()
+    assert [e[0] for e in events] == ["up", "down", "up"]
+    assert conn.stats()["reconnect_count"] == 1
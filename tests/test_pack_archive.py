@@ -0,0 +1,67 @@
+import json
+import os
+
+import pack_archive
+from pack_archive import (ARCHIVE_MAGIC, ARCHIVE_VERSION, HEADER, close_archive, make_ref,
+                          open_archive, resolve_ref)
+
+
+def _write_archive(path, payload):
+    index = json.dumps({"a": {"offset": HEADER.size, "length": len(payload),
+                              "duration": 0.1, "sha1": "x", "gain_db": 0.0}}).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, 22050, 2, 2,
+                            HEADER.size + len(payload), len(index)))
+        f.write(payload)
+        f.write(index)
+    # 与编译器一样原子替换
+    os.replace(tmp, path)
+
+
+def test_recompiled_archive_is_remapped(tmp_path):
+    path = str(tmp_path / "pack.cvpack")
+    _write_archive(path, b"\x01" * 64)
+    old_view, _fmt = resolve_ref(make_ref(path, "a"))
+    first = open_archive(path)
+
+    _write_archive(path, b"\x02" * 128)
+    new_view, _fmt = resolve_ref(make_ref(path, "a"))
+    assert open_archive(path) is not first
+    assert bytes(new_view[:2]) == b"\x02\x02" and len(new_view) == 128
+    # 旧的 memoryview 仍然可读（映射还没关）
+    assert bytes(old_view[:2]) == b"\x01\x01"
+    assert first in pack_archive._retired
+
+    del old_view
+    open_archive(path)
+    assert first not in pack_archive._retired
+    del new_view
+    close_archive(path)
+
+
+def test_close_with_exported_views_does_not_raise(tmp_path):
+    path = str(tmp_path / "pack.cvpack")
+    _write_archive(path, b"\x03" * 32)
+    view, _fmt = resolve_ref(make_ref(path, "a"))
+    archive = open_archive(path)
+    close_archive(path)
+    assert archive in pack_archive._retired
+    assert bytes(view[:1]) == b"\x03"
+    del view
+    close_archive(path)
+    assert archive not in pack_archive._retired
+
+
+def test_archive_content_key_differs_from_source():
+    archive = pack_archive.PackArchive.__new__(pack_archive.PackArchive)
+    archive.format = (44100, 2, 2)
+    archive.index = {"a": {"sha1": "abc", "gain_db": -3.0}}
+    key = archive.content_sha1("a")
+    assert key != "abc"
+    # 换了增益或格式就是另一段 PCM
+    archive.index["a"]["gain_db"] = 0.0
+    assert archive.content_sha1("a") != key
+    archive.index["a"]["gain_db"] = -3.0
+    archive.format = (22050, 2, 2)
+    assert archive.content_sha1("a") != key
@@ -0,0 +1,57 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+import fake_pyuipc
+
+fake_pyuipc.install()
+
+from benchmark import make_pack  # noqa: E402
+from flight_announcer import FlightAnnouncer  # noqa: E402
+from pack_archive import ARCHIVE_MAGIC, ARCHIVE_VERSION, HEADER, archive_path_for, close_archive  # noqa: E402
+from pack_manifest import DEFAULT_MIXER_FORMAT, load_manifest  # noqa: E402
+
+
+def _write_compiled(folder, manifest):
+    """按编译器的格式写一份归档（PCM 内容无关紧要，只要索引里的 sha1 与清单一致）"""
+    payload = b"\0" * 64
+    index = {key: {"offset": HEADER.size, "length": len(payload), "duration": 0.1,
+                   "sha1": rec["sha1"], "gain_db": -4.5} for key, rec in manifest.items()}
+    index_bytes = json.dumps(index).encode("utf-8")
+    rate, width, channels = DEFAULT_MIXER_FORMAT
+    with open(archive_path_for(folder), "wb") as f:
+        f.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, rate, width, channels,
+                            HEADER.size + len(payload), len(index_bytes)))
+        f.write(payload)
+        f.write(index_bytes)
+
+
+def _fake_announcer(registered):
+    fake = SimpleNamespace(
+        MUSIC_KEYS=FlightAnnouncer.MUSIC_KEYS,
+        event_signal=SimpleNamespace(emit=lambda *a: None),
+        audio_manager=SimpleNamespace(register_clips=registered.update),
+    )
+    fake._use_compiled_archive = lambda *a: FlightAnnouncer._use_compiled_archive(fake, *a)
+    return fake
+
+
+def test_raw_and_compiled_clips_get_different_content_keys(tmp_path):
+    raw = make_pack(str(tmp_path / "RAW"), 2, seconds=0.2)
+    compiled = make_pack(str(tmp_path / "COMPILED"), 2, seconds=0.2)
+    _write_compiled(compiled, load_manifest(compiled))
+
+    registered = {}
+    fake = _fake_announcer(registered)
+    raw_files, _ = FlightAnnouncer._build_sound_table(fake, raw)
+    compiled_files, _ = FlightAnnouncer._build_sound_table(fake, compiled)
+    try:
+        for key in raw_files:
+            assert "|" in compiled_files[key]
+            # 两个包里是同一个源文件，但归档里的 PCM 是处理过的，不能命中原始文件的解码缓存
+            assert registered[raw_files[key]] != registered[compiled_files[key]]
+    finally:
+        close_archive(archive_path_for(compiled))
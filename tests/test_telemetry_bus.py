@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from telemetry_bus import BusInUseError, TelemetryBus, TelemetryReader
+
+
+@pytest.fixture
+def bus():
+    b = TelemetryBus(f"cvt_test_{os.getpid()}", slots=8)
+    yield b
+    b.close()
+
+
+def _frame(i):
+    # light_bits, tas_raw, alt_raw, seatbelt_raw, inputs
+    return (i, 2 * i, 3 * i, 1, 0)
+
+
+def test_second_writer_is_refused(bus):
+    with pytest.raises(BusInUseError):
+        TelemetryBus(bus.name, slots=8)
+    # 原写端不受影响
+    bus.publish(_frame(1), timestamp=1.0)
+    reader = TelemetryReader(bus.name)
+    try:
+        assert reader.latest()[1]["light_bits"] == 1
+        assert reader.owner_pid == os.getpid()
+    finally:
+        reader.close()
+
+
+def test_reader_sees_only_new_frames_and_skips_overwritten(bus):
+    reader = TelemetryReader(bus.name)
+    try:
+        for i in range(3):
+            bus.publish(_frame(i), timestamp=float(i))
+        assert [f["light_bits"] for _seq, f in reader.read_new()] == [0, 1, 2]
+        assert reader.read_new() == []
+        # 写端绕圈超过槽数：读者只拿到仍在环里的帧
+        for i in range(3, 20):
+            bus.publish(_frame(i), timestamp=float(i))
+        frames = reader.read_new()
+        assert [f["light_bits"] for _seq, f in frames] == list(range(12, 20))
+    finally:
+        reader.close()
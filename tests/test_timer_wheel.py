@@ -0,0 +1,85 @@
+import random
+
+from timer_wheel import TimerWheel
+
+
+def _run(wheel, collector, until, rng):
+    """按随机步长推进，记录每个定时器触发时所在的推进区间"""
+    fired = []
+    now = 0.0
+    while now < until:
+        prev, now = now, now + rng.choice([0.5, 1, 3, 37, 200, 1500])
+        wheel.advance(now)
+        fired.extend((timer, prev, now) for timer in collector.pop_fired())
+    return fired
+
+
+class _Collector:
+    def __init__(self):
+        self._fired = []
+
+    def __call__(self, timer):
+        self._fired.append(timer)
+
+    def pop_fired(self):
+        fired, self._fired = self._fired, []
+        return fired
+
+
+def test_fires_in_order_across_levels_and_beyond_range():
+    rng = random.Random(7)
+    # 两层只覆盖 64 * 64 个 tick，更远的定时器要在最高层反复下放
+    wheel = TimerWheel(tick_sec=1.0, levels=2)
+    collector = _Collector()
+    delays = [rng.uniform(0, 20000) for _ in range(500)] + [0, 63, 64, 4095, 4096, 4097]
+    timers = [wheel.schedule_in(d, collector) for d in delays]
+
+    fired = _run(wheel, collector, 21000, rng)
+    assert len(fired) == len(timers) and wheel.pending == 0
+    expires = [timer.expires for timer, _prev, _now in fired]
+    assert expires == sorted(expires)
+    for timer, prev, now in fired:
+        # 在到期 tick 所在的那次推进里触发，不早也不晚
+        assert int(prev) <= timer.expires <= int(now)
+
+
+def test_cancel_at_every_level_and_after_cascade():
+    wheel = TimerWheel(tick_sec=1.0, levels=3)
+    collector = _Collector()
+    near = wheel.schedule_in(10, collector)
+    mid = wheel.schedule_in(500, collector)
+    far = wheel.schedule_in(100000, collector)
+    moved = wheel.schedule_in(130, collector)
+    keep = wheel.schedule_in(140, collector)
+
+    assert wheel.cancel(near) and wheel.cancel(mid) and wheel.cancel(far)
+    assert not wheel.cancel(near)
+    # 推进到 moved 已从第 1 层下放到第 0 层之后再取消
+    wheel.advance(129)
+    assert moved.active and wheel.cancel(moved)
+
+    wheel.advance(200000)
+    assert collector.pop_fired() == [keep]
+    assert wheel.pending == 0 and wheel.pending_timers() == []
+
+
+def test_cancel_tag_removes_timers_on_all_levels():
+    wheel = TimerWheel(tick_sec=0.5)
+    collector = _Collector()
+    for delay in (1, 100, 5000, 1e6):
+        wheel.schedule_in(delay, collector, tag="cruise")
+    other = wheel.schedule_in(100, collector, tag="descent")
+
+    assert wheel.cancel_tag("cruise") == 4
+    assert wheel.cancel_tag("cruise") == 0
+    assert [t for t, _remaining in wheel.pending_timers()] == [other]
+    wheel.advance(2e6)
+    assert collector.pop_fired() == [other]
+
+
+def test_schedule_in_the_past_fires_on_next_advance():
+    wheel = TimerWheel(tick_sec=1.0, start=100.0)
+    collector = _Collector()
+    wheel.advance(150)
+    timer = wheel.schedule_at(120, collector)
+    assert wheel.advance(151) == 1 and collector.pop_fired() == [timer]
@@ -0,0 +1,181 @@
+"""
+分层时间轮（定时客舱事件：餐饮服务、免税品提醒、“距离着陆 30 分钟”等）：
+- 每层 64 个槽，第 0 层一格 = 一个 tick，上一层一格 = 下一层一圈
+- 布防 / 取消 O(1)；到期时高层槽整体下放（均摊 O(1)）
+- 时间由调用方推进（advance），本身不开线程
+"""
+import itertools
+
+_BITS = 6
+_SLOTS = 1 << _BITS
+_MASK = _SLOTS - 1
+
+
+class Timer:
+    __slots__ = ("id", "expires", "callback", "tag", "data", "_bucket")
+
+    def __init__(self, timer_id, expires, callback, tag, data=None):
+        self.id = timer_id
+        self.expires = expires      # 到期 tick
+        self.callback = callback
+        self.tag = tag
+        self.data = data            # 调用方附带的数据（如播报键），快照时用
+        self._bucket = None         # 当前所在的槽（取消时 O(1) 删除）
+
+    @property
+    def active(self):
+        return self._bucket is not None
+
+
+class TimerWheel:
+    def __init__(self, tick_sec=0.5, levels=4, start=0.0):
+        """
+        tick_sec: 时间分辨率；levels 层可覆盖 tick_sec * 64**levels 秒，
+        更远的定时器先放在最高层，下放时重新计算位置。
+        """
+        self.tick_sec = tick_sec
+        self.levels = levels
+        self._origin = start
+        self._tick = 0                  # 下一个要处理的 tick
+        self._wheels = [[{} for _ in range(_SLOTS)] for _ in range(levels)]
+        self._tags = {}                 # tag -> {id: Timer}
+        self._ids = itertools.count(1)
+        self.pending = 0
+        self.fired = 0
+
+    # =============== 布防 / 取消 ===============
+
+    def _to_tick(self, t):
+        return int((t - self._origin) / self.tick_sec)
+
+    def now(self):
+        """当前时间轮时间（已处理到的 tick 起点）"""
+        return self._origin + self._tick * self.tick_sec
+
+    def schedule_at(self, when, callback, tag=None, data=None):
+        return self._add(max(self._to_tick(when), self._tick), callback, tag, data)
+
+    def schedule_in(self, delay, callback, tag=None, data=None):
+        return self._add(self._tick + max(0, int(delay / self.tick_sec)), callback, tag, data)
+
+    def _add(self, expires, callback, tag, data):
+        timer = Timer(next(self._ids), expires, callback, tag, data)
+        self._insert(timer)
+        if tag is not None:
+            self._tags.setdefault(tag, {})[timer.id] = timer
+        self.pending += 1
+        return timer
+
+    def _insert(self, timer):
+        delta = timer.expires - self._tick
+        expires = timer.expires
+        if delta < 0:
+            expires = self._tick
+        for level in range(self.levels):
+            if delta < _SLOTS << (_BITS * level) or level == self.levels - 1:
+                if level == self.levels - 1 and delta >= _SLOTS << (_BITS * level):
+                    # 超出覆盖范围：先挂在最远的槽，下放时再重新定位
+                    expires = self._tick + (_SLOTS << (_BITS * level)) - 1
+                bucket = self._wheels[level][(expires >> (_BITS * level)) & _MASK]
+                bucket[timer.id] = timer
+                timer._bucket = bucket
+                return
+
+    def cancel(self, timer):
+        if timer is None or timer._bucket is None:
+            return False
+        del timer._bucket[timer.id]
+        timer._bucket = None
+        if timer.tag is not None:
+            group = self._tags.get(timer.tag)
+            if group is not None:
+                group.pop(timer.id, None)
+                if not group:
+                    del self._tags[timer.tag]
+        self.pending -= 1
+        return True
+
+    def cancel_tag(self, tag):
+        """取消某个标签（如阶段）下的全部定时器，返回取消的数量"""
+        group = self._tags.pop(tag, None)
+        if not group:
+            return 0
+        for timer in group.values():
+            if timer._bucket is not None:
+                del timer._bucket[timer.id]
+                timer._bucket = None
+                self.pending -= 1
+        return len(group)
+
+    def pending_timers(self):
+        """
+        列出所有未到期的定时器：[(Timer, 剩余秒数)]，按到期先后排序（O(n)，只在快照时用）。
+        """
+        timers = [t for wheel in self._wheels for bucket in wheel for t in bucket.values()]
+        timers.sort(key=lambda t: t.expires)
+        return [(t, max(0, t.expires - self._tick) * self.tick_sec) for t in timers]
+
+    def clear(self):
+        for wheel in self._wheels:
+            for bucket in wheel:
+                for timer in bucket.values():
+                    timer._bucket = None
+                bucket.clear()
+        self._tags.clear()
+        self.pending = 0
+
+    # =============== 推进 ===============
+
+    def advance(self, now):
+        """
+        推进到 now，按到期顺序调用回调 callback(timer)。返回本次触发数量。
+        """
+        target = self._to_tick(now)
+        count = 0
+        while self._tick <= target:
+            if not self.pending:
+                # 没有定时器时直接跳到目标位置
+                self._tick = target + 1
+                break
+            count += self._step()
+        return count
+
+    def _step(self):
+        tick = self._tick
+        # 第 0 层转完一圈：把上一层当前槽下放（逐层向上检查）
+        if tick & _MASK == 0:
+            for level in range(1, self.levels):
+                self._cascade(level, (tick >> (_BITS * level)) & _MASK)
+                if (tick >> (_BITS * level)) & _MASK:
+                    break
+        bucket = self._wheels[0][tick & _MASK]
+        self._tick = tick + 1
+        if not bucket:
+            return 0
+        due = list(bucket.values())
+        bucket.clear()
+        for timer in due:
+            timer._bucket = None
+            if timer.tag is not None:
+                group = self._tags.get(timer.tag)
+                if group is not None:
+                    group.pop(timer.id, None)
+                    if not group:
+                        del self._tags[timer.tag]
+            self.pending -= 1
+        for timer in due:
+            self.fired += 1
+            try:
+                timer.callback(timer)
+            except Exception as e:
+                print(f"[TimerWheel] 定时回调异常: {e}")
+        return len(due)
+
+    def _cascade(self, level, index):
+        bucket = self._wheels[level][index]
+        if not bucket:
+            return
+        timers = list(bucket.values())
+        bucket.clear()
+        for timer in timers:
+            self._insert(timer)
@@ -0,0 +1,186 @@
+"""
+长语音流式播放：
+- 超过阈值的语音不整段解码，而是按块读取、转换成 mixer 格式后排进专用 Channel 的队列
+- 内存中最多只有“正在播放 + 已排队”两块 PCM
+- 可增量读取的是 PCM WAV 和编译后的语音包归档；零散的 mp3/ogg 仍整段加载
+"""
+import threading
+import time
+import wave
+
+import numpy as np
+import pygame
+
+# 预留给流式语音的 Channel（两路交替使用：一路淡出时另一路可以开始）
+STREAM_CHANNELS = (0, 1)
+DEFAULT_CHUNK_SEC = 0.5
+
+
+def mixer_format():
+    """返回 (采样率, 每样本字节数, 声道数)；mixer 不是 16 位整型时返回 None"""
+    init = pygame.mixer.get_init()
+    if not init:
+        return None
+    freq, size, channels = init
+    if abs(size) != 16:
+        return None
+    return freq, 2, channels
+
+
+def wav_info(file):
+    """
+    读取 WAV 头：返回 (采样率, 声道, 样本宽度, 帧数)，不是 PCM WAV 返回 None。
+    """
+    if not str(file).lower().endswith(".wav"):
+        return None
+    try:
+        with wave.open(file, "rb") as w:
+            return w.getframerate(), w.getnchannels(), w.getsampwidth(), w.getnframes()
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def pcm_to_int16(data, width):
+    """任意位宽的 PCM 转成 int16 样本（8 位 WAV 是无符号的，24/32 位只保留高 16 位）"""
+    if width == 1:
+        return ((np.frombuffer(data, np.uint8).astype(np.int16) - 128) << 8).astype(np.int16)
+    if width == 2:
+        return np.frombuffer(data, "<i2")
+    if width == 3:
+        raw = np.frombuffer(data, np.uint8).reshape(-1, 3)
+        return ((raw[:, 2].astype(np.int8).astype(np.int16) << 8) | raw[:, 1]).astype(np.int16)
+    if width == 4:
+        return (np.frombuffer(data, "<i4") >> 16).astype(np.int16)
+    raise ValueError(f"不支持的样本宽度: {width}")
+
+
+def wav_duration(file):
+    info = wav_info(file)
+    if not info or info[0] <= 0:
+        return None
+    return info[3] / float(info[0])
+
+
+class WavChunkSource:
+    """
+    按块读取 WAV 并转换成 mixer 格式（采样率 / 位宽 / 声道）。
+    """
+
+    def __init__(self, file, target, chunk_sec=DEFAULT_CHUNK_SEC):
+        self._wav = wave.open(file, "rb")
+        self.rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.width = self._wav.getsampwidth()
+        self.target_rate, self.target_width, self.target_channels = target
+        self.frames_per_chunk = max(1, int(self.rate * chunk_sec))
+        # 跨块线性插值的状态：上一块最后一帧，以及下一个输出点相对它的位置
+        self._carry = None
+        self._pos = 0.0
+
+    def _resample(self, frames):
+        step = self.rate / float(self.target_rate)
+        if self._carry is not None:
+            frames = np.concatenate((self._carry, frames))
+        last = len(frames) - 1
+        if last < 1:
+            self._carry = frames
+            return frames[:0]
+        positions = np.arange(self._pos, last, step)
+        left = positions.astype(np.int64)
+        frac = (positions - left)[:, None]
+        out = frames[left] * (1.0 - frac) + frames[left + 1] * frac
+        self._pos = (positions[-1] + step - last) if len(positions) else self._pos - last
+        self._carry = frames[-1:]
+        return out
+
+    def _convert(self, data):
+        if self.target_width != 2:
+            raise ValueError(f"不支持的 mixer 样本宽度: {self.target_width}")
+        frames = pcm_to_int16(data, self.width).reshape(-1, self.channels).astype(np.float32)
+        if self.channels == 2 and self.target_channels == 1:
+            frames = frames.mean(axis=1, keepdims=True)
+        if self.rate != self.target_rate:
+            frames = self._resample(frames)
+        if frames.shape[1] == 1 and self.target_channels == 2:
+            frames = np.repeat(frames, 2, axis=1)
+        return np.clip(np.rint(frames), -32768, 32767).astype("<i2").tobytes()
+
+    def read_chunk(self):
+        """返回下一块 PCM（bytes），读完返回 None"""
+        data = self._wav.readframes(self.frames_per_chunk)
+        if not data:
+            return None
+        return self._convert(data)
+
+    def close(self):
+        try:
+            self._wav.close()
+        except Exception:
+            pass
+
+
+class ArchiveChunkSource:
+    """
+    按块切分归档中的 PCM（已是 mixer 格式），每块都是映射区上的 memoryview。
+    """
+
+    def __init__(self, view, target, chunk_sec=DEFAULT_CHUNK_SEC):
+        rate, width, channels = target
+        frame_bytes = width * channels
+        self._view = view
+        self._pos = 0
+        self.chunk_bytes = max(1, int(rate * chunk_sec)) * frame_bytes
+
+    def read_chunk(self):
+        if self._pos >= len(self._view):
+            return None
+        chunk = self._view[self._pos:self._pos + self.chunk_bytes]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        self._view = b""
+
+
+class VoiceStream:
+    """
+    在专用 Channel 上播放一个块源：首块 play，其余块 queue。
+    音量 / 淡出仍然通过 Channel 完成，与整段播放的语音一致。
+    """
+
+    def __init__(self, source, channel, volume):
+        self.source = source
+        self.channel = channel
+        self.volume = volume
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        first = self.source.read_chunk()
+        if first is None:
+            self.source.close()
+            return False
+        self.channel.set_volume(self.volume)
+        self.channel.play(pygame.mixer.Sound(buffer=first))
+        self._thread = threading.Thread(target=self._feed, name="VoiceStream", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _feed(self):
+        pending = self.source.read_chunk()
+        try:
+            while pending is not None and not self._stop.is_set():
+                if not self.channel.get_busy():
+                    # 喂数据不及时（欠载）：直接从下一块继续
+                    self.channel.play(pygame.mixer.Sound(buffer=pending))
+                    pending = self.source.read_chunk()
+                elif self.channel.get_queue() is None:
+                    self.channel.queue(pygame.mixer.Sound(buffer=pending))
+                    pending = self.source.read_chunk()
+                else:
+                    time.sleep(0.05)
+        finally:
+            self.source.close()